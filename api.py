@@ -0,0 +1,258 @@
+"""
+タスクの JSON API（/api/v1）。
+
+画面と同じ絞り込み・並べ替え・カーソルページングを使い、書き込みはリダイレクトせず JSON で返す。
+一覧は fields= で返す列を絞れるほか、format=ndjson（または Accept: application/x-ndjson）で
+全件を1行1タスクの NDJSON としてストリーミングする。
+"""
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, jsonify, request, session, abort, url_for, stream_with_context
+from werkzeug.exceptions import HTTPException
+
+import board_cache
+from board_cache import bump_version
+from changes import InvalidToken, ResyncRequired, changes_since, current_position, encode_token, decode_token
+from events import EVENT_CREATED, EVENT_UPDATED, EVENT_DELETED, record
+from models import db, Task
+from board import (
+  PRIORITIES, STATUSES, sort_keys, build_task_query,
+  bulk_target, check_bulk_ownership, bulk_update_status, bulk_delete,
+)
+from pagination import InvalidCursor, encode_cursor, decode_cursor, fetch_page
+
+api_bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# API で返す列（fields= で絞り込める）
+TASK_FIELDS = ["id", "user_id", "title", "detail", "priority", "status", "due_date", "created_at"]
+MAX_LIMIT = 1000  # limit= の上限
+STREAM_BATCH_SIZE = 500  # NDJSON ストリーミング時に一度に読む行数
+
+@api_bp.errorhandler(HTTPException)
+def json_error(e):
+  return jsonify(error=e.description), e.code
+
+def parse_fields():
+  raw = request.args.get("fields")
+  if not raw:
+    return TASK_FIELDS
+  fields = [f.strip() for f in raw.split(",") if f.strip()]
+  unknown = [f for f in fields if f not in TASK_FIELDS]
+  if unknown or not fields:
+    abort(400, f"Unknown fields: {', '.join(unknown)}")
+  return fields
+
+def to_dict(row, fields):
+  data = {}
+  for f in fields:
+    value = getattr(row, f)
+    data[f] = value.isoformat() if isinstance(value, datetime) else value
+  return data
+
+def wants_ndjson():
+  if request.args.get("format") == "ndjson":
+    return True
+  return request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson"
+
+def apply_task_json(t, data):
+  """JSON の値を検証して t に反映する（不正な値は 400）"""
+  if "title" in data:
+    title = (data["title"] or "").strip() if isinstance(data["title"], (str, type(None))) else None
+    if not title:
+      abort(400, "Title is required")
+    if len(title) > 100:
+      abort(400, "Title is too long")
+    t.title = title
+  if "detail" in data:
+    if not isinstance(data["detail"], (str, type(None))):
+      abort(400, "Invalid detail")
+    t.detail = (data["detail"] or "").strip()
+  if "priority" in data:
+    if data["priority"] not in PRIORITIES:
+      abort(400, "Invalid priority")
+    t.priority = data["priority"]
+  if "status" in data:
+    if data["status"] not in STATUSES:
+      abort(400, "Invalid status")
+    t.status = data["status"]
+  if "due_date" in data:
+    try:
+      t.due_date = datetime.strptime(data["due_date"], "%Y-%m-%d") if data["due_date"] else None
+    except (TypeError, ValueError):
+      abort(400, "Invalid due_date (YYYY-MM-DD)")
+
+def get_json_body():
+  data = request.get_json(silent=True)
+  if not isinstance(data, dict):
+    abort(400, "JSON object is required")
+  return data
+
+def get_own_task(task_id):
+  t = Task.query.get_or_404(task_id)
+  if t.user_id != session.get("user_id"):
+    abort(403)  # Forbidden
+  return t
+
+# ==== ルーティング ====
+@api_bp.get("/tasks")
+def list_tasks():
+  fields = parse_fields()
+  status = request.args.get("status")
+  priority = request.args.get("priority")
+  view_mode = request.args.get("view_mode", "personal")
+  sort_by = request.args.get("sort_by") or "Created At (Newest First)"
+  keys = sort_keys(sort_by)
+
+  # ORM オブジェクトは作らず、fields ＋ カーソル用の並べ替えキーの列だけを読む
+  columns = [getattr(Task, f) for f in fields]
+  columns += [col for col, _desc in keys if col.key not in fields]
+  q = build_task_query(view_mode, status, priority, sort_by, session.get("user_id")).with_entities(*columns)
+
+  if wants_ndjson():
+    dumps = current_app.json.dumps
+    def generate():
+      for row in q.yield_per(STREAM_BATCH_SIZE):
+        yield dumps(to_dict(row, fields)) + "\n"
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+  try:
+    after = decode_cursor(request.args["after"], sort_by, keys) if request.args.get("after") else None
+  except InvalidCursor:
+    abort(400, "Invalid cursor")
+  limit = request.args.get("limit", type=int) or current_app.config["TASKS_PER_PAGE"]
+  rows, has_more = fetch_page(q, keys, after, min(max(limit, 1), MAX_LIMIT))
+  return jsonify(
+    tasks=[to_dict(row, fields) for row in rows],
+    next=encode_cursor(sort_by, keys, rows[-1]) if has_more else None,
+  )
+
+@api_bp.get("/tasks/<int:task_id>")
+def get_task(task_id):
+  fields = parse_fields()
+  t = Task.query.get_or_404(task_id)
+  return jsonify(to_dict(t, fields))
+
+@api_bp.post("/tasks")
+def create_task():
+  data = get_json_body()
+  t = Task(user_id=session.get("user_id"), title="", detail="", priority="Mid", status="todo", due_date=None)
+  apply_task_json(t, {"title": None, **data})
+  db.session.add(t)
+  record(EVENT_CREATED, t)
+  bump_version(t.user_id)
+  db.session.commit()
+  res = jsonify(to_dict(t, TASK_FIELDS))
+  res.status_code = 201
+  res.headers["Location"] = url_for("api.get_task", task_id=t.id)
+  return res
+
+@api_bp.patch("/tasks/<int:task_id>")
+def update_task(task_id):
+  t = get_own_task(task_id)
+  apply_task_json(t, get_json_body())
+  record(EVENT_UPDATED, t)
+  bump_version(t.user_id)
+  db.session.commit()
+  return jsonify(to_dict(t, TASK_FIELDS))
+
+@api_bp.delete("/tasks/<int:task_id>")
+def delete_task(task_id):
+  t = get_own_task(task_id)
+  db.session.delete(t)
+  record(EVENT_DELETED, t)
+  bump_version(t.user_id)
+  db.session.commit()
+  return "", 204
+
+@api_bp.post("/tasks/bulk")
+def bulk_tasks():
+  """
+  一括操作。どの操作も1トランザクション（commit 1回）で実行する。
+    {"op": "create", "tasks": [{"title": ...}, ...]}
+    {"op": "status", "status": "done", "ids": [1, 2, 3]}
+    {"op": "delete", "filter": {"status": "done", "priority": "Low", "view_mode": "personal"}}
+  """
+  data = get_json_body()
+  op = data.get("op")
+  user_id = session.get("user_id")
+
+  if op == "create":
+    items = data.get("tasks")
+    if not isinstance(items, list) or not items:
+      abort(400, "tasks must be a non-empty list")
+    tasks = []
+    for i, item in enumerate(items):
+      if not isinstance(item, dict):
+        abort(400, f"tasks[{i}]: JSON object is required")
+      t = Task(user_id=user_id, title="", detail="", priority="Mid", status="todo", due_date=None)
+      try:
+        apply_task_json(t, {"title": None, **item})
+      except HTTPException as e:
+        abort(400, f"tasks[{i}]: {e.description}")
+      tasks.append(t)
+    db.session.add_all(tasks)
+    db.session.flush()  # commit 後の再読み込みを避けるため、採番後ここで JSON にする
+    body = [to_dict(t, TASK_FIELDS) for t in tasks]
+    for t in tasks:
+      record(EVENT_CREATED, t)
+    bump_version(user_id)
+    db.session.commit()
+    return jsonify(tasks=body), 201
+
+  if op not in ("status", "delete"):
+    abort(400, "Invalid op")
+  if op == "status" and data.get("status") not in STATUSES:
+    abort(400, "Invalid status")
+
+  ids = data.get("ids")
+  flt = data.get("filter")
+  if (ids is None) == (flt is None):
+    abort(400, "Either ids or filter is required")
+  if ids is not None:
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+      abort(400, "ids must be a non-empty list of integers")
+    q = bulk_target(user_id, ids)
+  else:
+    if not isinstance(flt, dict):
+      abort(400, "filter must be an object")
+    q = bulk_target(user_id, None, flt.get("view_mode", "personal"), flt.get("status"), flt.get("priority"))
+
+  q = check_bulk_ownership(q, user_id, ids)
+  count = bulk_update_status(q, data["status"]) if op == "status" else bulk_delete(q)
+  bump_version(user_id)
+  db.session.commit()
+  return jsonify(count=count)
+
+@api_bp.get("/changes")
+def list_changes():
+  """
+  since（前回の next）より後に作成・更新・削除されたタスク（changes.py）。
+  since なしなら今の位置だけを返す。since より後の変更が消えていたら 410（resync: true。一覧を全件読み直す）
+  """
+  view_mode = request.args.get("view_mode", "personal")
+  if not request.args.get("since"):
+    return jsonify(changes=[], next=encode_token(current_position()), has_more=False)
+  try:
+    since = decode_token(request.args["since"])
+  except InvalidToken:
+    abort(400, "Invalid since token")
+  limit = request.args.get("limit", type=int) or current_app.config["CHANGES_PAGE_SIZE"]
+  columns = [getattr(Task, f) for f in TASK_FIELDS]
+  try:
+    changes, last, has_more = changes_since(
+      since, session.get("user_id"), view_mode != "all", columns, min(max(limit, 1), MAX_LIMIT)
+    )
+  except ResyncRequired:
+    return jsonify(error="since is too old; reload all tasks", resync=True), 410
+  body = []
+  for c in changes:
+    item = {"seq": encode_token(c.seq), "kind": c.kind, "id": c.task_id}
+    if c.task is not None:
+      item["task"] = to_dict(c.task, TASK_FIELDS)
+    body.append(item)
+  return jsonify(changes=body, next=encode_token(last), has_more=has_more)
+
+@api_bp.get("/stats/board-cache")
+def board_cache_stats():
+  # 一覧キャッシュのヒット・ミス数（プロセスごと）
+  return jsonify(board_cache.get_cache(current_app).stats())
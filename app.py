@@ -1,84 +1,230 @@
 
-from datetime import datetime, date
-from flask import Flask, render_template_string, request, redirect, url_for, session, abort
+import os
+import hashlib
+from datetime import datetime, date, timezone
+from flask import Flask, render_template, request, redirect, url_for, session, abort, jsonify, make_response
+
+from jinja2 import FileSystemBytecodeCache
 
 from models import db, User, Task
+from board import (
+  PRIORITIES, STATUSES, SORT_OPTIONS, RELEVANCE_SORT, sort_keys, build_task_query, board_rows, board_summary, TaskRow,
+  bulk_target, check_bulk_ownership, bulk_update_status, bulk_delete,
+)
+import board_cache
+from board_cache import board_scope, bump_version
+import events
+import group_commit
+import instrumentation
+import maintenance
+from events import EVENT_CREATED, EVENT_UPDATED, EVENT_DELETED, record
+import archive
+import db_config
+import migrations
+import passwords
+import sqlite_tuning
+import transfer
+import user_cache
+from pagination import InvalidCursor, encode_cursor, decode_cursor, fetch_page
 
 # ==== 設定 ====
 app = Flask(__name__)
 app.secret_key = "b7e2f8c1e4a9d3f6a2c5b8e7d1f4c3a6e9b2d7c4f1a8b5e6c2d9f3a7b6e1c4d8"  # セッション用のランダムな秘密鍵
 
 # tasks.dbはデフォルト、users.dbはbindsで分離
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///tasks.db"
-app.config["SQLALCHEMY_BINDS"] = {
-  "users": "sqlite:///users.db"
-}
+# 接続先・プール設定は環境変数で切り替える（db_config.py 参照。未指定ならSQLiteファイル）
+db_config.apply(app.config)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-db.init_app(app)
-
-PRIORITIES = ["Low", "Mid", "High"]
-STATUSES = ["todo", "doing", "done"]
-SORT_OPTIONS = ["Priority", "Due Date"]
+app.config["TASKS_PER_PAGE"] = 50  # 一覧の1ページあたりの件数
+app.config["KANBAN_COLUMN_SIZE"] = 20  # カンバン表示（layout=kanban）の列ごとの1回に読む件数
+# SQLite の接続ごとの PRAGMA（WAL・busy_timeout など。sqlite_tuning.py 参照）
+app.config["SQLITE_PRAGMAS"] = dict(sqlite_tuning.DEFAULT_PRAGMAS)
+# 一覧のクエリ結果キャッシュ（board_cache.py 参照）
+app.config["BOARD_CACHE_ENABLED"] = True
+app.config["BOARD_CACHE_SIZE"] = 1024  # エントリ数の上限（LRU）
+app.config["BOARD_CACHE_TTL"] = 60  # 秒
+app.config["SEARCH_RESULT_LIMIT"] = 200  # 検索結果の最大件数（search.py 参照）
+# 一覧のライブ更新（events.py / live.py 参照）
+app.config["LIVE_POLL_INTERVAL"] = 0.5  # 他のワーカーでの変更を読みに行く間隔（秒）
+app.config["LIVE_KEEPALIVE"] = 15  # 変更がなくてもこの秒数ごとに接続維持のコメントを送る
+app.config["LIVE_RETRY_MS"] = 3000  # 切断時にブラウザが再接続するまでの待ち時間
+app.config["LIVE_QUEUE_SIZE"] = 256  # 1接続あたりの未送信イベントの上限
+app.config["LIVE_EVENT_RETENTION"] = 3600  # task_event を残す秒数（変更フィードはこれより前の since を再同期させる）
+app.config["CHANGES_PAGE_SIZE"] = 500  # 変更フィード（/api/v1/changes）で1回に読むイベントの件数
+app.config["CHANGES_COMPACT_AFTER"] = 600  # compact-changes で同じタスクの古い変更を詰めるまでの秒数
+# パスワードのハッシュ計算（passwords.py 参照）
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+app.config["PASSWORD_HASH_MAX_PENDING"] = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 4 * app.config["PASSWORD_HASH_WORKERS"]))
+app.config["PASSWORD_HASH_RETRY_AFTER"] = 2  # 満杯のときに返す Retry-After（秒）
+# 状態の変更・削除のグループコミット（group_commit.py 参照。既定は無効）
+app.config["GROUP_COMMIT_ENABLED"] = os.environ.get("GROUP_COMMIT_ENABLED", "0") == "1"
+app.config["GROUP_COMMIT_WINDOW_MS"] = float(os.environ.get("GROUP_COMMIT_WINDOW_MS", 2))  # 最初の書き込みからまとめて待つ時間
+app.config["GROUP_COMMIT_MAX_BATCH"] = 64  # 1回の commit にまとめる最大件数
+app.config["GROUP_COMMIT_MAX_PENDING"] = 1024  # 待っている書き込みの上限（超えたら 503）
+# 計測（instrumentation.py 参照）。既定は無効
+app.config["INSTRUMENTATION_ENABLED"] = os.environ.get("INSTRUMENTATION_ENABLED", "0") == "1"
+app.config["SLOW_QUERY_MS"] = int(os.environ.get("SLOW_QUERY_MS", 100))  # これより遅い SQL をログに出す
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")  # /metrics を読むための Bearer トークン
+# ?profile=1 と /metrics を使える管理者のメールアドレス（カンマ区切り）
+app.config["ADMIN_EMAILS"] = {email.strip() for email in os.environ.get("ADMIN_EMAILS", "").split(",") if email.strip()}
+# ユーザーのキャッシュ（user_cache.py 参照）
+app.config["USER_CACHE_SIZE"] = 10000
+app.config["USER_CACHE_TTL"] = int(os.environ.get("USER_CACHE_TTL", 60))  # 秒（別ワーカーでの変更が反映されるまでの上限）
 
-# DB作成（両DB）
-with app.app_context():
-  db.create_all()
+# テンプレートのバイトコードキャッシュ（任意）。ディレクトリを指定するとワーカー起動時のコンパイルを省略できる
+app.config["TEMPLATE_BYTECODE_CACHE_DIR"] = os.environ.get("TEMPLATE_BYTECODE_CACHE_DIR")
+if app.config["TEMPLATE_BYTECODE_CACHE_DIR"]:
+  app.jinja_options = {
+    **app.jinja_options,
+    "bytecode_cache": FileSystemBytecodeCache(app.config["TEMPLATE_BYTECODE_CACHE_DIR"]),
+  }
+db.init_app(app)
+sqlite_tuning.init_app(app, db)
+board_cache.init_app(app)
+events.init_app(app)
+passwords.init_app(app)
+group_commit.init_app(app)
+user_cache.init_app(app)
+instrumentation.init_app(app)
+transfer.init_app(app)
+maintenance.init_app(app)
+# DB作成（両DB）＋既存DBのスキーマ更新は import 時ではなく flask --app app init-db で行う（maintenance.py）
 
 # ==== ログイン必須化 ====
 
 from login import login_bp
 from userRegister import user_register_bp
+from api import api_bp
+from live import live_bp
 app.register_blueprint(login_bp)
 app.register_blueprint(user_register_bp)
+app.register_blueprint(api_bp)
+app.register_blueprint(live_bp)
+
+# テンプレートは起動時に一度だけコンパイルし、jinja_env のキャッシュに載せておく
+for template_name in ("index.html", "_task_item.html", "edit_form.html", "login.html", "register.html"):
+  app.jinja_env.get_template(template_name)
+
+# 一覧の ETag に含めるテンプレートのハッシュ（デプロイで画面が変わったら ETag も変わる）
+BOARD_TEMPLATE_HASH = hashlib.sha1(b"".join(
+  app.jinja_loader.get_source(app.jinja_env, name)[0].encode() for name in ("index.html", "_task_item.html")
+)).hexdigest()
 
 @app.before_request
 def require_login():
-  # ログインしていない場合は/login, /register, staticのみ許可
-  if not session.get("logged_in") and request.endpoint not in ("login.login", "user_register.register", "static"):
+  # ログインしていない場合は/login, /register, static, /metrics（トークンで確認する）のみ許可
+  if not session.get("logged_in") and request.endpoint not in (
+    "login.login", "user_register.register", "static", "instrumentation.metrics",
+  ):
+    if request.blueprint == "api":
+      return jsonify(error="Login required"), 401
     return redirect(url_for("login.login"))
 
 # ==== ルーティング ====
 @app.get("/")
 def index():
-  q = Task.query
   status = request.args.get("status")
   priority = request.args.get("priority")
   view_mode = request.args.get("view_mode", "personal")
+  search = (request.args.get("q") or "").strip()
   sort_by = request.args.get("sort_by") or "Created At (Newest First)"
-  if sort_by == "Priority":
-    q = q.order_by(
-        db.case(
-          (Task.priority == "High", 1),
-          (Task.priority == "Mid", 2),
-          (Task.priority == "Low", 3),
-        ),
-        Task.due_date.asc().nulls_last(),
-        Task.created_at.desc(),
-    )
-  elif sort_by == "Due Date":
-    # Due Date昇順、NULLは最後
-    q = q.order_by(
-        Task.due_date.asc().nulls_last(),
-        Task.created_at.desc()
+  include_archived = request.args.get("archived") == "1"
+  # カンバン表示は status ごとの列。列ごとに別のクエリ・件数・続きのカーソルを持つ（column は続きを読む列）
+  layout = "kanban" if request.args.get("layout") == "kanban" else "list"
+  column = request.args.get("column") if layout == "kanban" and request.args.get("column") in STATUSES else None
+
+  keys = sort_keys(sort_by)
+  try:
+    # 検索結果は上位 SEARCH_RESULT_LIMIT 件だけを返し、続きのページはない
+    after = decode_cursor(request.args["after"], sort_by, keys) if request.args.get("after") and not search else None
+  except InvalidCursor:
+    return "Invalid cursor", 400
+
+  user_id = session.get("user_id")
+  scope = board_scope(view_mode, user_id)
+  # ライブ更新はこのイベントの続きから受け取る（一覧より先に読み、間の変更を取りこぼさない）
+  live_after = events.position_token(events.latest_position())
+  version, updated_at = board_cache.version_info(scope)
+
+  # 条件付きGET: 変更カウンタ・条件・日付（期限切れ表示）が同じなら一覧を読まずに 304 を返す
+  etag = board_cache.board_etag(
+    scope, version, user_id, request.query_string, date.today(), BOARD_TEMPLATE_HASH,
+  )
+  if request.if_none_match.contains(etag):
+    return set_board_validators(app.response_class(status=304), etag, updated_at)
+
+  def load_page(page_status, after, per_page):
+    # 同じ条件・同じ変更カウンタならキャッシュ済みの結果を使う（書き込みがあればカウンタが変わる）
+    cache_key = (
+      scope, version,
+      page_status if page_status in STATUSES else None, priority if priority in PRIORITIES else None,
+      sort_by, search, tuple(after) if after else None, per_page,
     )
+    cache = board_cache.get_cache(app)
+    cached = cache.get(cache_key) if app.config["BOARD_CACHE_ENABLED"] else None
+    if cached is None:
+      with instrumentation.phase("query"):
+        q = board_rows(build_task_query(view_mode, page_status, priority, sort_by, user_id, search))
+        rows, has_more = fetch_page(q, keys, after, per_page)
+        cached = ([TaskRow._make(row) for row in rows], has_more)
+      if app.config["BOARD_CACHE_ENABLED"]:
+        cache.set(cache_key, cached)
+    return cached
+
+  def more_url(tasks, **extra):
+    # 次ページ（Load more / 列の More）のURL。フィルタ・並び順はそのまま引き継ぐ
+    args = request.args.to_dict()
+    args.update(extra, after=encode_cursor(sort_by, keys, tasks[-1]))
+    return url_for("index", **args)
+
+  columns = []
+  if layout == "kanban":
+    # 列は status の絞り込みがあればその列だけ、More で続きを読むときは column の列だけ。
+    # どの列も (user_id,) status, 並べ替えキーの複合インデックスを LIMIT 件だけ読むので、done が大きくても他の列は遅くならない
+    per_page = app.config["SEARCH_RESULT_LIMIT"] if search else app.config["KANBAN_COLUMN_SIZE"]
+    for s in [column] if column else [status] if status in STATUSES else STATUSES:
+      column_tasks, column_more = load_page(s, after if s == column else None, per_page)
+      columns.append({
+        "status": s, "tasks": column_tasks, "truncated": bool(search) and column_more,
+        "next_url": more_url(column_tasks, column=s) if column_more and not search else None,
+      })
+    tasks, has_more = [t for c in columns for t in c["tasks"]], False
   else:
-    q = q.order_by(Task.created_at.desc())
+    tasks, has_more = load_page(status, after, app.config["SEARCH_RESULT_LIMIT"] if search else app.config["TASKS_PER_PAGE"])
+  # 見出しの件数は task_counter の数行（書き込みと同じトランザクションで増減している）
+  with instrumentation.phase("query"):
+    summary = board_summary(view_mode, user_id, status, priority)
+  # archived=1 のときだけアーカイブ（archive.py）からも同じ条件で新しい順に読み、別枠に出す
+  archived_tasks, archived_truncated = [], False
+  if include_archived:
+    with instrumentation.phase("query"):
+      rows = archive.archived_query(view_mode, status, priority, user_id, search).limit(app.config["SEARCH_RESULT_LIMIT"] + 1).all()
+    archived_tasks = rows[:app.config["SEARCH_RESULT_LIMIT"]]
+    archived_truncated = len(rows) > app.config["SEARCH_RESULT_LIMIT"]
+  # 全タスクの一覧では所有者を表示する（users.db から1回の IN で読み、プロセスごとにキャッシュ）
+  owners = user_cache.owner_emails(t.user_id for t in [*tasks, *archived_tasks]) if view_mode == "all" else None
 
-  user_id = session.get("user_id")
-  if view_mode == "personal" and user_id:
-    q = q.filter_by(user_id=user_id)
-  if status in STATUSES:
-    q = q.filter_by(status=status)
-  if priority in PRIORITIES:
-    q = q.filter_by(priority=priority)
+  next_url = more_url(tasks) if has_more and not search else None
 
-  tasks = q.all()
+  with instrumentation.phase("render"):
+    res = make_response(render_template("index.html", tasks=tasks, next_url=next_url,
+                    status=status, priority=priority, search=search,
+                    search_truncated=bool(search) and has_more, SEARCH_RESULT_LIMIT=app.config["SEARCH_RESULT_LIMIT"],
+                    view_mode=view_mode, sort_by=sort_by, SORT_OPTIONS=SORT_OPTIONS, RELEVANCE_SORT=RELEVANCE_SORT,
+                    today=date.today(), live_after=live_after, owners=owners, summary=summary,
+                    include_archived=include_archived, archived_tasks=archived_tasks, archived_truncated=archived_truncated,
+                    layout=layout, columns=columns,
+                    PRIORITIES=PRIORITIES, STATUSES=STATUSES))
+  return set_board_validators(res, etag, updated_at)
 
-  return render_template_string(TEMPLATE, tasks=tasks,
-                  status=status, priority=priority,
-                  view_mode=view_mode, sort_by=sort_by, SORT_OPTIONS=SORT_OPTIONS,
-                  datetime=datetime, date=date,
-                  PRIORITIES=PRIORITIES, STATUSES=STATUSES)
+def set_board_validators(res, etag, updated_at):
+  # ユーザーごとの画面なので共有キャッシュには置かせず、毎回 ETag で再検証させる
+  res.set_etag(etag)
+  if updated_at is not None:
+    res.last_modified = updated_at.astimezone(timezone.utc)  # updated_at はローカル時刻
+  res.headers["Cache-Control"] = "private, no-cache"
+  return res
 
 @app.post("/tasks")
 def create_task():
@@ -94,30 +240,80 @@ def create_task():
     return "Invalid priority", 400
   t = Task(title=title, detail=detail, priority=priority, user_id=user_id, due_date=due_date)
   db.session.add(t)
+  record(EVENT_CREATED, t)
+  bump_version(user_id)
   db.session.commit()
   return redirect(url_for("index"))
 
+def wants_json():
+    # 一覧の JS から fetch で呼ばれた場合はリダイレクト（一覧の再描画）せず JSON で返す
+    return request.accept_mimetypes.best == "application/json"
+
+def change_status(task_id, user_id, new_status):
+    # 状態の変更（commit は group_commit.run。書き込みスレッドで動くことがあるので Flask の session・request は使わない）
+    t = Task.query.get_or_404(task_id)
+    if t.user_id != user_id:
+        abort(403)  # Forbidden
+    t.status = new_status
+    record(EVENT_UPDATED, t)
+    bump_version(t.user_id)
+    return t.id, t.status
+
+def remove_task(task_id, user_id):
+    # 削除（commit は group_commit.run）
+    t = Task.query.get_or_404(task_id)
+    if t.user_id != user_id:
+        abort(403)  # Forbidden
+    db.session.delete(t)
+    record(EVENT_DELETED, t)
+    bump_version(t.user_id)
+
 @app.post("/tasks/<int:task_id>/status")
 def update_status(task_id):
     new_status = request.form.get("status")
     if new_status not in STATUSES:
         return "Invalid status", 400
-    t = Task.query.get_or_404(task_id)
-    if t.user_id != session.get("user_id"):
-        abort(403)  # Forbidden
-    t.status = new_status
-    db.session.commit()
+    task_id, status = group_commit.run(change_status, task_id, session.get("user_id"), new_status)
+    if wants_json():
+        return jsonify(id=task_id, status=status)
     return redirect(url_for("index", **request.args))
 
 @app.post("/tasks/<int:task_id>/delete")
 def delete_task(task_id):
-    t = Task.query.get_or_404(task_id)
-    if t.user_id != session.get("user_id"):
-        abort(403)  # Forbidden
-    db.session.delete(t)
-    db.session.commit()
+    group_commit.run(remove_task, task_id, session.get("user_id"))
+    if wants_json():
+        return "", 204
     return redirect(url_for("index", **request.args))
 
+@app.post("/tasks/bulk")
+def bulk_tasks():
+    # 一覧の複数選択からの一括操作。set-based な UPDATE/DELETE を1トランザクションで実行する
+    op = request.form.get("op")
+    if op not in STATUSES and op != "delete":
+        return "Invalid operation", 400
+    filters = {k: request.form.get(k) for k in ("view_mode", "status", "priority", "sort_by", "q", "layout") if request.form.get(k)}
+    user_id = session.get("user_id")
+
+    if request.form.get("scope") == "filter":
+        ids = None  # 現在の絞り込みに一致するタスク全部
+    else:
+        ids = request.form.getlist("ids", type=int)
+        if not ids:
+            return redirect(url_for("index", **filters))
+
+    q = bulk_target(
+        user_id, ids, filters.get("view_mode", "personal"), filters.get("status"), filters.get("priority"),
+        filters.get("q"),
+    )
+    q = check_bulk_ownership(q, user_id, ids)
+    if op == "delete":
+        bulk_delete(q)
+    else:
+        bulk_update_status(q, op)
+    bump_version(user_id)
+    db.session.commit()
+    return redirect(url_for("index", **filters))
+
 @app.post("/tasks/<int:task_id>/update")
 def update_task(task_id):
     t = Task.query.get_or_404(task_id)
@@ -134,277 +330,41 @@ def update_task(task_id):
         return "Title is required", 400
     if t.priority not in PRIORITIES:
         return "Invalid priority", 400
+    record(EVENT_UPDATED, t)
+    bump_version(t.user_id)
     db.session.commit()
     return redirect(url_for("index", **request.args))
 
-# ==== 最小テンプレート ====
-TEMPLATE = """
-<!doctype html>
-<html lang="ja">
-<head>
-  <meta charset="utf-8"/>
-  <title>Mini Task Board</title>
-  <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet"/>
-  <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.min.css">
-  <style>
-    /* optional: アニメーション中の見た目微調整 */
-    .list-group-item {
-      will-change: transform;
-    }
-  </style>
-</head>
-<body class="bg-light">
-<div class="container py-4">
-  <h1 class="mb-3">Mini Task Board</h1>
-
-  <!-- フィルタ -->
-  <form class="row g-2 align-items-end mb-3" method="get">
-    <div class="col-auto">
-      <label class="form-label">Type of task</label><br>
-      <div class="form-check form-check-inline">
-        <input class="form-check-input" type="radio" name="view_mode" id="view_personal" value="personal" {% if view_mode != 'all' %}checked{% endif %} onchange="this.form.submit()">
-        <label class="form-check-label" for="view_personal">My task</label>
-      </div>
-      <div class="form-check form-check-inline">
-        <input class="form-check-input" type="radio" name="view_mode" id="view_all" value="all" {% if view_mode == 'all' %}checked{% endif %} onchange="this.form.submit()">
-        <label class="form-check-label" for="view_all">All task</label>
-      </div>
-    </div>
-    <div class="col-auto">
-      <label class="form-label">Status</label>
-      <select name="status" class="form-select">
-        <option value="">(all)</option>
-        {% for s in STATUSES %}
-          <option value="{{s}}" {{'selected' if status==s else ''}}>{{s}}</option>
-        {% endfor %}
-      </select>
-    </div>
-    <div class="col-auto">
-      <label class="form-label">Priority</label>
-      <select name="priority" class="form-select">
-        <option value="">(all)</option>
-        {% for p in PRIORITIES %}
-          <option value="{{p}}" {{'selected' if priority==p else ''}}>{{p}}</option>
-        {% endfor %}
-      </select>
-    </div>
-    <div class="col-auto">
-      <button class="btn btn-secondary">Filter</button>
-    </div>
-    <div class="col-auto">
-      <label class="form-label">Sort by</label>
-      <select id="sortSelect" name="sort_by" class="form-select" onchange="this.form.submit()">
-        <option value="">Created At (Newest First)</option>
-        {% for option in SORT_OPTIONS %}
-          <option value="{{option}}" {{'selected' if sort_by==option else ''}}>{{option}}</option>
-        {% endfor %}
-      </select>
-    </div>
-    <div class="col-auto">
-      <a class="btn btn-outline-secondary" href="{{ url_for('index') }}">Clear</a>
-    </div>
-  </form>
-
-  <!-- 新規作成 -->
-  <div class="card mb-3">
-    <div class="card-body">
-      <h5 class="card-title">New Task</h5>
-      <form method="post" action="{{ url_for('create_task') }}">
-        <div class="row g-2">
-          <div class="col-md-3">
-            <input name="title" class="form-control" placeholder="Title (required)" maxlength="100" required>
-          </div>
-          <div class="col-md-3">
-            <textarea name="detail" class="form-control" placeholder="Detail (optional)" rows="1"></textarea>
-          </div>
-          <div class="col-md-2">
-            <input type="date" name="due_date" class="form-control" title="Due Date">
-          </div>
-          <div class="col-md-2">
-            <select name="priority" class="form-select">
-              {% for p in PRIORITIES %}<option value="{{p}}">{{p}}</option>{% endfor %}
-            </select>
-          </div>
-          <div class="col-md-2 d-grid">
-            <button class="btn btn-primary">Add</button>
-          </div>
-        </div>
-      </form>
-    </div>
-  </div>
-
-  <!-- 一覧 -->
-  <div class="list-group" id="taskList">
-    {% for t in tasks %}
-      <div class="list-group-item" data-id="{{t.id}}"
-           data-priority="{{t.priority}}"
-           data-due="{{ t.due_date.strftime('%Y-%m-%d') if t.due_date else '' }}"
-           data-created="{{ t.created_at.strftime('%Y-%m-%dT%H:%M:%S') }}">
-        <div class="d-flex justify-content-between">
-          <div>
-            <strong>[{{ t.priority }}]</strong>
-            <span class="badge text-bg-{{ 'success' if t.status=='done' else ('warning' if t.status=='doing' else 'secondary') }}">
-              {{ t.status }}
-            </span>
-            <span class="ms-1">{{ t.title }}</span>
-            {% if t.detail %}<div class="text-muted small" style="white-space: pre-wrap;">{{ t.detail }}</div>{% endif %}
-            <div class="d-flex align-items-center gap-3">
-              <div class="text-muted small">#{{t.id}} / {{t.created_at.strftime('%Y-%m-%d %H:%M')}}</div>
-              {% if t.due_date %}
-                <div class="small {{ 'text-danger fw-bold' if not t.status == 'done' and t.due_date.date() < date.today() else 'text-muted' }}">
-                  <i class="bi bi-calendar-x"></i>
-                  Due: {{ t.due_date.strftime('%Y-%m-%d') }}
-                </div>
-              {% endif %}
-            </div>
-          </div>
-          <div class="d-flex gap-1 align-items-center">
-            <form method="post" action="{{ url_for('update_status', task_id=t.id) }}">
-              <input type="hidden" name="status" value="todo">
-              <button class="btn btn-sm {{ 'btn-secondary' if t.status == 'todo' else 'btn-outline-secondary' }}" {{'disabled' if t.status=='todo' else ''}}>todo</button>
-            </form>
-            <form method="post" action="{{ url_for('update_status', task_id=t.id) }}">
-              <input type="hidden" name="status" value="doing">
-              <button class="btn btn-sm {{ 'btn-warning' if t.status == 'doing' else 'btn-outline-warning' }}" {{'disabled' if t.status=='doing' else ''}}>doing</button>
-            </form>
-            <form method="post" action="{{ url_for('update_status', task_id=t.id) }}">
-              <input type="hidden" name="status" value="done">
-              <button class="btn btn-sm {{ 'btn-success' if t.status == 'done' else 'btn-outline-success' }}" {{'disabled' if t.status=='done' else ''}}>done</button>
-            </form>
-            <button type="button" class="btn btn-sm btn-outline-primary" data-bs-toggle="modal" data-bs-target="#editModal{{ t.id }}" title="Edit">
-              <i class="bi bi-pencil"></i>
-            </button>
-            <form method="post" action="{{ url_for('delete_task', task_id=t.id) }}" onsubmit="return confirm('Delete?');">
-              <button class="btn btn-sm btn-outline-danger" title="Delete"><i class="bi bi-trash"></i></button>
-            </form>
-          </div>
-        </div>
-      </div>
-
-      <!-- Edit Modal -->
-      <div class="modal fade" id="editModal{{ t.id }}" tabindex="-1" aria-labelledby="editModalLabel{{ t.id }}" aria-hidden="true">
-        <div class="modal-dialog">
-          <div class="modal-content">
-            <form method="post" action="{{ url_for('update_task', task_id=t.id) }}">
-              <div class="modal-header">
-                <h5 class="modal-title" id="editModalLabel{{ t.id }}">Edit Task #{{ t.id }}</h5>
-                <button type="button" class="btn-close" data-bs-dismiss="modal" aria-label="Close"></button>
-              </div>
-              <div class="modal-body">
-                <div class="mb-3">
-                  <label class="form-label">Title</label>
-                  <input name="title" class="form-control" value="{{ t.title }}" required>
-                </div>
-                <div class="mb-3">
-                  <label class="form-label">Detail</label>
-                  <textarea name="detail" class="form-control" rows="3">{{ t.detail or '' }}</textarea>
-                </div>
-                <div class="row">
-                  <div class="col">
-                    <label class="form-label">Priority</label>
-                    <select name="priority" class="form-select">
-                      {% for p in PRIORITIES %}
-                      <option value="{{p}}" {{ 'selected' if p == t.priority }}>{{p}}</option>
-                      {% endfor %}
-                    </select>
-                  </div>
-                  <div class="col">
-                    <label class="form-label">Due Date</label>
-                    <input type="date" name="due_date" class="form-control" value="{{ t.due_date.strftime('%Y-%m-%d') if t.due_date }}">
-                  </div>
-                </div>
-              </div>
-              <div class="modal-footer">
-                <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Close</button>
-                <button type="submit" class="btn btn-primary">Save changes</button>
-              </div>
-            </form>
-          </div>
-        </div>
-      </div>
-    {% else %}
-      <div class="alert alert-info">No tasks yet.</div>
-    {% endfor %}
-  </div>
-</div>
-<script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js"></script>
-<script>
-  // クライアント側ソート + FLIP アニメーション
-  function priorityValue(p){
-    return p === 'High' ? 1 : (p === 'Mid' ? 2 : 3);
-  }
-  function parseDateString(s){
-    return s ? new Date(s) : new Date(8640000000000000); // nullは将来日にして最後にする
-  }
+@app.get("/tasks/<int:task_id>/edit")
+def edit_task(task_id):
+    # 共通の Edit Modal に差し込む編集フォームだけを返す
+    t = Task.query.get_or_404(task_id)
+    if t.user_id != session.get("user_id"):
+        abort(403)  # Forbidden
+    return render_template("edit_form.html", t=t, PRIORITIES=PRIORITIES)
 
-  function sortTasks(option){
-    const container = document.getElementById('taskList');
-    const items = Array.from(container.children);
-    if(!items.length) return;
-
-    // 現在の位置を記録（First）
-    const firstRects = new Map();
-    items.forEach(el => firstRects.set(el.dataset.id, el.getBoundingClientRect()));
-
-    let sorted;
-    if(option === 'Priority'){
-      sorted = items.sort((a,b) => {
-        const pa = priorityValue(a.dataset.priority);
-        const pb = priorityValue(b.dataset.priority);
-        if(pa !== pb) return pa - pb;
-        const da = parseDateString(a.dataset.due);
-        const db = parseDateString(b.dataset.due);
-        if(da - db !== 0) return da - db;
-        return new Date(b.dataset.created) - new Date(a.dataset.created); // 新しい順
-      });
-    } else if(option === 'Due Date'){
-      sorted = items.sort((a,b) => {
-        const da = parseDateString(a.dataset.due);
-        const db = parseDateString(b.dataset.due);
-        if(da - db !== 0) return da - db;
-        return new Date(b.dataset.created) - new Date(a.dataset.created);
-      });
-    } else {
-      // Created At (Newest First)
-      sorted = items.sort((a,b) => new Date(b.dataset.created) - new Date(a.dataset.created));
-    }
-
-    // 新しい順でDOMに再配置（Last）
-    const fragment = document.createDocumentFragment();
-    sorted.forEach(el => fragment.appendChild(el));
-    container.appendChild(fragment);
-
-    // Invert -> Play を実行
-    sorted.forEach(el => {
-      const first = firstRects.get(el.dataset.id);
-      const last = el.getBoundingClientRect();
-      const dx = first.left - last.left;
-      const dy = first.top - last.top;
-      if(dx !== 0 || dy !== 0){
-        el.style.transition = 'none';
-        el.style.transform = `translate(${dx}px, ${dy}px)`;
-        requestAnimationFrame(() => {
-          el.style.transition = 'transform 300ms ease';
-          el.style.transform = '';
-        });
-        el.addEventListener('transitionend', function handler(){
-          el.style.transition = '';
-          el.style.transform = '';
-          el.removeEventListener('transitionend', handler);
-        });
-      }
-    });
-  }
+@app.get("/tasks/<int:task_id>/detail")
+def task_detail(task_id):
+    # 一覧の「more」から共通モーダルに差し込む detail の全文（読み取り専用。全タスクの一覧と同じく他人のタスクも見られる）
+    t = Task.query.get_or_404(task_id)
+    return render_template("task_detail.html", t=t)
 
-  // ページ読み込み時に現在の選択に合わせてクライアントでソート
-  document.addEventListener('DOMContentLoaded', () => {
-    const sel = document.getElementById('sortSelect');
-    if(sel && sel.value) sortTasks(sel.value);
-  });
-</script>
-</body>
-</html>
-"""
+@app.get("/tasks/<int:task_id>/item")
+def task_item(task_id):
+    # ライブ更新用: クエリ文字列の絞り込みに一致すれば一覧の1行を返し、一致しなければ（削除済みも）204
+    q = build_task_query(
+        request.args.get("view_mode", "personal"), request.args.get("status"), request.args.get("priority"),
+        None, session.get("user_id"), (request.args.get("q") or "").strip(),
+    )
+    row = board_rows(q).order_by(None).filter(Task.id == task_id).first()
+    if row is None:
+        return "", 204
+    t = TaskRow._make(row)
+    owners = user_cache.owner_emails([t.user_id]) if request.args.get("view_mode") == "all" else None
+    return render_template("_task_item.html", t=t, today=date.today(), owners=owners)
 
 if __name__ == "__main__":
+    # 開発用サーバー。手元で試しやすいよう init-db も済ませてから起動する
+    with app.app_context():
+        migrations.init_db()
     app.run(debug=True)
@@ -0,0 +1,64 @@
+"""
+古い done のタスクのアーカイブ（flask --app app archive-tasks --days N）。
+
+done にしてから N 日より経ったタスク（Task.done_at）を task_archive（models.ArchivedTask）に移し、task から消す。
+作成が古くても done にしたばかりのタスクは移さない。一覧のクエリ・インデックスは task だけを読むので、
+完了済みのタスクがたまっても一覧が重くならない。
+ARCHIVE_BATCH_SIZE 件ずつ INSERT ... SELECT と DELETE を1トランザクションで行うので書き込みのロックは短く、
+途中で止めても移した分は整合している。削除はライブ更新（task_event）と一覧の変更カウンタにも反映する。
+
+アーカイブしたタスクは一覧に archived=1 を付けたときだけ、別枠に新しい順で表示する
+（view_mode・status・priority・検索語は一覧と同じように効く）。
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, literal, select
+
+from board import PRIORITIES, STATUSES, bulk_delete
+from board_cache import bump_versions
+from models import db, Task, ArchivedTask, PRIORITY_RANK
+from search import apply_search
+
+ARCHIVE_BATCH_SIZE = 5000  # 1トランザクションで移す件数
+# task からそのまま写す列
+COLUMNS = [
+  "user_id", "title", "detail", "priority", "priority_rank", "status", "due_date", "due_sort", "created_at", "done_at",
+]
+
+
+def archive_tasks(days, batch_size=ARCHIVE_BATCH_SIZE, now=None):
+  """done にしてから days 日より経ったタスクを移す（commit する）。戻り値は移した件数"""
+  now = now or datetime.now()
+  cutoff = now - timedelta(days=days)
+  archived = 0
+  while True:
+    # ix_task_status_done の範囲を読む
+    ids = db.session.execute(
+      select(Task.id).where(Task.status == "done", Task.done_at < cutoff).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+      return archived
+    target = Task.query.filter(Task.id.in_(ids))
+    db.session.execute(insert(ArchivedTask).from_select(
+      ["task_id", *COLUMNS, "archived_at"],
+      select(Task.id, *[getattr(Task, c) for c in COLUMNS], literal(now)).where(Task.id.in_(ids)),
+    ))
+    owners = [user_id for (user_id,) in target.with_entities(Task.user_id).distinct()]
+    bulk_delete(target)
+    bump_versions(owners)
+    db.session.commit()
+    archived += len(ids)
+
+
+def archived_query(view_mode, status, priority, user_id, search=None):
+  """アーカイブの一覧（新しい順）。絞り込みは一覧（build_task_query）と同じ"""
+  q = ArchivedTask.query.order_by(ArchivedTask.created_at.desc(), ArchivedTask.id.desc())
+  if view_mode == "personal" and user_id:
+    q = q.filter_by(user_id=user_id)
+  if status in STATUSES:
+    q = q.filter_by(status=status)
+  if priority in PRIORITIES:
+    q = q.filter_by(priority_rank=PRIORITY_RANK[priority])
+  if search:
+    q = apply_search(q, search, model=ArchivedTask)
+  return q
@@ -0,0 +1,268 @@
+"""
+ASGI で動かすためのエントリポイント。
+
+  pip install uvicorn aiosqlite greenlet
+  uvicorn asgi:application --workers 4
+
+ルート（Blueprint・require_login など）は WSGI と同じものをそのまま使う。
+各リクエストは AsyncSession.run_sync の中（greenlet）で Flask の wsgi_app として処理し、
+db.session の代わりにそのリクエスト用のセッションを使わせるので、クエリは非同期ドライバで実行され、
+DB を待つ間も同じワーカーの他のリクエストを処理できる。
+/events（Server-Sent Events）はイベントループ上で直接配信し、接続ごとにスレッドを使わない。
+
+接続先・プール設定は WSGI と同じ（db_config.py。非同期ドライバは db_config.ASYNC_DRIVERS）。
+インメモリ SQLite は使えない。
+"""
+import asyncio
+import io
+import queue
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+from werkzeug.exceptions import HTTPException
+
+import db_config
+import events
+import instrumentation
+import sqlite_tuning
+import user_cache
+from app import app
+from models import db
+from concurrency import in_async_request
+from events import REPLAY_LIMIT, get_broker
+from live import HEADERS, KEEPALIVE, RELOAD, EventStream
+
+STREAM_ENDPOINT = "live.stream"
+
+# 処理中のリクエストのセッション（db.session はこれを返す）
+_request_session = ContextVar("request_session", default=None)
+
+
+class RequestSession(Session):
+  """ASGI モードで1リクエストの間 db.session として使うセッション（AsyncSession の同期側）"""
+
+
+events.listen(RequestSession)
+user_cache.listen(RequestSession)
+
+
+def build_environ(scope, body):
+  """ASGI の http scope から WSGI の environ を作る"""
+  server = scope.get("server") or ("localhost", 80)
+  environ = {
+    "REQUEST_METHOD": scope["method"],
+    "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+    "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+    "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+    "SERVER_NAME": server[0],
+    "SERVER_PORT": str(server[1] or 80),
+    "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+    "wsgi.version": (1, 0),
+    "wsgi.url_scheme": scope.get("scheme", "http"),
+    "wsgi.input": io.BytesIO(body),
+    "wsgi.input_terminated": True,  # 本文は読み終えてから渡す（Content-Length がなくても読める）
+    "wsgi.errors": sys.stderr,
+    "wsgi.multithread": True,
+    "wsgi.multiprocess": True,
+    "wsgi.run_once": False,
+  }
+  if scope.get("client"):
+    environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = scope["client"][0], str(scope["client"][1])
+  for name, value in scope.get("headers", []):
+    name = name.decode("latin-1").upper().replace("-", "_")
+    value = value.decode("latin-1")
+    if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+      environ[name] = value
+      continue
+    key = f"HTTP_{name}"
+    environ[key] = f"{environ[key]},{value}" if key in environ else value
+  return environ
+
+
+async def read_body(receive):
+  body = b""
+  while True:
+    message = await receive()
+    if message["type"] == "http.disconnect":
+      break
+    body += message.get("body", b"")
+    if not message.get("more_body"):
+      break
+  return body
+
+
+class BoardASGI:
+  def __init__(self, flask_app, db):
+    self.flask_app = flask_app
+    with flask_app.app_context():
+      self.sync_engine = db.engine
+      self.engines = {}
+      for key, engine in db.engines.items():
+        options = flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"] if key is None else flask_app.config["SQLALCHEMY_BINDS"][key]
+        options = {} if isinstance(options, str) else {k: v for k, v in options.items() if k != "url"}
+        self.engines[key] = create_async_engine(db_config.async_url(engine.url), **options)
+        sqlite_tuning.install(self.engines[key].sync_engine, flask_app.config.get("SQLITE_PRAGMAS"))
+        if flask_app.config["INSTRUMENTATION_ENABLED"]:
+          instrumentation.install(self.engines[key].sync_engine, flask_app)
+    # テーブルごとの接続先（bind_key のないモデルは既定のエンジン）
+    self.binds = {
+      table: self.engines[key] for key, metadata in db.metadatas.items() for table in metadata.tables.values()
+    }
+    self.query_cls = db.Query
+    # db.session は処理中のリクエストのセッションがあればそれを使う（なければ通常どおり同期エンジン）
+    create = db.session.registry.createfunc
+
+    def createfunc():
+      session = _request_session.get()
+      return session if session is not None else create()
+
+    db.session.registry.createfunc = createfunc
+
+  def session(self):
+    return AsyncSession(
+      bind=self.engines[None], binds=self.binds, sync_session_class=RequestSession, query_cls=self.query_cls,
+    )
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] == "lifespan":
+      await self.lifespan(receive, send)
+    elif scope["type"] == "http":
+      environ = build_environ(scope, b"")
+      if self.endpoint(environ) == STREAM_ENDPOINT:
+        await self.stream(environ, receive, send)
+      else:
+        environ["wsgi.input"] = io.BytesIO(await read_body(receive))
+        await self.dispatch(environ, send)
+    else:
+      raise ValueError(f"Unsupported ASGI scope type: {scope['type']!r}")
+
+  async def lifespan(self, receive, send):
+    while True:
+      message = await receive()
+      if message["type"] == "lifespan.startup":
+        await send({"type": "lifespan.startup.complete"})
+      elif message["type"] == "lifespan.shutdown":
+        for engine in self.engines.values():
+          await engine.dispose()
+        await send({"type": "lifespan.shutdown.complete"})
+        return
+
+  def endpoint(self, environ):
+    try:
+      endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+      return None
+    return endpoint
+
+  @contextmanager
+  def request_session(self, sync_session):
+    session_token = _request_session.set(sync_session)
+    async_token = in_async_request.set(True)
+    try:
+      yield
+    finally:
+      in_async_request.reset(async_token)
+      _request_session.reset(session_token)
+
+  async def dispatch(self, environ, send):
+    async with self.session() as session:
+      await session.run_sync(self.run_wsgi, environ, send)
+
+  def run_wsgi(self, sync_session, environ, send):
+    """Flask の wsgi_app でリクエストを処理して送る（run_sync の中で呼ばれる）"""
+    start = {}
+
+    def start_response(status, headers, exc_info=None):
+      start["status"] = int(status.split(" ", 1)[0])
+      start["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+    with self.request_session(sync_session):
+      body = self.flask_app.wsgi_app(environ, start_response)
+      try:
+        await_only(send({"type": "http.response.start", **start}))
+        for chunk in body:
+          if chunk:
+            await_only(send({"type": "http.response.body", "body": chunk, "more_body": True}))
+        await_only(send({"type": "http.response.body", "body": b""}))
+      finally:
+        if hasattr(body, "close"):
+          body.close()
+
+  def open_stream(self, sync_session, environ):
+    """require_login などを通してから EventStream を作る（通らなければ None）"""
+    with self.request_session(sync_session), self.flask_app.request_context(environ):
+      if self.flask_app.preprocess_request() is not None:
+        return None
+      return EventStream.from_request()
+
+  async def stream(self, environ, receive, send):
+    """GET /events をイベントループ上で配信する（live.stream と同じ内容）"""
+    async with self.session() as session:
+      stream = await session.run_sync(self.open_stream, environ)
+    if stream is None:
+      await self.dispatch(environ, send)  # ログイン画面へのリダイレクトなどは通常の処理に任せる
+      return
+
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    broker = get_broker(self.flask_app)
+    # 購読を始めてから送り直し分を読む（間のイベントは id で重複を除く）
+    sub = broker.subscribe(self.sync_engine, on_event=lambda: loop.call_soon_threadsafe(ready.set))
+    disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+
+    async def write(text):
+      await send({"type": "http.response.body", "body": text.encode(), "more_body": True})
+
+    try:
+      await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream; charset=utf-8"),
+        *[(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in HEADERS.items()],
+      ]})
+      await write(stream.opening())
+      if stream.after is not None:
+        rows = await asyncio.to_thread(broker.events_after, stream.after, REPLAY_LIMIT)
+        for message in stream.replay(rows):
+          await write(message)
+          if message == RELOAD:
+            return
+      while True:
+        waiter = asyncio.ensure_future(ready.wait())
+        done, _ = await asyncio.wait(
+          {waiter, disconnected}, timeout=stream.keepalive, return_when=asyncio.FIRST_COMPLETED,
+        )
+        waiter.cancel()
+        if disconnected in done:
+          return
+        if waiter not in done:
+          await write(KEEPALIVE)
+          continue
+        ready.clear()
+        if sub.overflowed:
+          await write(RELOAD)
+          return
+        while True:
+          try:
+            row = sub.queue.get_nowait()
+          except queue.Empty:
+            break
+          message = stream.message(row)
+          if message:
+            await write(message)
+    finally:
+      broker.unsubscribe(sub)
+      client_gone = disconnected.done()
+      disconnected.cancel()
+      if not client_gone:
+        await send({"type": "http.response.body", "body": b""})
+
+  @staticmethod
+  async def wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+      pass
+
+
+application = BoardASGI(app, db)
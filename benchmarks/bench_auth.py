@@ -0,0 +1,105 @@
+"""
+登録・ログインのスループット（同時接続）をユーザーキャッシュの有無で比べる。
+
+gunicorn（gthread、1ワーカー）を起動し、--clients 本の接続で
+  register : 重複しないメールアドレスで POST /register を送り続ける
+  login    : 登録済みの --users 人のうちランダムに POST /login を送り続ける
+ハッシュ計算の時間で DB の差が隠れないよう、既定ではコストの低い PASSWORD_HASH_METHOD を
+リクエストのスレッドで計算する（PASSWORD_HASH_WORKERS=0）。
+  pip install gunicorn
+  python benchmarks/bench_auth.py [--clients 16] [--users 200] [--duration 8] [--hash-method pbkdf2:sha256:1000]
+"""
+import argparse
+import asyncio
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from load_test_asgi import Connection, free_port, seed, start_server  # noqa: E402
+
+FORM = "application/x-www-form-urlencoded"
+
+MODES = {
+  "no cache": {"USER_CACHE_TTL": "0"},
+  "cache": {"USER_CACHE_TTL": "60"},
+}
+
+
+def form(email):
+  return f"email={email}&password=pw&password2=pw".encode()
+
+
+async def drive(port, clients, duration, make_request):
+  """clients 本の接続で make_request(rng) の (path, body) を送り続け、(req/s, ステータス別件数) を返す"""
+  statuses = Counter()
+  stop_at = time.monotonic() + duration
+
+  async def client(seed):
+    rng = random.Random(seed)
+    conn = Connection(port)
+    await conn.open()
+    try:
+      while time.monotonic() < stop_at:
+        path, body = make_request(rng)
+        status, _, _ = await conn.request("POST", path, body, FORM)
+        statuses[status] += 1
+    finally:
+      conn.close()
+
+  start = time.perf_counter()
+  await asyncio.gather(*[client(i) for i in range(clients)])
+  return sum(statuses.values()) / (time.perf_counter() - start), statuses
+
+
+async def run(port, args):
+  counter = iter(range(10 ** 9))
+  register_rps, register_statuses = await drive(
+    port, args.clients, args.duration, lambda rng: ("/register", form(f"user{next(counter)}%40example.com")),
+  )
+  # login は先頭の --users 人（register で作成済み）から選ぶ
+  users = min(args.users, register_statuses[302])
+  login_rps, login_statuses = await drive(
+    port, args.clients, args.duration, lambda rng: ("/login", form(f"user{rng.randrange(users)}%40example.com")),
+  )
+  return register_rps, register_statuses, login_rps, login_statuses
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--clients", type=int, default=16)
+  parser.add_argument("--users", type=int, default=200)
+  parser.add_argument("--duration", type=float, default=8)
+  parser.add_argument("--hash-method", default="pbkdf2:sha256:1000")
+  parser.add_argument("--threads", type=int, default=32)
+  args = parser.parse_args()
+  args.workers = 1
+
+  print(f"clients: {args.clients}, login users: {args.users}, duration: {args.duration}s, hash: {args.hash_method}")
+  print(f"{'mode':<10}{'register/s':>12}{'login/s':>10}  statuses")
+  for mode, env in MODES.items():
+    workdir = tempfile.mkdtemp()
+    try:
+      seed(workdir, 0)
+      port = free_port()
+      proc = start_server("wsgi", workdir, port, args, {
+        **env, "PASSWORD_HASH_METHOD": args.hash_method, "PASSWORD_HASH_WORKERS": "0",
+      })
+      try:
+        register_rps, register_statuses, login_rps, login_statuses = asyncio.run(run(port, args))
+      finally:
+        proc.terminate()
+        proc.wait()
+      print(f"{mode:<10}{register_rps:>12.1f}{login_rps:>10.1f}  "
+            f"register {dict(register_statuses)}, login {dict(login_statuses)}")
+    finally:
+      shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+  main()
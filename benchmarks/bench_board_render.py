@@ -0,0 +1,63 @@
+"""
+一覧テンプレートのレスポンスサイズとレンダリング時間を測る。
+
+DBは使わず、メモリ上の Task を N 件作って index() と同じ引数で index.html を描画する。
+  python benchmarks/bench_board_render.py [件数] [繰り返し回数]
+"""
+import statistics
+import sys
+import time
+from datetime import datetime, date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from flask import render_template  # noqa: E402
+
+import app as app_module  # noqa: E402
+from models import Task  # noqa: E402
+
+
+def make_tasks(n):
+  base = datetime(2024, 1, 1)
+  return [
+    Task(
+      id=i + 1,
+      user_id=1,
+      title=f"Task {i}",
+      detail=f"detail of task {i}" if i % 2 else "",
+      priority=app_module.PRIORITIES[i % 3],
+      status=app_module.STATUSES[i % 3],
+      due_date=base + timedelta(days=i % 60) if i % 4 else None,
+      created_at=base + timedelta(minutes=i),
+    )
+    for i in range(n)
+  ]
+
+
+def main():
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+  repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+  tasks = make_tasks(n)
+  app = app_module.app
+
+  timings = []
+  with app.test_request_context("/"):
+    for _ in range(repeat):
+      start = time.perf_counter()
+      html = render_template(
+        "index.html", tasks=tasks, next_url=None,
+        status=None, priority=None, view_mode="personal",
+        sort_by="Created At (Newest First)", SORT_OPTIONS=app_module.SORT_OPTIONS,
+        today=date.today(),
+        PRIORITIES=app_module.PRIORITIES, STATUSES=app_module.STATUSES,
+      )
+      timings.append(time.perf_counter() - start)
+
+  print(f"tasks: {n}")
+  print(f"size:  {len(html.encode()) / 1024:.1f} KiB")
+  print(f"render (median of {repeat}): {statistics.median(timings) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+  main()
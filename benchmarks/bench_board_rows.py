@@ -0,0 +1,110 @@
+"""
+一覧の読み取りを、ORM の Task を作る読み方と board_rows（列だけの TaskRow）で比べる。
+
+一時ファイルの SQLite に datagen.py と同じ分布の N 件（既定 10万件）を入れ、--long-details の割合のタスクの
+detail を 2000 文字にしてから、index() と同じ並べ替えで先頭 --rows 件（既定 1万件）を読んで TaskRow にする。
+  ORM       : Task を読み込んで（identity map・変更追跡つき）属性から TaskRow を作る（以前の index()）
+  board_rows: 必要な列と detail の先頭 DETAIL_PREVIEW_LENGTH 文字だけを SELECT して TaskRow._make
+について、1万件あたりの時間（中央値）と Python のメモリ（ピーク、読み終えて残る量）を表示する。
+  python benchmarks/bench_board_rows.py [--tasks 100000] [--rows 10000] [--repeat 5] [--long-details 0.1]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# app を import する前に接続先を一時ファイルにする
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/tasks.db"
+os.environ["USERS_DATABASE_URL"] = f"sqlite:///{workdir}/users.db"
+
+from sqlalchemy import text  # noqa: E402
+
+import datagen  # noqa: E402
+import app as app_module  # noqa: E402
+from board import TaskRow, board_rows, build_task_query  # noqa: E402
+from models import db  # noqa: E402
+
+LONG_DETAIL_CHARS = 2000
+SORTS = ["Created At (Newest First)", "Priority", "Due Date"]
+
+
+def orm_rows(q, n):
+  return [
+    TaskRow(*(getattr(t, name) for name in TaskRow._fields[:-1]), False)
+    for t in q.limit(n).all()
+  ]
+
+
+def tuple_rows(q, n):
+  return [TaskRow._make(row) for row in board_rows(q).limit(n)]
+
+
+def measure(read, sort_by, n, repeat):
+  """(1万件あたりの ms の中央値, ピークの MB, 残る MB)"""
+  def run():
+    q = build_task_query("all", None, None, sort_by, None)
+    return read(q, n)
+
+  timings = []
+  for _ in range(repeat):
+    db.session.remove()  # identity map を持ち越さない
+    start = time.perf_counter()
+    rows = run()
+    timings.append(time.perf_counter() - start)
+    del rows
+  db.session.remove()
+  tracemalloc.start()
+  rows = run()
+  retained = tracemalloc.get_traced_memory()[0]
+  db.session.remove()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  del rows
+  per_10k = 10000 / n
+  return statistics.median(timings) * 1000 * per_10k, peak / 1024 / 1024 * per_10k, retained / 1024 / 1024 * per_10k
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--tasks", type=int, default=100_000)
+  parser.add_argument("--rows", type=int, default=10_000)
+  parser.add_argument("--repeat", type=int, default=5)
+  parser.add_argument("--long-details", type=float, default=0.1, help=f"detail を {LONG_DETAIL_CHARS} 文字にするタスクの割合")
+  args = parser.parse_args()
+
+  try:
+    with app_module.app.app_context():
+      app_module.migrations.init_db()
+      datagen.populate(args.tasks, 1000)
+      if args.long_details:
+        every = max(int(1 / args.long_details), 1)
+        db.session.execute(
+          text("UPDATE task SET detail = substr(detail || ' ' || :pad, 1, :chars) WHERE id % :every = 0"),
+          {"pad": "lorem ipsum " * (LONG_DETAIL_CHARS // 12 + 1), "chars": LONG_DETAIL_CHARS, "every": every},
+        )
+        db.session.commit()
+
+      print(f"tasks: {args.tasks}, rows read: {args.rows}, long details: {args.long_details:.0%}  (per 10k rows)")
+      print(f"{'sort_by':<28}{'path':<12}{'time':>10}{'peak':>10}{'retained':>10}")
+      for sort_by in SORTS:
+        for name, read in (("ORM", orm_rows), ("board_rows", tuple_rows)):
+          ms, peak, retained = measure(read, sort_by, args.rows, args.repeat)
+          print(f"{sort_by:<28}{name:<12}{ms:>8.1f}ms{peak:>8.1f}MB{retained:>8.1f}MB")
+      db.session.remove()
+      for engine in db.engines.values():
+        engine.dispose()
+  finally:
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+  main()
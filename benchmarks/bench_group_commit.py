@@ -0,0 +1,135 @@
+"""
+状態の変更（POST /tasks/<id>/status）を同時に大勢で行ったときの、グループコミット（group_commit.py）の有無の比較。
+
+一時ファイルの SQLite に書き込み手ごとのタスクを作り、--writers のスレッド（既定 50 と 200）が
+それぞれ自分のタスクの状態を --writes 回ずつ切り替える（応答を受け取ってから次を送る）。
+  direct      : リクエストごとに commit（GROUP_COMMIT_ENABLED=0、既定）
+  group-commit: 書き込みスレッドが GROUP_COMMIT_WINDOW_MS の間に届いたものをまとめて commit
+について、応答した書き込みの数/秒、DB の commit の数/秒、応答時間の p50 / p99 を表示する。
+--synchronous FULL で commit ごとに fsync する（電源断でも応答済みの変更を失わない）設定でも比べられる。
+  python benchmarks/bench_group_commit.py [--writers 50 200] [--writes 20] [--window-ms 2] [--synchronous NORMAL]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--writers", type=int, nargs="+", default=[50, 200])
+parser.add_argument("--writes", type=int, default=20, help="1スレッドあたりの状態の変更の回数")
+parser.add_argument("--window-ms", type=float, default=2)
+parser.add_argument("--synchronous", default="NORMAL", choices=["NORMAL", "FULL"])
+args = parser.parse_args()
+
+# app を import する前に接続先を一時ファイルにし、書き込み手がプールの接続を待たないようにする
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/tasks.db"
+os.environ["USERS_DATABASE_URL"] = f"sqlite:///{workdir}/users.db"
+os.environ["DB_POOL_SIZE"] = str(max(args.writers) + 5)
+os.environ["DB_MAX_OVERFLOW"] = "0"
+
+from sqlalchemy import event  # noqa: E402
+
+import app as app_module  # noqa: E402
+import group_commit  # noqa: E402
+from models import db, Task  # noqa: E402
+
+STATUSES = ["doing", "done", "todo"]
+TASKS_PER_WRITER = 5
+
+
+def seed(writers):
+  """書き込み手（user_id = 1..writers）ごとに TASKS_PER_WRITER 件。戻り値は user_id -> タスクの id"""
+  with app_module.app.app_context():
+    tasks = [Task(title=f"task {u}-{i}", user_id=u) for u in range(1, writers + 1) for i in range(TASKS_PER_WRITER)]
+    db.session.add_all(tasks)
+    db.session.commit()
+    owned = {}
+    for t in tasks:
+      owned.setdefault(t.user_id, []).append(t.id)
+    return owned
+
+
+def run(owned, writes):
+  """全スレッドが書き終えるまでの (秒数, 応答時間のリスト, エラー数)"""
+  app = app_module.app
+  latencies = []
+  errors = []
+  start = threading.Barrier(len(owned) + 1)
+
+  def writer(user_id, ids):
+    with app.test_client() as client:
+      with client.session_transaction() as sess:
+        sess["logged_in"] = True
+        sess["user_id"] = user_id
+      mine = []
+      start.wait()
+      for n in range(writes):
+        began = time.perf_counter()
+        res = client.post(f"/tasks/{ids[n % len(ids)]}/status", data={"status": STATUSES[n % 3]},
+                          headers={"Accept": "application/json"})
+        mine.append(time.perf_counter() - began)
+        if res.status_code != 200:
+          errors.append(res.status_code)
+      latencies.extend(mine)
+
+  threads = [threading.Thread(target=writer, args=item) for item in owned.items()]
+  for t in threads:
+    t.start()
+  start.wait()
+  began = time.perf_counter()
+  for t in threads:
+    t.join()
+  return time.perf_counter() - began, latencies, len(errors)
+
+
+def percentile(values, p):
+  values = sorted(values)
+  return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def main():
+  app = app_module.app
+  app.config["SQLITE_PRAGMAS"]["synchronous"] = args.synchronous  # 最初の接続より前（接続時に適用される）
+  app.logger.disabled = True  # ロック待ちの失敗（database is locked）は errors の列で数える
+  try:
+    with app.app_context():
+      app_module.migrations.init_db()
+      engine = db.engine
+    commits = [0]
+    event.listen(engine, "commit", lambda conn: commits.__setitem__(0, commits[0] + 1))
+
+    print(f"synchronous={args.synchronous}, {args.writes} writes per writer, window {args.window_ms}ms")
+    print(f"{'writers':>8}  {'mode':<13}{'writes/s':>10}{'commits/s':>11}{'p50':>9}{'p99':>9}{'errors':>8}")
+    for writers in args.writers:
+      owned = seed(writers)
+      for mode in ("direct", "group-commit"):
+        pipeline = None
+        if mode == "group-commit":
+          pipeline = group_commit.WritePipeline(app, window=args.window_ms / 1000, max_pending=writers * 2)
+        app.extensions["group_commit"] = pipeline
+        commits[0] = 0
+        seconds, latencies, errors = run(owned, args.writes)
+        if pipeline is not None:
+          pipeline.shutdown()
+        print(
+          f"{writers:>8}  {mode:<13}{len(latencies) / seconds:>10.0f}{commits[0] / seconds:>11.0f}"
+          f"{percentile(latencies, 0.5) * 1000:>7.1f}ms{percentile(latencies, 0.99) * 1000:>7.1f}ms{errors:>8}"
+        )
+    app.extensions["group_commit"] = None
+    with app.app_context():
+      db.session.remove()
+      for engine in db.engines.values():
+        engine.dispose()
+  finally:
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+  main()
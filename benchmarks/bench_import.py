@@ -0,0 +1,145 @@
+"""
+タスクの取り込み（transfer.import_tasks）とエクスポートの速さを測る。
+
+一時ファイルの SQLite に、datagen.py と同じ分布の N 件（既定 20万件）の CSV を取り込み、
+  POST /tasks       : 1件ずつ画面のフォームから作る（比較用。--per-row 件だけ）
+  import            : CSV を読んで IMPORT_BATCH_SIZE 行ごとに INSERT・commit
+  sqlite3 floor     : 同じスキーマ（索引・全文検索のトリガーつき）に sqlite3 で直接 INSERT した上限の目安
+  export csv/ndjson : 取り込んだ全件をストリーミングで書き出す
+の 1秒あたりの行数を表示する。
+  python benchmarks/bench_import.py [--tasks 200000] [--per-row 2000]
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# app を import する前に接続先を一時ファイルにする
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/tasks.db"
+os.environ["USERS_DATABASE_URL"] = f"sqlite:///{workdir}/users.db"
+
+import datagen  # noqa: E402
+import app as app_module  # noqa: E402
+import transfer  # noqa: E402
+from models import db  # noqa: E402
+
+COLUMNS = ["title", "detail", "priority", "status", "due_date", "created_at"]
+
+
+def write_csv(path, n):
+  rows = datagen.task_rows(random.Random(0), n, 1000, 730, datetime.now())
+  with open(path, "w", newline="", encoding="utf-8") as f:
+    writer = csv.writer(f)
+    writer.writerow(COLUMNS)
+    for row in rows:
+      writer.writerow([transfer.value_text(row[c]) for c in COLUMNS])
+
+
+def per_row(n, path):
+  client = app_module.app.test_client()
+  with client.session_transaction() as sess:
+    sess["logged_in"] = True
+    sess["user_id"] = 2
+  with open(path, newline="", encoding="utf-8") as f:
+    rows = [row for _, row in zip(range(n), csv.DictReader(f))]
+  start = time.perf_counter()
+  for row in rows:
+    client.post("/tasks", data={"title": row["title"], "detail": row["detail"], "priority": row["priority"],
+                                "due_date": row["due_date"][:10]})
+  return n / (time.perf_counter() - start)
+
+
+def import_file(path):
+  start = time.perf_counter()
+  with open(path, "rb") as f:
+    result = transfer.import_tasks(transfer.parse_csv(f), 1)
+  assert result.failed == 0, result.errors[:3]
+  return result.imported / (time.perf_counter() - start)
+
+
+def sqlite_floor(copy, n):
+  """同じスキーマの空の DB（copy）に、値の変換・検証なしで複数行の INSERT をした速さ"""
+  conn = sqlite3.connect(copy)
+  for name, value in app_module.app.config["SQLITE_PRAGMAS"].items():
+    conn.execute(f"PRAGMA {name} = {value}")
+  names = ["user_id", "title", "detail", "priority", "priority_rank", "status", "due_date", "due_sort", "created_at"]
+  rows = [tuple(str(v) if isinstance(v, datetime) else v for v in (row[c] for c in names))
+          for row in datagen.task_rows(random.Random(0), n, 1000, 730, datetime.now())]
+  per_statement = 1000
+  sql = f"INSERT INTO task ({', '.join(names)}) VALUES "
+  start = time.perf_counter()
+  for batch_start in range(0, n, transfer.IMPORT_BATCH_SIZE):
+    batch = rows[batch_start:batch_start + transfer.IMPORT_BATCH_SIZE]
+    for i in range(0, len(batch), per_statement):
+      part = batch[i:i + per_statement]
+      conn.execute(sql + ", ".join([f"({', '.join('?' * len(names))})"] * len(part)), [v for row in part for v in row])
+    conn.commit()
+  rate = n / (time.perf_counter() - start)
+  conn.close()
+  return rate
+
+
+def export(fmt):
+  """(1秒あたりの行数, Python のメモリのピーク（MB）)。ピークは tracemalloc をつけてもう一度書き出して測る"""
+  def run():
+    rows = transfer.export_rows("personal", None, None, "Created At (Newest First)", 1)
+    count = 0
+    with open(os.devnull, "w") as out:
+      for chunk in transfer.export_chunks(fmt, rows):
+        out.write(chunk)
+        count += chunk.count("\n")
+    return count
+
+  start = time.perf_counter()
+  rate = run() / (time.perf_counter() - start)
+  tracemalloc.start()
+  run()
+  peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+  tracemalloc.stop()
+  return rate, peak
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--tasks", type=int, default=200_000)
+  parser.add_argument("--per-row", type=int, default=2000, help="比較用に POST /tasks で1件ずつ作る件数")
+  args = parser.parse_args()
+
+  path = Path(workdir) / "tasks.csv"
+  write_csv(path, args.tasks)
+  # スキーマだけ作った状態を残しておく（WAL の分も含めて backup でコピーする）
+  with app_module.app.app_context():
+    app_module.migrations.init_db()
+  empty = Path(workdir) / "floor.db"
+  with sqlite3.connect(Path(workdir) / "tasks.db") as source, sqlite3.connect(empty) as target:
+    source.backup(target)
+  try:
+    with app_module.app.app_context():
+      print(f"tasks: {args.tasks}")
+      print(f"{'POST /tasks (per row)':<24}{per_row(args.per_row, path):>10.0f} rows/s")
+      print(f"{'import':<24}{import_file(path):>10.0f} rows/s")
+      for fmt in ("csv", "ndjson"):
+        rate, peak = export(fmt)
+        print(f"{'export ' + fmt:<24}{rate:>10.0f} rows/s  (peak Python memory {peak:.1f} MB)")
+      print(f"{'sqlite3 floor':<24}{sqlite_floor(empty, args.tasks):>10.0f} rows/s")
+      db.session.remove()
+      for engine in db.engines.values():
+        engine.dispose()
+  finally:
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,117 @@
+"""
+ログインが集中している間の一覧の応答時間を、パスワードのハッシュ計算の実行場所ごとに比べる。
+
+  inline : リクエストのスレッドで計算する（PASSWORD_HASH_WORKERS=0）
+  pool   : プロセスプールで計算し、満杯なら 503 を返す（passwords.py）
+
+gunicorn（gthread、1ワーカー）を起動し、一覧（GET /?view_mode=all）を送り続けるクライアントと、
+POST /login を送り続けるクライアントを同時に動かす。
+  pip install gunicorn
+  python benchmarks/bench_login_storm.py [--tasks 20000] [--board-clients 4] [--login-clients 32] [--duration 10]
+"""
+import argparse
+import asyncio
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from load_test_asgi import Connection, free_port, login, seed, start_server  # noqa: E402
+
+FORM = "application/x-www-form-urlencoded"
+LOGIN = b"email=load%40example.com&password=pw"
+
+MODES = {
+  "inline": {"PASSWORD_HASH_WORKERS": "0"},
+  "pool": {"PASSWORD_HASH_WORKERS": "1", "PASSWORD_HASH_MAX_PENDING": "4"},
+}
+
+
+async def board_client(port, cookie, stop_at, latencies, timeout):
+  conn = Connection(port, cookie)
+  await conn.open()
+  try:
+    while time.monotonic() < stop_at:
+      start = time.perf_counter()
+      try:
+        await asyncio.wait_for(conn.request("GET", "/?view_mode=all"), timeout)
+      except (asyncio.TimeoutError, ConnectionError):
+        latencies.append(timeout)
+        conn.close()
+        await conn.open()
+        continue
+      latencies.append(time.perf_counter() - start)
+  finally:
+    conn.close()
+
+
+async def login_client(port, stop_at, statuses, timeout):
+  conn = Connection(port)
+  await conn.open()
+  try:
+    while time.monotonic() < stop_at:
+      try:
+        status, headers, _ = await asyncio.wait_for(conn.request("POST", "/login", LOGIN, FORM), timeout)
+      except (asyncio.TimeoutError, ConnectionError):
+        statuses["error"] += 1
+        conn.close()
+        await conn.open()
+        continue
+      statuses[status] += 1
+      if status == 503:
+        await asyncio.sleep(float(headers.get("retry-after", 1)))
+  finally:
+    conn.close()
+
+
+async def run(port, args):
+  cookie = await login(port)
+  stop_at = time.monotonic() + args.duration
+  latencies, statuses = [], Counter()
+  await asyncio.gather(
+    *[board_client(port, cookie, stop_at, latencies, args.timeout) for _ in range(args.board_clients)],
+    *[login_client(port, stop_at, statuses, args.timeout) for _ in range(args.login_clients)],
+  )
+  latencies.sort()
+  return latencies, statuses
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--tasks", type=int, default=20_000)
+  parser.add_argument("--board-clients", type=int, default=4)
+  parser.add_argument("--login-clients", type=int, default=32)
+  parser.add_argument("--duration", type=float, default=10)
+  parser.add_argument("--timeout", type=float, default=10)
+  parser.add_argument("--threads", type=int, default=32)
+  args = parser.parse_args()
+  args.workers = 1
+
+  print(f"tasks: {args.tasks}, board clients: {args.board_clients}, login clients: {args.login_clients}, "
+        f"duration: {args.duration}s")
+  print(f"{'mode':<8}{'board req':>10}{'p50':>10}{'p99':>10}  logins")
+  for mode, env in MODES.items():
+    workdir = tempfile.mkdtemp()
+    try:
+      seed(workdir, args.tasks)
+      port = free_port()
+      proc = start_server("wsgi", workdir, port, args, env)
+      try:
+        latencies, statuses = asyncio.run(run(port, args))
+      finally:
+        proc.terminate()
+        proc.wait()
+      p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+      print(f"{mode:<8}{len(latencies):>10}{statistics.median(latencies) * 1000:>8.1f}ms{p99 * 1000:>8.1f}ms  "
+            + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+    finally:
+      shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,120 @@
+"""
+全文検索（FTS5）と LIKE '%語%' の検索時間を比べる。
+
+一時ファイルの SQLite に合成タスクを N 件（既定 100万件）入れ、index() と同じクエリ
+（build_task_query + 上位 SEARCH_RESULT_LIMIT 件）で検索する。
+  python benchmarks/bench_search.py [件数] [繰り返し回数]
+"""
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# app を import する前に接続先を一時ファイルにする
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/tasks.db"
+os.environ["USERS_DATABASE_URL"] = f"sqlite:///{workdir}/users.db"
+
+from sqlalchemy import or_  # noqa: E402
+
+import app as app_module  # noqa: E402
+from models import db, Task, PRIORITY_RANK, DUE_DATE_NONE  # noqa: E402
+
+USERS = 100
+CHUNK = 20000
+VOCABULARY_SIZE = 20000
+# 語彙のほかに実際の単語も少し混ぜる（前方一致の確認用）
+WORDS = ["deploy", "invoice", "meeting", "refactor", "report"]
+
+# (名前, 検索語, sort_by, 絞り込み)。LIKE には関連度順がないので Relevance の行は新しい順と比べる
+CASES = [
+  ("common word", "w0", None, {}),
+  ("missing word", "w15000", None, {}),
+  ("prefix", "refac", None, {}),
+  ("two words", "report w3", None, {}),
+  ("common + Priority sort", "w0", "Priority", {}),
+  ("word + status filter", "invoice", None, {"status": "doing"}),
+  ("word + Relevance", "invoice", "Relevance", {}),
+  ("common + Relevance", "w0", "Relevance", {}),
+]
+
+
+def words(rng, n):
+  # Zipf 風の出現頻度（w0 が一番多く、1件の約2割に含まれる）
+  return " ".join(
+    rng.choice(WORDS) if rng.random() < 0.01 else f"w{min(int(rng.paretovariate(1.0) * 20) - 20, VOCABULARY_SIZE - 1)}"
+    for _ in range(n)
+  )
+
+
+def seed(n):
+  rng = random.Random(0)
+  base = datetime(2024, 1, 1)
+  table = Task.__table__
+  with db.engine.begin() as conn:
+    for start in range(0, n, CHUNK):
+      rows = []
+      for i in range(start, min(start + CHUNK, n)):
+        priority = app_module.PRIORITIES[i % 3]
+        due = base + timedelta(days=i % 90) if i % 4 else None
+        rows.append(dict(
+          user_id=i % USERS, title=words(rng, 3), detail=words(rng, 8),
+          priority=priority, priority_rank=PRIORITY_RANK[priority], status=app_module.STATUSES[i % 3],
+          due_date=due, due_sort=due or DUE_DATE_NONE, created_at=base + timedelta(seconds=i),
+        ))
+      conn.execute(table.insert(), rows)  # トリガーで task_fts にも入る
+
+
+def like_query(term_text, sort_by, filters):
+  # 比較用: FTS を使わず title / detail の部分一致で絞り込む
+  if sort_by == app_module.RELEVANCE_SORT:
+    sort_by = None
+  q = app_module.build_task_query("all", filters.get("status"), None, sort_by or "Created At (Newest First)", 1)
+  for term in term_text.split():
+    q = q.filter(or_(Task.title.contains(term), Task.detail.contains(term)))
+  return q
+
+
+def measure(make_query, limit, repeat):
+  timings = []
+  for _ in range(repeat):
+    db.session.expire_all()
+    start = time.perf_counter()
+    rows = make_query().limit(limit).all()
+    timings.append(time.perf_counter() - start)
+  return statistics.median(timings), len(rows)
+
+
+def main():
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+  repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+  app = app_module.app
+  limit = app.config["SEARCH_RESULT_LIMIT"]
+
+  with app.app_context():
+    app_module.migrations.init_db()
+    start = time.perf_counter()
+    seed(n)
+    print(f"tasks: {n} (seed + index: {time.perf_counter() - start:.1f} s)")
+    print(f"{'case':<26}{'FTS5':>12}{'LIKE':>12}{'rows':>6}")
+    for name, text, sort_by, filters in CASES:
+      fts_time, rows = measure(
+        lambda: app_module.build_task_query(
+          "all", filters.get("status"), None, sort_by or "Created At (Newest First)", 1, text,
+        ),
+        limit, repeat,
+      )
+      like_time, _ = measure(lambda: like_query(text, sort_by, filters), limit, repeat)
+      print(f"{name:<26}{fts_time * 1000:>10.1f}ms{like_time * 1000:>10.1f}ms{rows:>6}")
+  shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+  main()
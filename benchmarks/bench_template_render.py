@@ -0,0 +1,65 @@
+"""
+テンプレート1回あたりの描画コストを比較する。
+
+  before: render_template_string（毎回ソースをパース・コンパイル）
+  after : render_template（jinja_env にキャッシュ済みのコンパイル結果を使う）
+あわせて、ワーカー起動直後の初回コンパイルをバイトコードキャッシュで省けるかも測る。
+  python benchmarks/bench_template_render.py [繰り返し回数]
+"""
+import sys
+import tempfile
+import timeit
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from flask import render_template, render_template_string  # noqa: E402
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader  # noqa: E402
+
+import app as app_module  # noqa: E402
+from bench_board_render import make_tasks  # noqa: E402
+
+TEMPLATE_DIR = Path(app_module.app.root_path) / "templates"
+
+
+def per_call_ms(fn, repeat):
+  return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+
+def main():
+  repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+  app = app_module.app
+  index_context = dict(
+    tasks=make_tasks(app.config["TASKS_PER_PAGE"]), next_url=None,
+    status=None, priority=None, view_mode="personal",
+    sort_by="Created At (Newest First)", SORT_OPTIONS=app_module.SORT_OPTIONS,
+    today=date.today(),
+    PRIORITIES=app_module.PRIORITIES, STATUSES=app_module.STATUSES,
+  )
+  pages = [("index.html", index_context), ("login.html", {}), ("register.html", {})]
+
+  print(f"{'template':<16}{'string (ms)':>14}{'compiled (ms)':>16}")
+  with app.test_request_context("/"):
+    for name, context in pages:
+      source = (TEMPLATE_DIR / name).read_text(encoding="utf-8")
+      before = per_call_ms(lambda: render_template_string(source, **context), repeat)
+      after = per_call_ms(lambda: render_template(name, **context), repeat)
+      print(f"{name:<16}{before:>14.3f}{after:>16.3f}")
+
+  # 起動直後（jinja_env のキャッシュが空）の get_template
+  with tempfile.TemporaryDirectory() as cache_dir:
+    def cold_load(bytecode_cache):
+      env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), bytecode_cache=bytecode_cache)
+      for name, _ in pages:
+        env.get_template(name)
+
+    cache = FileSystemBytecodeCache(cache_dir)
+    cold_load(cache)  # キャッシュを作っておく
+    print()
+    print(f"cold start, no bytecode cache: {per_call_ms(lambda: cold_load(None), repeat):.3f} ms")
+    print(f"cold start, bytecode cache:    {per_call_ms(lambda: cold_load(cache), repeat):.3f} ms")
+
+
+if __name__ == "__main__":
+  main()
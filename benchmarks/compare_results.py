@@ -0,0 +1,61 @@
+"""
+tests/benchmarks の結果（--bench-json）を2つ比べる。
+
+name ごとの median_ms を並べ、threshold（既定 10%）より遅くなったものを REGRESSION として表示する。
+1件でもあれば終了コード 1（CI で使える）。
+  python -m pytest tests/benchmarks --benchmark --bench-json before.json   # 比較元のコミットで
+  python -m pytest tests/benchmarks --benchmark --bench-json after.json    # 変更後に
+  python benchmarks/compare_results.py before.json after.json [--threshold 0.1] [--all]
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+  with open(path) as f:
+    report = json.load(f)
+  return report, {r["name"]: r for r in report["results"]}
+
+
+def describe(report):
+  dataset = report["dataset"]
+  return f"{report['commit']} ({dataset['tasks']} tasks, {dataset['users']} users, sqlite {report['sqlite']})"
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("before")
+  parser.add_argument("after")
+  parser.add_argument("--threshold", type=float, default=0.1, help="遅くなったとみなす割合")
+  parser.add_argument("--all", action="store_true", help="変化の小さいものも表示する")
+  args = parser.parse_args()
+
+  before_report, before = load(args.before)
+  after_report, after = load(args.after)
+  print(f"before: {describe(before_report)}")
+  print(f"after:  {describe(after_report)}")
+  if before_report["dataset"]["tasks"] != after_report["dataset"]["tasks"]:
+    print("warning: the datasets differ in size")
+
+  regressions = 0
+  print(f"{'name':<70}{'before':>10}{'after':>10}{'change':>9}")
+  for name in sorted(before.keys() & after.keys()):
+    old, new = before[name]["median_ms"], after[name]["median_ms"]
+    change = (new - old) / old if old else 0.0
+    flag = ""
+    if change > args.threshold:
+      flag = "  REGRESSION"
+      regressions += 1
+    elif change < -args.threshold:
+      flag = "  faster"
+    if flag or args.all:
+      print(f"{name:<70}{old:>8.2f}ms{new:>8.2f}ms{change:>+8.1%}{flag}")
+  for name in sorted(before.keys() ^ after.keys()):
+    print(f"{name:<70}  only in {'before' if name in before else 'after'}")
+  print(f"{regressions} regression(s) over {args.threshold:.0%}")
+  sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,145 @@
+"""
+ベンチマーク用の合成データ（tasks.db / users.db）を作る。
+
+分布は実際の掲示板に寄せてある（同じ --seed なら同じデータになる）。
+  ユーザー : 所有するタスク数は Zipf 風（user 1 が一番多い。一覧の個人ビューの最悪ケース）
+  状態     : todo 35% / doing 15% / done 50%
+  優先度   : High 20% / Mid 55% / Low 25%
+  期日     : 30% は期日なし。残りは作成日の 1〜60 日後（古いタスクほど期限切れ）
+  作成日時 : id の順に --days 日前から今日までほぼ等間隔
+  本文     : タイトルは語彙からの 2〜6 語、詳細は半数が空で残りは 5〜20 語（全文検索にも使える）
+別プロセスで app を import し、init-db と同じ処理でスキーマ（索引・全文検索のトリガーを含む）を作ってから入れる。
+  python benchmarks/datagen.py 出力先ディレクトリ [--tasks 100000] [--users 1000] [--seed 0]
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+CHUNK = 20000
+VOCABULARY_SIZE = 5000
+
+STATUS_WEIGHTS = {"todo": 35, "doing": 15, "done": 50}
+PRIORITY_WEIGHTS = {"High": 20, "Mid": 55, "Low": 25}
+NO_DUE_DATE = 0.3
+DUE_WITHIN_DAYS = 60
+# 固定の平文 "password"（コストの低い method。ログインのベンチマークにも使える）
+PASSWORD_HASH = "pbkdf2:sha256:1000$SNN8lF1ySQv7s2JR$9c7c8b3cadbef44e07ad18f81d064f51e6882a9945a9be501f5dceb2deaba6a6"
+
+
+def urls(directory):
+  """(tasks の URL, users の URL)"""
+  return f"sqlite:///{Path(directory) / 'tasks.db'}", f"sqlite:///{Path(directory) / 'users.db'}"
+
+
+def owner_sampler(rng, users):
+  # i 番目のユーザーの重みは 1 / i（Zipf 風）
+  cumulative = list(itertools.accumulate(1 / rank for rank in range(1, users + 1)))
+  total = cumulative[-1]
+  return lambda: bisect.bisect_left(cumulative, rng.random() * total) + 1
+
+
+def words(rng, low, high):
+  return " ".join(f"w{min(int(rng.paretovariate(1.0)) - 1, VOCABULARY_SIZE - 1)}" for _ in range(rng.randint(low, high)))
+
+
+def task_rows(rng, n, users, days, now):
+  """n 件のタスク（Task.__table__.insert() にそのまま渡せる dict）"""
+  from models import PRIORITY_RANK, DUE_DATE_NONE
+
+  owner = owner_sampler(rng, users)
+  statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+  priorities, priority_weights = zip(*PRIORITY_WEIGHTS.items())
+  first = now - timedelta(days=days)
+  step = timedelta(days=days) / max(n, 1)
+  for i in range(n):
+    created_at = first + step * i + timedelta(seconds=rng.randint(0, 59))
+    priority = rng.choices(priorities, priority_weights)[0]
+    due = None if rng.random() < NO_DUE_DATE else (
+      created_at + timedelta(days=rng.randint(1, DUE_WITHIN_DAYS))
+    ).replace(hour=0, minute=0, second=0, microsecond=0)
+    row = dict(
+      user_id=owner(), title=words(rng, 2, 6), detail=words(rng, 5, 20) if rng.random() < 0.5 else "",
+      priority=priority, priority_rank=PRIORITY_RANK[priority], status=rng.choices(statuses, status_weights)[0],
+      due_date=due, due_sort=due or DUE_DATE_NONE, created_at=created_at,
+    )
+    row["done_at"] = created_at if row["status"] == "done" else None  # 完了日時は作成日時で代用する
+    yield row
+
+
+def populate(tasks, users, seed=0, days=730, now=None, progress=None):
+  """今の app の DB にユーザーとタスクを入れる（app_context 内で呼ぶこと）"""
+  import counters
+  from models import db, Task, User
+
+  rng = random.Random(seed)
+  now = now or datetime.now()
+  with db.engines["users"].begin() as conn:
+    for start in range(0, users, CHUNK):
+      conn.execute(User.__table__.insert(), [
+        dict(email=f"user{i}@example.com", password_hash=PASSWORD_HASH) for i in range(start + 1, min(start + CHUNK, users) + 1)
+      ])
+  rows = task_rows(rng, tasks, users, days, now)
+  with db.engine.begin() as conn:
+    for start in range(0, tasks, CHUNK):
+      conn.execute(Task.__table__.insert(), list(itertools.islice(rows, CHUNK)))  # トリガーで task_fts にも入る
+      if progress:
+        progress(min(start + CHUNK, tasks))
+  # Core の INSERT は一覧の件数（counters.py の mapper イベント）を通らないので、入れ終えてから数える
+  counters.rebuild()
+  db.session.commit()
+
+
+def generate(directory, tasks, users, seed=0, days=730):
+  """directory に tasks.db / users.db を作る（別プロセスで実行し、かかった秒数を返す）"""
+  Path(directory).mkdir(parents=True, exist_ok=True)
+  tasks_url, users_url = urls(directory)
+  env = {**os.environ, "PYTHONPATH": str(ROOT), "DATABASE_URL": tasks_url, "USERS_DATABASE_URL": users_url}
+  start = time.perf_counter()
+  subprocess.run(
+    [sys.executable, __file__, str(directory), "--tasks", str(tasks), "--users", str(users), "--seed", str(seed),
+     "--days", str(days), "--in-process"],
+    cwd=directory, env=env, check=True,
+  )
+  return time.perf_counter() - start
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("directory")
+  parser.add_argument("--tasks", type=int, default=100_000)
+  parser.add_argument("--users", type=int, default=1000)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--days", type=int, default=730, help="作成日時を散らす期間（日）")
+  parser.add_argument("--in-process", action="store_true", help=argparse.SUPPRESS)  # generate() から呼ばれた
+  args = parser.parse_args()
+
+  if not args.in_process:
+    seconds = generate(args.directory, args.tasks, args.users, args.seed, args.days)
+    print(f"{args.tasks} tasks / {args.users} users -> {args.directory} ({seconds:.1f}s)")
+    return
+
+  sys.path.insert(0, str(ROOT))
+  import app as app_module
+
+  def progress(done):
+    print(f"\r{done}/{args.tasks} tasks", end="", file=sys.stderr, flush=True)
+
+  with app_module.app.app_context():
+    app_module.migrations.init_db()
+    populate(args.tasks, args.users, args.seed, args.days, progress=progress if sys.stderr.isatty() else None)
+    for engine in app_module.db.engines.values():
+      engine.dispose()
+  if sys.stderr.isatty():
+    print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+  main()
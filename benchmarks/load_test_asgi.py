@@ -0,0 +1,249 @@
+"""
+WSGI（gunicorn の gthread ワーカー）と ASGI（uvicorn asgi:application）の負荷試験。
+
+それぞれを別プロセスで起動し、同じ SQLite に合成タスクを入れてから、
+keep-alive の HTTP 接続を並行に張って一覧（GET /?view_mode=all）と状態変更（PATCH）を送り続ける。
+--sse を指定すると、計測中に /events の接続をその数だけ開いたままにする。
+  pip install gunicorn uvicorn aiosqlite greenlet
+  python benchmarks/load_test_asgi.py [--tasks 100000] [--clients 64] [--duration 10] [--write-ratio 0.1] [--sse 0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+USERS = 50
+CHUNK = 20000
+
+WSGI_SERVER = (
+  "import sys; from werkzeug.serving import run_simple; from app import app; "
+  "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)"
+)
+
+
+def free_port():
+  with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    return s.getsockname()[1]
+
+
+def seed(workdir, n):
+  """別プロセスで app を import し、init-db と同じ処理でスキーマを作って、合成タスクを入れる"""
+  script = f"""
+from datetime import datetime, timedelta
+import app as app_module
+from models import db, Task, PRIORITY_RANK, DUE_DATE_NONE
+base = datetime(2024, 1, 1)
+with app_module.app.app_context():
+  app_module.migrations.init_db()
+  with db.engine.begin() as conn:
+    for start in range(0, {n}, {CHUNK}):
+      rows = []
+      for i in range(start, min(start + {CHUNK}, {n})):
+        priority = app_module.PRIORITIES[i % 3]
+        due = base + timedelta(days=i % 90) if i % 4 else None
+        rows.append(dict(
+          user_id=i % {USERS} + 1, title=f"task {{i}}", detail="",
+          priority=priority, priority_rank=PRIORITY_RANK[priority], status=app_module.STATUSES[i % 3],
+          due_date=due, due_sort=due or DUE_DATE_NONE, created_at=base + timedelta(seconds=i),
+        ))
+      conn.execute(Task.__table__.insert(), rows)
+"""
+  subprocess.run([sys.executable, "-c", script], cwd=workdir, env=server_env(workdir), check=True)
+
+
+def server_env(workdir, **extra):
+  return {
+    **os.environ,
+    **extra,
+    "PYTHONPATH": str(ROOT),
+    "DATABASE_URL": f"sqlite:///{workdir}/tasks.db",
+    "USERS_DATABASE_URL": f"sqlite:///{workdir}/users.db",
+  }
+
+
+def start_server(kind, workdir, port, args, env=None):
+  if kind == "wsgi":
+    command = [
+      sys.executable, "-m", "gunicorn", "app:app", "--bind", f"127.0.0.1:{port}", "--workers", str(args.workers),
+      "--worker-class", "gthread", "--threads", str(args.threads), "--log-level", "warning",
+    ]
+  else:
+    command = [
+      sys.executable, "-m", "uvicorn", "asgi:application", "--port", str(port), "--workers", str(args.workers),
+      "--log-level", "warning",
+    ]
+  proc = subprocess.Popen(command, cwd=workdir, env=server_env(workdir, **(env or {})), stderr=subprocess.DEVNULL)
+  deadline = time.monotonic() + 60
+  while time.monotonic() < deadline:
+    try:
+      socket.create_connection(("127.0.0.1", port), timeout=1).close()
+      return proc
+    except OSError:
+      time.sleep(0.2)
+  proc.kill()
+  raise RuntimeError(f"{kind} server did not start")
+
+
+class Connection:
+  """keep-alive の HTTP/1.1 接続（ベンチマーク用の最小限の実装）"""
+
+  def __init__(self, port, cookie=""):
+    self.port = port
+    self.cookie = cookie
+
+  async def open(self):
+    self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+  async def request(self, method, path, body=None, content_type="application/json"):
+    headers = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Cookie: {self.cookie}"]
+    if body is not None:
+      headers += [f"Content-Type: {content_type}", f"Content-Length: {len(body)}"]
+    raw = ("\r\n".join(headers) + "\r\n\r\n").encode() + (body or b"")
+    try:
+      self.writer.write(raw)
+      await self.writer.drain()
+      status_line = await self.reader.readline()
+    except ConnectionError:
+      status_line = b""
+    if not status_line:
+      # サーバーが keep-alive の接続を閉じていた（待ち時間切れなど）ので開き直して送り直す
+      self.close()
+      await self.open()
+      self.writer.write(raw)
+      await self.writer.drain()
+      status_line = await self.reader.readline()
+    response_headers = {}
+    while (line := await self.reader.readline()) not in (b"\r\n", b""):
+      name, _, value = line.decode().partition(":")
+      response_headers[name.strip().lower()] = value.strip()
+    length = int(response_headers.get("content-length", 0))
+    payload = await self.reader.readexactly(length) if length else b""
+    return int(status_line.split()[1]), response_headers, payload
+
+  def close(self):
+    self.writer.close()
+
+
+async def login(port):
+  conn = Connection(port)
+  await conn.open()
+  form = b"email=load%40example.com&password=pw&password2=pw"
+  await conn.request("POST", "/register", form, "application/x-www-form-urlencoded")
+  _, headers, _ = await conn.request("POST", "/login", form, "application/x-www-form-urlencoded")
+  conn.close()
+  return headers["set-cookie"].split(";")[0]
+
+
+async def hold_sse(port, cookie, count, timeout):
+  """/events の接続を count 本開いたままにする。(接続, 応答が始まった本数) を返す"""
+  connections = []
+  opened = 0
+  for _ in range(count):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /events?view_mode=all HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\n\r\n".encode())
+    await writer.drain()
+    connections.append(writer)
+    try:
+      await asyncio.wait_for(reader.readline(), timeout)
+      opened += 1
+    except asyncio.TimeoutError:
+      pass  # スレッドが埋まって応答がない
+  return connections, opened
+
+
+async def client(port, cookie, args, stop_at, latencies, errors, rng):
+  conn = Connection(port, cookie)
+  await conn.open()
+  statuses = ["todo", "doing", "done"]
+  try:
+    while time.monotonic() < stop_at:
+      start = time.perf_counter()
+      if rng.random() < args.write_ratio:
+        body = json.dumps({"status": rng.choice(statuses)}).encode()
+        request = conn.request("PATCH", f"/api/v1/tasks/{rng.randrange(1, args.tasks + 1)}", body)
+      else:
+        request = conn.request("GET", "/?view_mode=all")
+      try:
+        status, _, _ = await asyncio.wait_for(request, args.timeout)
+      except asyncio.TimeoutError:
+        errors.append("timeout")
+        conn.close()
+        await conn.open()
+        continue
+      latencies.append(time.perf_counter() - start)
+      if status >= 400 and status != 403:  # 他人のタスクの更新（403）は想定どおり
+        errors.append(status)
+  finally:
+    conn.close()
+
+
+async def run_load(port, args):
+  cookie = await login(port)
+  sse, sse_opened = await hold_sse(port, cookie, args.sse, args.timeout)
+  latencies, errors = [], []
+  rng = random.Random(0)
+  stop_at = time.monotonic() + args.duration
+  start = time.perf_counter()
+  await asyncio.gather(*[
+    client(port, cookie, args, stop_at, latencies, errors, random.Random(rng.random()))
+    for _ in range(args.clients)
+  ])
+  elapsed = time.perf_counter() - start
+  for writer in sse:
+    writer.close()
+  latencies.sort()
+  return {
+    "requests": len(latencies),
+    "rps": len(latencies) / elapsed,
+    "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+    "p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000 if latencies else float("nan"),
+    "errors": len(errors),
+    "sse_opened": sse_opened,
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--tasks", type=int, default=100_000)
+  parser.add_argument("--clients", type=int, default=64)
+  parser.add_argument("--duration", type=float, default=10)
+  parser.add_argument("--write-ratio", type=float, default=0.1)
+  parser.add_argument("--sse", type=int, default=0, help="計測中に開いておく /events の接続数")
+  parser.add_argument("--servers", default="wsgi,asgi")
+  parser.add_argument("--timeout", type=float, default=5, help="1リクエストの待ち時間の上限（超えたらエラーとして数える）")
+  parser.add_argument("--workers", type=int, default=1, help="サーバーのワーカープロセス数（両方で同じ）")
+  parser.add_argument("--threads", type=int, default=32, help="WSGI（gunicorn gthread）のワーカーあたりのスレッド数")
+  args = parser.parse_args()
+
+  print(f"tasks: {args.tasks}, clients: {args.clients}, duration: {args.duration}s, "
+        f"write ratio: {args.write_ratio}, idle SSE: {args.sse}, workers: {args.workers}")
+  print(f"{'server':<8}{'req/s':>10}{'p50':>10}{'p99':>10}{'errors':>8}{'SSE open':>10}")
+  for kind in args.servers.split(","):
+    workdir = tempfile.mkdtemp()
+    try:
+      seed(workdir, args.tasks)
+      port = free_port()
+      proc = start_server(kind, workdir, port, args)
+      try:
+        result = asyncio.run(run_load(port, args))
+      finally:
+        proc.terminate()
+        proc.wait()
+      print(f"{kind:<8}{result['rps']:>10.1f}{result['p50_ms']:>8.1f}ms{result['p99_ms']:>8.1f}ms{result['errors']:>8}{result['sse_opened']:>10}")
+    finally:
+      shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,119 @@
+"""
+SQLite に並列の読み取り・書き込みをかけ、スループットとロックエラー数を測る。
+
+gunicorn のワーカーと同じく別プロセスから同じDBファイルに接続する。
+既定の設定（PRAGMA なし）と sqlite_tuning.DEFAULT_PRAGMAS を比較する。
+  python benchmarks/stress_sqlite_concurrency.py [読み取りプロセス数] [書き込みプロセス数] [秒数]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, select, update  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+import sqlite_tuning  # noqa: E402
+from models import Task  # noqa: E402
+
+SEED_ROWS = 20000
+USERS = 20
+
+
+def make_engine(path, pragmas):
+  # timeout=0: pysqlite 自身の待ち時間（既定5秒）を無効にして、PRAGMA の効果だけを比べる
+  engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0})
+  sqlite_tuning.install(engine, pragmas)
+  return engine
+
+
+def seed(path):
+  engine = make_engine(path, {})
+  Task.__table__.create(engine)  # インデックスも作成される
+  now = datetime.now()
+  with engine.begin() as conn:
+    conn.execute(Task.__table__.insert(), [
+      dict(user_id=i % USERS, title=f"task {i}", detail="", priority="Mid", priority_rank=2,
+           status="todo", due_sort=datetime(9999, 12, 31), created_at=now)
+      for i in range(SEED_ROWS)
+    ])
+  engine.dispose()
+
+
+def reader(path, pragmas, seconds, results):
+  engine = make_engine(path, pragmas)
+  table = Task.__table__
+  ops = errors = 0
+  deadline = time.monotonic() + seconds
+  while time.monotonic() < deadline:
+    user_id = random.randrange(USERS)
+    try:
+      with engine.connect() as conn:
+        conn.execute(
+          select(table).where(table.c.user_id == user_id)
+          .order_by(table.c.created_at.desc(), table.c.id.desc()).limit(50)
+        ).all()
+      ops += 1
+    except OperationalError:
+      errors += 1
+  results.put(("read", ops, errors))
+
+
+def writer(path, pragmas, seconds, results):
+  engine = make_engine(path, pragmas)
+  table = Task.__table__
+  ops = errors = 0
+  deadline = time.monotonic() + seconds
+  while time.monotonic() < deadline:
+    task_id = random.randrange(1, SEED_ROWS + 1)
+    try:
+      with engine.begin() as conn:
+        conn.execute(update(table).where(table.c.id == task_id).values(status=random.choice(["todo", "doing", "done"])))
+      ops += 1
+    except OperationalError:
+      errors += 1
+  results.put(("write", ops, errors))
+
+
+def run(pragmas, readers, writers, seconds):
+  with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "tasks.db")
+    seed(path)
+    make_engine(path, pragmas).connect().close()  # journal_mode=WAL は DB ファイルに残る
+
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=reader, args=(path, pragmas, seconds, results)) for _ in range(readers)]
+    procs += [multiprocessing.Process(target=writer, args=(path, pragmas, seconds, results)) for _ in range(writers)]
+    for p in procs:
+      p.start()
+    totals = {"read": [0, 0], "write": [0, 0]}
+    for _ in procs:
+      kind, ops, errors = results.get()
+      totals[kind][0] += ops
+      totals[kind][1] += errors
+    for p in procs:
+      p.join()
+    return totals
+
+
+def main():
+  readers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+  writers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+  seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+  print(f"readers={readers} writers={writers} seconds={seconds}")
+  print(f"{'mode':<10}{'reads/s':>10}{'read errors':>13}{'writes/s':>10}{'write errors':>14}")
+  for mode, pragmas in [("default", {}), ("tuned", sqlite_tuning.DEFAULT_PRAGMAS)]:
+    totals = run(pragmas, readers, writers, seconds)
+    (reads, read_errors), (writes, write_errors) = totals["read"], totals["write"]
+    print(f"{mode:<10}{reads / seconds:>10.0f}{read_errors:>13}{writes / seconds:>10.0f}{write_errors:>14}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,150 @@
+"""
+タスク一覧・操作の共通処理（画面と API で共有する）。
+"""
+from collections import namedtuple
+from datetime import date, datetime, time
+
+from flask import abort
+
+from sqlalchemy import case, func
+
+from models import db, Task, PRIORITY_RANK
+from board_cache import board_scope
+from search import apply_search
+from events import EVENT_UPDATED, EVENT_DELETED, record_bulk
+import counters
+
+PRIORITIES = ["Low", "Mid", "High"]
+STATUSES = ["todo", "doing", "done"]
+SORT_OPTIONS = ["Priority", "Due Date"]
+
+# sort_by ごとの並べ替えキー（列, 降順か）。列順は models.Task の複合インデックスと一致させる
+# 同順位の並びを一意にするため最後に id を付ける（キーセットページングに必要）
+SORT_KEYS = {
+  "Priority": [(Task.priority_rank, False), (Task.due_sort, False), (Task.created_at, True), (Task.id, True)],
+  # Due Date昇順、NULLは最後（due_sortはNULLを番兵値で置き換えた列）
+  "Due Date": [(Task.due_sort, False), (Task.created_at, True), (Task.id, True)],
+}
+DEFAULT_SORT_KEYS = [(Task.created_at, True), (Task.id, True)]  # Created At (Newest First)
+# 検索時だけ選べる関連度順（search.apply_search）。一致した全件に順位を付けるので、
+# よく出る語では選んだ列での並べ替えより遅い
+RELEVANCE_SORT = "Relevance"
+
+DETAIL_PREVIEW_LENGTH = 300  # 一覧に出す detail の先頭の文字数（全文は編集画面で読む）
+
+# 一覧に表示する1行分の読み取り専用スナップショット（キャッシュに入れても安全なように ORM から切り離す）
+# detail は先頭 DETAIL_PREVIEW_LENGTH 文字で、続きがあれば detail_truncated が真
+TaskRow = namedtuple("TaskRow", [
+  "id", "user_id", "title", "detail", "priority", "priority_rank", "status", "due_date", "due_sort", "created_at",
+  "detail_truncated",
+])
+
+# TaskRow の列。並べ替えキー（SORT_KEYS）の列もすべて含む（次ページのカーソルを作るため）
+BOARD_COLUMNS = [
+  Task.id, Task.user_id, Task.title, func.substr(Task.detail, 1, DETAIL_PREVIEW_LENGTH).label("detail"),
+  Task.priority, Task.priority_rank, Task.status, Task.due_date, Task.due_sort, Task.created_at,
+  (func.length(Task.detail) > DETAIL_PREVIEW_LENGTH).label("detail_truncated"),
+]
+
+def board_rows(q):
+  """
+  一覧の読み取り専用のクエリ。q（build_task_query）の絞り込み・並び順のまま TaskRow の列だけを SELECT する。
+  ORM オブジェクトを作らない（identity map・変更追跡なし）ので、結果は TaskRow._make で TaskRow にする。
+  """
+  return q.with_entities(*BOARD_COLUMNS)
+
+def sort_keys(sort_by):
+  return SORT_KEYS.get(sort_by, DEFAULT_SORT_KEYS)
+
+def build_task_query(view_mode, status, priority, sort_by, user_id, search=None):
+  """
+  一覧用のクエリを組み立てる。
+  ORDER BY の列順は models.Task の複合インデックスと一致させ、全件スキャン＋ソートを避ける。
+  search を渡すと全文検索で絞り込む（sort_by が RELEVANCE_SORT なら関連度順）。
+  """
+  q = Task.query.order_by(*[col.desc() if desc else col.asc() for col, desc in sort_keys(sort_by)])
+
+  if view_mode == "personal" and user_id:
+    q = q.filter_by(user_id=user_id)
+  if status in STATUSES:
+    q = q.filter_by(status=status)
+  if priority in PRIORITIES:
+    # priority_rank はインデックスに含まれるのでこちらで絞り込む
+    q = q.filter_by(priority_rank=PRIORITY_RANK[priority])
+  if search:
+    # JOIN すると filter_by の対象が変わるので検索は最後に足す
+    q = apply_search(q, search, ranked=sort_by == RELEVANCE_SORT)
+  return q
+
+def overdue_query(view_mode, user_id, status=None, priority=None):
+  """
+  期限切れ（done 以外で due_date が今日より前。一覧の赤字と同じ）のタスクのクエリ（並べ替えなし）。
+  (user_id,) status, (priority_rank,) due_sort の複合インデックスの範囲だけを読む（期日なしの番兵値は範囲外）。
+  """
+  statuses = [s for s in STATUSES if s != "done" and status in (None, s)]
+  q = build_task_query(view_mode, None, priority, None, user_id).order_by(None)
+  return q.filter(Task.status.in_(statuses), Task.due_sort < datetime.combine(date.today(), time.min))
+
+def board_summary(view_mode, user_id, status=None, priority=None):
+  """
+  一覧の見出しの件数（counters.TaskCounter の数行を読む。検索語は反映しない）。
+  status ごとの件数は選択中の priority で、priority ごとの件数は選択中の status で絞った数。
+  期限切れの件数は日付で変わるのでカウンタには持たず、overdue_query の範囲を数える。
+  """
+  rank = PRIORITY_RANK[priority] if priority in PRIORITIES else None
+  status = status if status in STATUSES else None
+  names = {r: p for p, r in PRIORITY_RANK.items()}
+  summary = {"total": 0, "status": dict.fromkeys(STATUSES, 0), "priority": dict.fromkeys(PRIORITIES, 0)}
+  for (s, r), n in counters.scope_counts(board_scope(view_mode, user_id)).items():
+    if rank is None or r == rank:
+      summary["status"][s] = summary["status"].get(s, 0) + n
+    if status is None or s == status:
+      summary["priority"][names[r]] += n
+      if rank is None or r == rank:
+        summary["total"] += n
+  summary["overdue"] = 0
+  if status != "done":
+    summary["overdue"] = overdue_query(view_mode, user_id, status, priority).with_entities(func.count()).scalar()
+  return summary
+
+# ==== 一括操作 ====
+def bulk_target(user_id, ids=None, view_mode="personal", status=None, priority=None, search=None):
+  """
+  一括操作の対象を絞り込むクエリ（並べ替えなし）。
+  ids を渡せばその id、渡さなければ一覧と同じ絞り込み（status / priority / view_mode / search）。
+  """
+  if ids is not None:
+    return Task.query.filter(Task.id.in_(ids))
+  return build_task_query(view_mode, status, priority, None, user_id, search).order_by(None)
+
+def check_bulk_ownership(q, user_id, ids=None):
+  """
+  単体の操作と同じく、他人のタスクが1件でも含まれていれば 403。
+  ids 指定で存在しない id があれば 404。
+  戻り値は q を user_id のタスクに絞ったクエリ（確認の後に他人のタスクが増えても、更新・削除では触らない）
+  """
+  if ids is not None:
+    owners = dict(q.with_entities(Task.id, Task.user_id).all())
+    if len(owners) != len(set(ids)):
+      abort(404)
+    if any(owner != user_id for owner in owners.values()):
+      abort(403)  # Forbidden
+  elif db.session.query(q.filter(Task.user_id.is_distinct_from(user_id)).exists()).scalar():
+    abort(403)  # Forbidden
+  return q.filter(Task.user_id == user_id)
+
+def bulk_update_status(q, new_status):
+  """対象の status を1回の UPDATE で変更する（commit は呼び出し側）。戻り値は件数"""
+  record_bulk(EVENT_UPDATED, q)
+  counters.count_status_changed(q, new_status)
+  # done_at は Task._sync_done_at と同じ規則（既に done なら変えない）
+  done_at = None
+  if new_status == "done":
+    done_at = case((Task.status == "done", func.coalesce(Task.done_at, datetime.now())), else_=datetime.now())
+  return q.update({Task.status: new_status, Task.done_at: done_at}, synchronize_session=False)
+
+def bulk_delete(q):
+  """対象を1回の DELETE で削除する（commit は呼び出し側）。戻り値は件数"""
+  record_bulk(EVENT_DELETED, q)
+  counters.count_deleted(q)
+  return q.delete(synchronize_session=False)
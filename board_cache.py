@@ -0,0 +1,131 @@
+"""
+一覧（index()）のクエリ結果キャッシュ。
+
+キャッシュはプロセスごとの LRU + TTL。無効化は DB 上の変更カウンタ（models.BoardVersion）で行う。
+書き込みルートは commit 前に bump_version() を呼び、一覧はキャッシュキーに現在のカウンタを含める。
+カウンタは書き込みと同じトランザクションで更新されるので、別ワーカーでの書き込みも
+次のリクエストから反映され、古い結果を返すことはない（古いエントリは LRU / TTL で消える）。
+
+同じカウンタは一覧の ETag / Last-Modified にも使う（version_info()、board_etag()）。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, BoardVersion
+
+# このトランザクションで "all" のカウンタを +1 した（session.info のキー。events が task_event の seq に使う）
+BUMPED = "board_version_bumped"
+
+
+class TTLLRUCache:
+  """件数上限（LRU）と有効期限（TTL）つきのスレッドセーフな辞書"""
+
+  def __init__(self, max_size=1024, ttl=60):
+    self.max_size = max_size
+    self.ttl = ttl
+    self.hits = 0
+    self.misses = 0
+    self._data = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      entry = self._data.get(key)
+      if entry is None or entry[0] < time.monotonic():
+        if entry is not None:
+          del self._data[key]
+        self.misses += 1
+        return None
+      self._data.move_to_end(key)
+      self.hits += 1
+      return entry[1]
+
+  def set(self, key, value):
+    with self._lock:
+      self._data[key] = (time.monotonic() + self.ttl, value)
+      self._data.move_to_end(key)
+      while len(self._data) > self.max_size:
+        self._data.popitem(last=False)
+
+  def pop(self, key):
+    with self._lock:
+      self._data.pop(key, None)
+
+  def clear(self):
+    with self._lock:
+      self._data.clear()
+
+  def stats(self):
+    with self._lock:
+      return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "max_size": self.max_size}
+
+
+def board_scope(view_mode, user_id):
+  """一覧の範囲。個人の一覧はそのユーザーの書き込みでだけ変わる"""
+  return f"user:{user_id}" if view_mode == "personal" and user_id else "all"
+
+
+def version_info(scope):
+  """scope の (変更カウンタ, 最終更新日時)。主キー1行の読み取り（書き込みがまだなければ (0, None)）"""
+  row = db.session.execute(
+    select(BoardVersion.version, BoardVersion.updated_at).where(BoardVersion.scope == scope)
+  ).first()
+  return tuple(row) if row else (0, None)
+
+
+def current_version(scope):
+  """scope の変更カウンタ"""
+  return version_info(scope)[0]
+
+
+def board_etag(*parts):
+  """一覧の表示内容を決める値（範囲・カウンタ・クエリ文字列など）から ETag を作る"""
+  return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def bump_version(user_id):
+  """
+  user_id のタスクを書き込んだときに呼ぶ（commit は呼び出し側）。
+  そのユーザーの個人一覧と全タスク一覧のカウンタを +1 する。
+  """
+  bump_versions([user_id])
+
+
+def bump_versions(user_ids):
+  """複数のユーザーのタスクをまとめて書き込んだとき（アーカイブなど）。全タスク一覧のカウンタは1回だけ +1 する"""
+  now = datetime.now()
+  dialect = db.session.get_bind(BoardVersion).dialect.name
+  # 行ロックの順序を揃えるため scope はソートして更新する
+  for scope in sorted({board_scope("personal", user_id) for user_id in user_ids} | {"all"}):
+    if dialect in ("sqlite", "postgresql"):
+      insert = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(BoardVersion)
+      db.session.execute(
+        insert.values(scope=scope, version=1, updated_at=now).on_conflict_do_update(
+          index_elements=[BoardVersion.scope],
+          set_={"version": BoardVersion.version + 1, "updated_at": now},
+        )
+      )
+    else:
+      updated = db.session.execute(
+        update(BoardVersion).where(BoardVersion.scope == scope)
+        .values(version=BoardVersion.version + 1, updated_at=now)
+      ).rowcount
+      if not updated:
+        db.session.add(BoardVersion(scope=scope, version=1, updated_at=now))
+  db.session.info[BUMPED] = True
+
+
+def init_app(app):
+  app.extensions["board_cache"] = TTLLRUCache(
+    max_size=app.config["BOARD_CACHE_SIZE"], ttl=app.config["BOARD_CACHE_TTL"],
+  )
+
+
+def get_cache(app):
+  return app.extensions["board_cache"]
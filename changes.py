@@ -0,0 +1,112 @@
+"""
+タスクの変更フィード（GET /api/v1/changes?since=<token>。ルートは api.py）。
+
+一覧を読み直さずに差分だけで追いつくためのもの（一覧の画面、デスクトップのウィジェット、集計ジョブなど）。
+task_event（events.py。タスクの書き込みと同じトランザクションで追記する）を位置 (seq, id) の順に読み、
+since より後に作成・更新・削除されたタスクを、そのタスクの最後の変更の順に返す。
+  作成・更新: 現在の値（同じタスクの複数の変更は1件にまとめる。どちらも「あれば置き換え、なければ追加」でよい）
+  削除      : id だけ
+次に渡す since は応答の next。since なしで呼ぶと今の位置（next）だけを返すので、
+それを受け取ってから一覧を全件読み、以降は since で差分を読む（間の変更は重ねて届くが、結果は同じ）。
+
+task_event は保持期間（LIVE_EVENT_RETENTION 秒）を過ぎると消える（events.expire）。
+since が消した範囲にかかっている（または DB を作り直して log より先にある）ときは ResyncRequired にし、
+API は 410 と resync: true を返してクライアントに全件を読み直させる。
+flask --app app compact-changes は保持期間切れを消すほか、同じタスクの古い変更（最後の1件より前）を詰める。
+詰めても各タスクの最後の変更は残るので、遅れているクライアントも再同期なしで追いつける。
+
+seq は commit の順に増える（events.py）ので、PostgreSQL などで小さい id のトランザクションが後から commit しても、
+since（位置のトークン。events.position_token）の続きから読めば読み飛ばさない。
+"""
+from sqlalchemy import delete, func, select
+
+from events import (
+  EVENT_CREATED, EVENT_DELETED, events_after, latest_position, parse_position, position_token, pruned_position,
+)
+from models import db, Task, TaskEvent
+
+
+class InvalidToken(ValueError):
+  """since が壊れている"""
+
+
+class ResyncRequired(Exception):
+  """since より後のイベントが消えている（全件を読み直す必要がある）"""
+
+
+def encode_token(position):
+  return position_token(position)
+
+
+def decode_token(token):
+  position = parse_position(token)
+  if position is None:
+    raise InvalidToken(token)
+  return position
+
+
+def current_position():
+  """いまの位置（最新のイベントの (seq, id)。イベントがすべて消えていても消した位置より前には戻らない）"""
+  return max(latest_position(), pruned_position())
+
+
+class Change:
+  """1件のタスクの変更。seq はその変更のイベントの位置、kind は created / updated / deleted、task は作成・更新のときの現在の行"""
+
+  __slots__ = ("seq", "kind", "task_id", "task")
+
+  def __init__(self, seq, kind, task_id, task=None):
+    self.seq = seq
+    self.kind = kind
+    self.task_id = task_id
+    self.task = task
+
+
+def changes_since(since, user_id, personal, columns, limit):
+  """
+  since より後の変更（Change のリスト）と次の since、まだ続きがあるか。
+  personal なら user_id のタスクの変更だけ。columns は作成・更新のときに読む Task の列、limit は読むイベントの件数
+  """
+  if since < pruned_position() or since > current_position():
+    raise ResyncRequired(since)
+
+  rows = events_after(db.session.execute, since, limit + 1, user_id if personal else None)
+  has_more = len(rows) > limit
+  rows = rows[:limit]
+
+  # タスクごとに最後の変更だけを、その順に残す
+  latest = {}
+  created = set()
+  for row in rows:
+    latest.pop(row.task_id, None)
+    latest[row.task_id] = row
+    if row.kind == EVENT_CREATED:
+      created.add(row.task_id)
+  live = [task_id for task_id, row in latest.items() if row.kind != EVENT_DELETED]
+  tasks = {}
+  if live:
+    tasks = {t.id: t for t in db.session.execute(select(*columns).where(Task.id.in_(live)))}
+
+  changes = []
+  for task_id, row in latest.items():
+    task = tasks.get(task_id)
+    if task is None or (personal and task.user_id != user_id):
+      # 削除済み（このページの後で消えたものも含む）、または自分のタスクではなくなった
+      changes.append(Change((row.seq, row.id), EVENT_DELETED, task_id))
+    else:
+      changes.append(Change((row.seq, row.id), EVENT_CREATED if task_id in created else row.kind, task_id, task))
+  return changes, (rows[-1].seq, rows[-1].id) if rows else since, has_more
+
+
+def compact(cutoff):
+  """cutoff より前の、同じタスクの後の変更があるイベントを消す（commit は呼び出し側）。戻り値は消した件数"""
+  # タスクごとの最後の変更は位置 (seq, id) の最大（id の最大とは限らない）
+  last_seq = select(TaskEvent.task_id, func.max(TaskEvent.seq).label("seq")).group_by(TaskEvent.task_id).subquery()
+  last_per_task = (
+    select(func.max(TaskEvent.id))
+    .join(last_seq, (TaskEvent.task_id == last_seq.c.task_id) & (TaskEvent.seq == last_seq.c.seq))
+    .group_by(TaskEvent.task_id)
+  )
+  return db.session.execute(
+    delete(TaskEvent).where(TaskEvent.created_at < cutoff, TaskEvent.id.not_in(last_per_task))
+  ).rowcount
@@ -0,0 +1,26 @@
+"""
+ブロッキングする処理（パスワードのハッシュ計算など）の呼び出しと待ち合わせ。
+
+WSGI ではそのまま呼ぶ（待つ）。ASGI モード（asgi.py）ではリクエストの処理がイベントループ上の
+greenlet で動いているので、スレッドで実行し、完了を待つ間もループを止めない。
+"""
+import asyncio
+from contextvars import ContextVar
+
+# ASGI モードのリクエスト処理中か（asgi.py が設定する）
+in_async_request = ContextVar("in_async_request", default=False)
+
+
+def run_blocking(fn, *args, **kwargs):
+  if in_async_request.get():
+    from sqlalchemy.util import await_only  # ASGI モードでだけ必要（greenlet に依存する）
+    return await_only(asyncio.to_thread(fn, *args, **kwargs))
+  return fn(*args, **kwargs)
+
+
+def wait_future(future):
+  """concurrent.futures の future の結果を待つ"""
+  if in_async_request.get():
+    from sqlalchemy.util import await_only
+    return await_only(asyncio.wrap_future(future))
+  return future.result()
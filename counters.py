@@ -0,0 +1,160 @@
+"""
+一覧の見出しの件数（models.TaskCounter）。
+
+scope（"all" / "user:<id>"。board_cache.board_scope と同じ）× status × priority_rank ごとのタスク数を持ち、
+一覧は COUNT(*) GROUP BY の代わりにこの表の数行（主キーの範囲）を読む。
+
+件数はタスクの書き込みと同じトランザクションで増減する。
+  1件ずつの作成・更新・削除（ORM の flush）: Task のマッパーイベントで自動的に反映する（画面・API・ASGI モード共通）
+  一括の更新・削除（board.bulk_update_status / bulk_delete）と取り込み（transfer.insert_batch）: 下の count_* を呼ぶ
+ずれた場合（DB を直接書き換えたなど）は flask --app app repair-counters で task から数え直す。
+"""
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from board_cache import board_scope
+from models import db, Task, TaskCounter
+
+# 件数を分ける列
+KEY_COLUMNS = ("user_id", "status", "priority_rank")
+
+
+def add(deltas, user_id, status, priority_rank, n):
+  """deltas（(scope, status, priority_rank) -> 増減）に user_id の個人一覧と全タスク一覧の分を足す"""
+  for scope in {board_scope("personal", user_id), "all"}:
+    key = (scope, status, priority_rank)
+    deltas[key] = deltas.get(key, 0) + n
+
+
+def apply(execute, dialect, deltas):
+  """増減を TaskCounter に書く。execute は Connection.execute か Session.execute"""
+  # 行ロックの順序を揃えるためキーはソートして更新する
+  for (scope, status, priority_rank), n in sorted(deltas.items()):
+    if not n:
+      continue
+    key = {"scope": scope, "status": status, "priority_rank": priority_rank}
+    if dialect in ("sqlite", "postgresql"):
+      stmt = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(TaskCounter)
+      execute(
+        stmt.values(**key, count=n).on_conflict_do_update(
+          index_elements=[TaskCounter.scope, TaskCounter.status, TaskCounter.priority_rank],
+          set_={"count": TaskCounter.count + n},
+        )
+      )
+    else:
+      updated = execute(
+        update(TaskCounter).filter_by(**key).values(count=TaskCounter.count + n)
+      ).rowcount
+      if not updated:
+        execute(insert(TaskCounter).values(**key, count=n))
+
+
+def apply_in_session(deltas):
+  apply(db.session.execute, db.session.get_bind(TaskCounter).dialect.name, deltas)
+
+
+# ==== 1件ずつの書き込み（flush 時に同じ接続で書く） ====
+@event.listens_for(Task, "after_insert")
+def _task_inserted(mapper, connection, target):
+  deltas = {}
+  add(deltas, target.user_id, target.status, target.priority_rank, 1)
+  apply(connection.execute, connection.dialect.name, deltas)
+
+
+@event.listens_for(Task, "before_update")
+def _task_updating(mapper, connection, target):
+  state = inspect(target)
+  history = {name: state.attrs[name].history for name in KEY_COLUMNS}
+  if not any(h.has_changes() for h in history.values()):
+    return
+  if all(h.deleted or (not h.has_changes() and name in state.dict) for name, h in history.items()):
+    old = tuple(h.deleted[0] if h.deleted else state.dict[name] for name, h in history.items())
+  else:
+    # 変更前の値を読まずに代入した（commit 後の期限切れの属性など）ときは、まだ更新前の行から読む
+    table = Task.__table__
+    old = tuple(connection.execute(
+      select(*[table.c[name] for name in KEY_COLUMNS]).where(table.c.id == target.id)
+    ).one())
+  new = tuple(state.dict.get(name, value) for name, value in zip(KEY_COLUMNS, old))
+  if new == old:
+    return
+  deltas = {}
+  add(deltas, *old, -1)
+  add(deltas, *new, 1)
+  apply(connection.execute, connection.dialect.name, deltas)
+
+
+@event.listens_for(Task, "before_delete")
+def _task_deleting(mapper, connection, target):
+  deltas = {}
+  add(deltas, target.user_id, target.status, target.priority_rank, -1)
+  apply(connection.execute, connection.dialect.name, deltas)
+
+
+# ==== 一括の書き込み（commit は呼び出し側） ====
+def grouped(q):
+  """q（Task のクエリ）の (user_id, status, priority_rank, 件数)"""
+  columns = [getattr(Task, name) for name in KEY_COLUMNS]
+  return q.order_by(None).with_entities(*columns, func.count()).group_by(*columns).all()
+
+
+def count_deleted(q):
+  """q の全行を削除する前に呼ぶ"""
+  deltas = {}
+  for user_id, status, priority_rank, n in grouped(q):
+    add(deltas, user_id, status, priority_rank, -n)
+  apply_in_session(deltas)
+
+
+def count_status_changed(q, new_status):
+  """q の全行の status を new_status にする前に呼ぶ"""
+  deltas = {}
+  for user_id, status, priority_rank, n in grouped(q):
+    add(deltas, user_id, status, priority_rank, -n)
+    add(deltas, user_id, new_status, priority_rank, n)
+  apply_in_session(deltas)
+
+
+def count_inserted(values):
+  """INSERT した行の値（dict のリスト）を数える"""
+  deltas = {}
+  for v in values:
+    add(deltas, v["user_id"], v["status"], v["priority_rank"], 1)
+  apply_in_session(deltas)
+
+
+# ==== 読み取り・作り直し ====
+def scope_counts(scope):
+  """scope の {(status, priority_rank): 件数}"""
+  rows = db.session.execute(
+    select(TaskCounter.status, TaskCounter.priority_rank, TaskCounter.count).where(TaskCounter.scope == scope)
+  )
+  return {(status, priority_rank): n for status, priority_rank, n in rows}
+
+
+def stored():
+  """TaskCounter の全件 {(scope, status, priority_rank): 件数}（0 は除く）"""
+  rows = db.session.execute(select(TaskCounter.scope, TaskCounter.status, TaskCounter.priority_rank, TaskCounter.count))
+  return {(scope, status, priority_rank): n for scope, status, priority_rank, n in rows if n}
+
+
+def recount():
+  """task から数え直した {(scope, status, priority_rank): 件数}"""
+  deltas = {}
+  for user_id, status, priority_rank, n in grouped(Task.query):
+    add(deltas, user_id, status, priority_rank, n)
+  return deltas
+
+
+def rebuild():
+  """TaskCounter を task から作り直す（commit は呼び出し側）。戻り値は値が違っていたキーの数"""
+  counts = recount()
+  current = stored()
+  wrong = sum(1 for key in counts.keys() | current.keys() if counts.get(key, 0) != current.get(key, 0))
+  db.session.execute(delete(TaskCounter))
+  if counts:
+    db.session.execute(insert(TaskCounter), [
+      {"scope": scope, "status": status, "priority_rank": priority_rank, "count": n}
+      for (scope, status, priority_rank), n in sorted(counts.items())
+    ])
+  return wrong
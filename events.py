@@ -0,0 +1,258 @@
+"""
+タスクの変更のライブ配信（Server-Sent Events）。
+
+書き込みルートは commit 前に record() / record_bulk() で task_event に変更を書く
+（bump_version と同じく書き込みと同じトランザクション）。
+各プロセスの Broker はバックグラウンドスレッドで task_event を位置 (seq, id) の順に読み、そのプロセスの
+購読者（/events の接続）に配る。DB を経由するので別ワーカーでの変更も届き、追加のミドルウェアは要らない。
+同じプロセスで commit したときはポーリングを待たずにすぐ読みに行く。
+
+id は INSERT の時点で採番されるので、PostgreSQL などでは小さい id のトランザクションが後から commit しうる
+（id の続きから読むと読み飛ばす）。そこで commit の直前に、そのトランザクションのイベントの seq に
+BoardVersion "all" の値（書き込みのトランザクションは必ず +1 し、commit まで行ロックを持つ）を入れる。
+後から commit したトランザクションほど seq が大きいので、(seq, id) の続きから読めば読み飛ばさない。
+
+配信するのは「どのタスクが作成・更新・削除されたか」だけで、画面の差し替えはクライアントが
+/tasks/<id>/item（現在の絞り込みで描画した1行）を取得して行う。
+"""
+import queue
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import case, delete, event, insert, literal, select, tuple_, update
+
+import board_cache
+from models import db, BoardVersion, Task, TaskEvent, TaskEventWatermark
+
+EVENT_CREATED = "created"
+EVENT_UPDATED = "updated"
+EVENT_DELETED = "deleted"
+
+PRUNE_EVERY = 1000  # このプロセスで何件記録するごとに古いイベントを消すか
+REPLAY_LIMIT = 500  # 再接続時に Last-Event-ID から送り直す最大件数（超えたら再読み込みさせる）
+
+_recorded = 0
+
+
+def record(kind, task):
+  """task の変更を記録する（commit は呼び出し側）"""
+  global _recorded
+  if task.id is None:
+    db.session.flush()  # 作成時は採番してから記録する
+  db.session.add(TaskEvent(kind=kind, task_id=task.id, user_id=task.user_id))
+  db.session.info["task_events"] = True
+  _recorded += 1
+  if _recorded % PRUNE_EVERY == 0:
+    prune()
+
+
+def record_bulk(kind, q):
+  """一括操作の対象 q（Task のクエリ）の全行の変更を INSERT ... SELECT 1回で記録する（更新・削除の前に呼ぶ）"""
+  rows = q.order_by(None).with_entities(literal(kind), Task.id, Task.user_id, literal(datetime.now()))
+  db.session.execute(
+    insert(TaskEvent).from_select(["kind", "task_id", "user_id", "created_at"], rows.statement)
+  )
+  db.session.info["task_events"] = True
+
+
+def latest_position(execute=None):
+  """
+  いまの最新イベントの位置 (seq, id)（一覧の描画前に読み、ライブ更新はこの続きから受け取る）。
+  execute は Connection.execute か Session.execute（既定は db.session）
+  """
+  row = (execute or db.session.execute)(
+    select(TaskEvent.seq, TaskEvent.id).where(TaskEvent.seq.is_not(None))
+    .order_by(TaskEvent.seq.desc(), TaskEvent.id.desc()).limit(1)
+  ).first()
+  return tuple(row) if row else (0, 0)
+
+
+def position_token(position):
+  """位置 (seq, id) をクライアントに渡す文字列にする（SSE の id など）"""
+  return "%d-%d" % position
+
+
+def parse_position(token):
+  """position_token の逆。id だけの以前のトークンは seq 0（移行前のイベント）とみなす。壊れていれば None"""
+  seq, sep, event_id = (token or "").rpartition("-")
+  if not event_id.isdigit() or not (seq.isdigit() or not sep):
+    return None
+  return int(seq or 0), int(event_id)
+
+
+def events_after(execute, after, limit, user_id=None):
+  """after（位置）より後のイベント (seq, id, kind, task_id, user_id, created_at) を位置の順に limit 件。user_id なら所有者で絞る"""
+  q = select(TaskEvent.seq, TaskEvent.id, TaskEvent.kind, TaskEvent.task_id, TaskEvent.user_id, TaskEvent.created_at)
+  if user_id is not None:
+    q = q.where(TaskEvent.user_id == user_id)  # ix_task_event_user_seq
+  return execute(
+    q.where(tuple_(TaskEvent.seq, TaskEvent.id) > tuple_(*after))  # ix_task_event_seq
+    .order_by(TaskEvent.seq, TaskEvent.id).limit(limit)
+  ).all()
+
+
+def prune():
+  """保持期間（LIVE_EVENT_RETENTION 秒）を過ぎたイベントを消す（commit は呼び出し側）"""
+  return expire(datetime.now() - timedelta(seconds=current_app.config["LIVE_EVENT_RETENTION"]))
+
+
+def expire(cutoff):
+  """
+  cutoff より前のイベント（までの位置）を消し、消した最後の位置を task_event_watermark に残す（commit は呼び出し側）。
+  変更フィード（changes.py）は since がそれより前のクライアントに再同期させる。戻り値は消した件数
+  """
+  last = db.session.execute(
+    select(TaskEvent.seq, TaskEvent.id).where(TaskEvent.created_at < cutoff, TaskEvent.seq.is_not(None))
+    .order_by(TaskEvent.seq.desc(), TaskEvent.id.desc()).limit(1)
+  ).first()
+  if last is None:
+    return 0
+  seq, last_id = last
+  deleted = db.session.execute(delete(TaskEvent).where(tuple_(TaskEvent.seq, TaskEvent.id) <= tuple_(seq, last_id))).rowcount
+  mark_seq, mark_id = TaskEventWatermark.pruned_through_seq, TaskEventWatermark.pruned_through
+  ahead = tuple_(mark_seq, mark_id) < tuple_(seq, last_id)  # 先に進めるだけ（戻さない）
+  updated = db.session.execute(update(TaskEventWatermark).values(
+    pruned_through_seq=case((ahead, seq), else_=mark_seq), pruned_through=case((ahead, last_id), else_=mark_id),
+    updated_at=datetime.now(),
+  )).rowcount
+  if not updated:
+    db.session.add(TaskEventWatermark(id=1, pruned_through_seq=seq, pruned_through=last_id))
+  return deleted
+
+
+def pruned_position():
+  """保持期間切れで消したイベントの最後の位置 (seq, id)（まだなければ (0, 0)）"""
+  row = db.session.execute(select(TaskEventWatermark.pruned_through_seq, TaskEventWatermark.pruned_through)).first()
+  return tuple(row) if row else (0, 0)
+
+
+class Subscription:
+  """1つの /events 接続の受信キュー"""
+
+  def __init__(self, queue_size, on_event=None):
+    self.queue = queue.Queue(maxsize=queue_size)
+    self.overflowed = False  # 読み出しが追いつかず切られた（クライアントに再読み込みさせる）
+    self.on_event = on_event  # キューに入れた（または溢れた）ときに読み取りスレッドから呼ぶ（ASGI モード用）
+
+  def get(self, timeout):
+    """次のイベント（events_after の1行）。timeout 秒来なければ None"""
+    try:
+      return self.queue.get(timeout=timeout)
+    except queue.Empty:
+      return None
+
+
+class Broker:
+  """
+  task_event を読んでプロセス内の購読者に配る（1プロセスに1つ）。
+  読み取りスレッドは最初の購読で開始し、購読者がいない間は DB を読まない。
+  """
+
+  def __init__(self, poll_interval=0.5, queue_size=256):
+    self.poll_interval = poll_interval
+    self.queue_size = queue_size
+    self._subscribers = set()
+    self._lock = threading.Lock()
+    self._wakeup = threading.Event()
+    self._engine = None
+    self._thread = None
+    self._last = (0, 0)  # 配った最後の位置 (seq, id)
+
+  def subscribe(self, engine, on_event=None):
+    sub = Subscription(self.queue_size, on_event)
+    with self._lock:
+      if self._thread is None:
+        self._engine = engine
+        self._last = self.latest_position()
+        self._thread = threading.Thread(target=self._run, name="live-broker", daemon=True)
+        self._thread.start()
+      self._subscribers.add(sub)
+    return sub
+
+  def unsubscribe(self, sub):
+    with self._lock:
+      self._subscribers.discard(sub)
+
+  def notify(self):
+    """このプロセスで変更を commit した（ポーリングを待たずに読みに行く）"""
+    self._wakeup.set()
+
+  def latest_position(self):
+    with self._engine.connect() as conn:
+      return latest_position(conn.execute)
+
+  def events_after(self, after, limit):
+    with self._engine.connect() as conn:
+      return events_after(conn.execute, after, limit)
+
+  def _run(self):
+    while True:
+      self._wakeup.wait(self.poll_interval)
+      self._wakeup.clear()
+      with self._lock:
+        subscribers = list(self._subscribers)
+      if not subscribers:
+        continue
+      try:
+        rows = self.events_after(self._last, REPLAY_LIMIT)
+      except Exception:
+        continue  # DB が一時的に使えない（ロック中など）ときは次の周期で読み直す
+      for row in rows:
+        for sub in subscribers:
+          if sub.overflowed:
+            continue
+          try:
+            sub.queue.put_nowait(row)
+          except queue.Full:
+            sub.overflowed = True
+            self.unsubscribe(sub)
+      if rows:
+        for sub in subscribers:
+          if sub.on_event is not None:
+            sub.on_event()
+        self._last = (rows[-1].seq, rows[-1].id)
+        if len(rows) == REPLAY_LIMIT:
+          self._wakeup.set()  # まだ残っている
+
+
+def _before_commit(session):
+  if not session.info.get("task_events"):
+    return
+  if not session.info.get(board_cache.BUMPED):
+    board_cache.bump_versions([])  # "all" の行ロックを取り、seq を commit の順にする
+  session.flush()
+  seq = session.execute(select(BoardVersion.version).where(BoardVersion.scope == "all")).scalar()
+  # 他のトランザクションのまだ commit していない行は見えないので、このトランザクションのイベントだけに入る
+  session.execute(update(TaskEvent).where(TaskEvent.seq.is_(None)).values(seq=seq))
+
+
+def _after_commit(session):
+  session.info.pop(board_cache.BUMPED, None)
+  if session.info.pop("task_events", False):
+    broker = current_app.extensions.get("live_broker") if has_app_context() else None
+    if broker is not None:
+      broker.notify()
+
+
+def _after_rollback(session):
+  session.info.pop(board_cache.BUMPED, None)
+  session.info.pop("task_events", None)
+
+
+def listen(target):
+  """seq を入れ、commit 時に Broker を起こすリスナーを登録する（db.session と、ASGI モードのセッションクラス）"""
+  event.listen(target, "before_commit", _before_commit)
+  event.listen(target, "after_commit", _after_commit)
+  event.listen(target, "after_rollback", _after_rollback)
+
+
+def init_app(app):
+  app.extensions["live_broker"] = Broker(
+    poll_interval=app.config["LIVE_POLL_INTERVAL"], queue_size=app.config["LIVE_QUEUE_SIZE"],
+  )
+  listen(db.session)
+
+
+def get_broker(app):
+  return app.extensions["live_broker"]
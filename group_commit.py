@@ -0,0 +1,154 @@
+"""
+タスクの書き込みのグループコミット（GROUP_COMMIT_ENABLED=1 のときだけ。既定は無効）。
+
+朝会などで大勢が一斉に状態を切り替えると、1クリックごとに1トランザクション（SQLite では書き込みロックと fsync）
+かかり、書き込みがロック待ちで1列に並ぶ。有効にすると、書き込み（run に渡す関数）をプロセスに1つの
+書き込みスレッドに渡し、GROUP_COMMIT_WINDOW_MS の間に届いたもの（最大 GROUP_COMMIT_MAX_BATCH 件）を
+1トランザクションにまとめて commit する。
+
+  - 各書き込みは SAVEPOINT の中で実行するので、403/404 などの例外はその書き込みだけを取り消し、そのリクエストに返す
+  - リクエストに結果を返すのは commit が終わった後（commit に失敗したら、まとめた全リクエストがその例外になる）
+  - 待っている件数が GROUP_COMMIT_MAX_PENDING に達したら 503（Retry-After 付き）を返す
+
+書き込みの関数は書き込みスレッドの db.session で実行するので、session（Flask）や request は使えない。
+必要な値（ログイン中の user_id など）は引数で渡し、結果は ORM オブジェクトではなく値で返すこと。
+有効にすると SQLite の synchronous を FULL にし、応答した変更は電源断でも失われないようにする
+（WAL の既定の NORMAL では直近の commit が失われうる）。commit ごとの fsync はまとめた件数で割られる。
+インメモリ SQLite（接続1本を共有する）では使えない。
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from werkzeug.exceptions import ServiceUnavailable
+
+from concurrency import wait_future
+from models import db, Task
+
+RETRY_AFTER = 1  # 満杯のときに返す Retry-After（秒）
+
+
+class WritePipeline:
+  """書き込みをまとめて commit する書き込みスレッド（1プロセスに1つ。最初の書き込みで開始する）"""
+
+  def __init__(self, app, window=0.002, max_batch=64, max_pending=1024):
+    self.app = app
+    self.window = window
+    self.max_batch = max_batch
+    self._queue = queue.Queue(maxsize=max_pending)
+    self._lock = threading.Lock()
+    self._thread = None
+    self._batches = 0
+    self._writes = 0
+
+  def submit(self, fn, *args):
+    """fn(*args) を次の commit に入れ、commit 後に結果を返す future"""
+    future = Future()
+    with self._lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+    try:
+      self._queue.put_nowait((future, fn, args))
+    except queue.Full:
+      raise ServiceUnavailable("Too many writes in progress. Please retry shortly.", retry_after=RETRY_AFTER)
+    return future
+
+  def stats(self):
+    """commit した回数と、まとめた書き込みの件数"""
+    return {"batches": self._batches, "writes": self._writes}
+
+  def shutdown(self):
+    """待っている書き込みを commit してから書き込みスレッドを止める"""
+    with self._lock:
+      thread, self._thread = self._thread, None
+    if thread is not None:
+      self._queue.put(None)
+      thread.join()
+
+  def _run(self):
+    while True:
+      item = self._queue.get()
+      if item is None:
+        return
+      batch = [item]
+      deadline = time.monotonic() + self.window
+      stopping = False
+      while len(batch) < self.max_batch:
+        try:
+          item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+          break
+        if item is None:
+          stopping = True
+          break
+        batch.append(item)
+      self._commit(batch)
+      if stopping:
+        return
+
+  def _commit(self, batch):
+    results = []
+    with self.app.app_context():
+      try:
+        if db.session.get_bind(Task).dialect.name == "sqlite":
+          # pysqlite は SAVEPOINT の前に BEGIN を出さない（最初の RELEASE で commit されてしまう）ので自分で始める。
+          # IMMEDIATE で書き込みロックを先に取り、途中でロックの昇格に失敗しないようにする
+          db.session.execute(text("BEGIN IMMEDIATE"))
+        for future, fn, args in batch:
+          try:
+            with db.session.begin_nested():
+              results.append((future, fn(*args), None))
+          except Exception as e:
+            results.append((future, None, e))  # この書き込みだけ取り消す
+        db.session.commit()
+      except Exception as e:
+        db.session.rollback()
+        for future, _fn, _args in batch:
+          future.set_exception(e)
+        return
+    self._batches += 1
+    self._writes += len(batch)
+    for future, result, error in results:
+      if error is None:
+        future.set_result(result)
+      else:
+        future.set_exception(error)
+
+
+def run(fn, *args):
+  """
+  書き込み fn(*args)（commit しない）を実行して commit し、fn の戻り値を返す。
+  グループコミットが有効なら書き込みスレッドで他のリクエストの書き込みとまとめて commit する
+  """
+  pipeline = get_pipeline(current_app)
+  if pipeline is None:
+    result = fn(*args)
+    db.session.commit()
+    return result
+  return wait_future(pipeline.submit(fn, *args))
+
+
+def init_app(app):
+  config = app.config
+  pipeline = None
+  if config["GROUP_COMMIT_ENABLED"]:
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+      raise ValueError("In-memory SQLite cannot be used with GROUP_COMMIT_ENABLED")
+    # 最初の接続より前に呼ぶこと（sqlite_tuning が接続時に適用する）
+    config["SQLITE_PRAGMAS"]["synchronous"] = "FULL"
+    pipeline = WritePipeline(
+      app, window=config["GROUP_COMMIT_WINDOW_MS"] / 1000,
+      max_batch=config["GROUP_COMMIT_MAX_BATCH"], max_pending=config["GROUP_COMMIT_MAX_PENDING"],
+    )
+  app.extensions["group_commit"] = pipeline
+
+
+def get_pipeline(app):
+  """書き込みスレッド（無効なら None）"""
+  return app.extensions["group_commit"]
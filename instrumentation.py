@@ -0,0 +1,254 @@
+"""
+リクエストの計測（任意。INSTRUMENTATION_ENABLED で有効にする）。
+
+  - リクエストごとの処理時間と、その内訳（phase() で囲んだ区間。一覧は query / render）
+  - リクエストごとの SQL の実行回数・時間
+  - SLOW_QUERY_MS を超えた SQL のログ（SQLite では EXPLAIN QUERY PLAN も出す）
+  - GET /metrics で Prometheus のテキスト形式で返す（プロセスごとの値）
+  - 管理者（ADMIN_EMAILS）は ?profile=1 を付けるとそのリクエストの cProfile の結果をテキストで受け取れる
+
+一覧の phase は query（クエリの実行と Task への変換）と render（テンプレート）。
+query のうち SQL の実行時間（sql）を除いた残りがおおよその ORM の変換（hydrate）の時間になる
+（SQLite は行を読み出しながら検索を進めるので、行の読み出しの分も hydrate に入る）。
+/metrics は METRICS_TOKEN を Bearer トークンで送るか、管理者としてログインしていれば読める。
+"""
+import cProfile
+import hmac
+import io
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+from flask import Blueprint, Response, abort, current_app, g, has_request_context, request, session
+from sqlalchemy import event
+
+import board_cache
+import user_cache
+from models import db
+
+metrics_bp = Blueprint("instrumentation", __name__)
+
+# 処理時間のヒストグラムの区切り（秒）
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PROFILE_LINES = 60  # ?profile=1 で返す関数の数
+
+
+class RequestStats:
+  def __init__(self):
+    self.start = time.perf_counter()
+    self.phases = {}
+    self.queries = 0
+    self.query_seconds = 0.0
+    self.profiler = None
+
+
+class Metrics:
+  """Prometheus の counter / summary / histogram に相当する値をプロセス内に持つ"""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.requests = {}  # (endpoint, method, status) -> 件数
+    self.durations = {}  # endpoint -> [区切り（BUCKETS と +Inf）ごとの件数..., 合計秒, 件数]
+    self.phases = {}  # (endpoint, phase) -> [合計, 件数]
+    self.queries = {}  # endpoint -> [回数, 合計秒]
+    self.slow_queries = 0
+
+  def observe(self, endpoint, method, status, stats):
+    elapsed = time.perf_counter() - stats.start
+    with self._lock:
+      key = (endpoint, method, status)
+      self.requests[key] = self.requests.get(key, 0) + 1
+      histogram = self.durations.setdefault(endpoint, [0] * (len(BUCKETS) + 3))
+      histogram[bisect_left(BUCKETS, elapsed)] += 1
+      histogram[-2] += elapsed
+      histogram[-1] += 1
+      for phase, seconds in stats.phases.items():
+        total = self.phases.setdefault((endpoint, phase), [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+      queries = self.queries.setdefault(endpoint, [0, 0.0])
+      queries[0] += stats.queries
+      queries[1] += stats.query_seconds
+
+  def count_slow_query(self):
+    with self._lock:
+      self.slow_queries += 1
+
+  def render(self, app):
+    """Prometheus のテキスト形式"""
+    lines = []
+
+    def family(name, kind, help_text):
+      lines.append(f"# HELP {name} {help_text}")
+      lines.append(f"# TYPE {name} {kind}")
+
+    with self._lock:
+      family("board_http_requests_total", "counter", "Requests by endpoint, method and status.")
+      for (endpoint, method, status), count in sorted(self.requests.items()):
+        lines.append(f'board_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+      family("board_http_request_duration_seconds", "histogram", "Request duration.")
+      for endpoint, histogram in sorted(self.durations.items()):
+        cumulative = 0
+        for bound, count in zip((*BUCKETS, "+Inf"), histogram[:-2]):
+          cumulative += count
+          lines.append(f'board_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+        lines.append(f'board_http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {histogram[-2]:.6f}')
+        lines.append(f'board_http_request_duration_seconds_count{{endpoint="{endpoint}"}} {histogram[-1]}')
+
+      family("board_http_request_phase_seconds", "summary", "Time spent in each phase of a request.")
+      for (endpoint, phase), (seconds, count) in sorted(self.phases.items()):
+        lines.append(f'board_http_request_phase_seconds_sum{{endpoint="{endpoint}",phase="{phase}"}} {seconds:.6f}')
+        lines.append(f'board_http_request_phase_seconds_count{{endpoint="{endpoint}",phase="{phase}"}} {count}')
+
+      family("board_db_queries_total", "counter", "SQL statements executed by requests.")
+      for endpoint, (count, _) in sorted(self.queries.items()):
+        lines.append(f'board_db_queries_total{{endpoint="{endpoint}"}} {count}')
+      family("board_db_query_seconds_total", "counter", "Time spent executing SQL statements.")
+      for endpoint, (_, seconds) in sorted(self.queries.items()):
+        lines.append(f'board_db_query_seconds_total{{endpoint="{endpoint}"}} {seconds:.6f}')
+      family("board_db_slow_queries_total", "counter", "SQL statements slower than SLOW_QUERY_MS.")
+      lines.append(f"board_db_slow_queries_total {self.slow_queries}")
+
+    for name, cache in (("board", board_cache.get_cache(app)), ("user", user_cache.get_cache(app))):
+      stats = cache.stats()
+      family(f"board_{name}_cache_hits_total", "counter", f"{name} cache hits.")
+      lines.append(f"board_{name}_cache_hits_total {stats['hits']}")
+      family(f"board_{name}_cache_misses_total", "counter", f"{name} cache misses.")
+      lines.append(f"board_{name}_cache_misses_total {stats['misses']}")
+      family(f"board_{name}_cache_entries", "gauge", f"{name} cache entries.")
+      lines.append(f"board_{name}_cache_entries {stats['size']}")
+    return "\n".join(lines) + "\n"
+
+
+def current_stats():
+  return g.get("instrumentation") if has_request_context() else None
+
+
+def phase(name):
+  """リクエストの処理時間の内訳として name の区間を計る（計測が無効なら何もしない）"""
+  stats = current_stats()
+  return _timed(stats, name) if stats is not None else nullcontext()
+
+
+@contextmanager
+def _timed(stats, name):
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    stats.phases[name] = stats.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def is_admin():
+  user_id = session.get("user_id") if session.get("logged_in") else None
+  user = user_cache.get_user(user_id) if user_id is not None else None
+  return user is not None and user.email in current_app.config["ADMIN_EMAILS"]
+
+
+def explain(cursor, statement, parameters):
+  """SQLite の EXPLAIN QUERY PLAN（同じ接続で実行する）"""
+  try:
+    plan = cursor.connection.cursor()
+    try:
+      plan.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+      return "\n".join(f"  {row[-1]}" for row in plan.fetchall())
+    finally:
+      plan.close()
+  except Exception as e:  # 計測のための処理でリクエストを失敗させない
+    return f"  (EXPLAIN failed: {e})"
+
+
+def install(engine, app):
+  """engine の SQL を計測する（ASGI モードの非同期エンジンにも使う）"""
+  slow = app.config["SLOW_QUERY_MS"] / 1000
+  metrics = get_metrics(app)
+
+  @event.listens_for(engine, "before_cursor_execute")
+  def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+  @event.listens_for(engine, "after_cursor_execute")
+  def _after(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_stats()
+    if stats is not None:
+      stats.queries += 1
+      stats.query_seconds += elapsed
+    if elapsed < slow:
+      return
+    metrics.count_slow_query()
+    message = f"Slow query ({elapsed * 1000:.1f} ms): {statement} {parameters!r}"
+    if conn.dialect.name == "sqlite" and not executemany and statement.lstrip().upper().startswith("SELECT"):
+      message += "\n" + explain(cursor, statement, parameters)
+    app.logger.warning(message)
+
+  @event.listens_for(engine, "handle_error")
+  def _error(context):
+    # 失敗した SQL（登録時の重複の IntegrityError など）は after_cursor_execute が呼ばれないのでここで外す
+    if context.connection is not None and context.connection.info.get("query_start"):
+      context.connection.info["query_start"].pop()
+
+
+def _before_request():
+  g.instrumentation = stats = RequestStats()
+  if request.args.get("profile") == "1" and is_admin():
+    stats.profiler = cProfile.Profile()
+    stats.profiler.enable()
+
+
+def _after_request(response):
+  stats = g.pop("instrumentation", None)
+  if stats is None:
+    return response
+  get_metrics(current_app).observe(request.endpoint or "unknown", request.method, response.status_code, stats)
+  if stats.profiler is None:
+    return response
+  stats.profiler.disable()
+  return profile_report(stats, response)
+
+
+def profile_report(stats, response):
+  """?profile=1 の応答（内訳と cProfile の結果のテキスト）"""
+  out = io.StringIO()
+  elapsed = time.perf_counter() - stats.start
+  out.write(f"{request.method} {request.full_path} -> {response.status_code}\n")
+  out.write(f"total: {elapsed * 1000:.1f} ms\n")
+  for name, seconds in stats.phases.items():
+    out.write(f"  {name}: {seconds * 1000:.1f} ms\n")
+  out.write(f"  sql: {stats.queries} statements, {stats.query_seconds * 1000:.1f} ms\n")
+  if "query" in stats.phases:
+    out.write(f"  hydrate (query - sql): {max(stats.phases['query'] - stats.query_seconds, 0) * 1000:.1f} ms\n")
+  out.write("\n")
+  pstats.Stats(stats.profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+  return Response(out.getvalue(), mimetype="text/plain", headers={"Cache-Control": "no-store"})
+
+
+@metrics_bp.get("/metrics")
+def metrics():
+  if not current_app.config["INSTRUMENTATION_ENABLED"]:
+    abort(404)
+  token = current_app.config["METRICS_TOKEN"]
+  given = request.headers.get("Authorization", "")
+  if not (token and hmac.compare_digest(given.encode(), f"Bearer {token}".encode())) and not is_admin():
+    abort(404)  # 存在を知らせない
+  return Response(get_metrics(current_app).render(current_app), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+  """db.init_app の後に呼ぶ。INSTRUMENTATION_ENABLED でなければ /metrics 以外は何もしない"""
+  app.extensions["instrumentation"] = Metrics()
+  app.register_blueprint(metrics_bp)
+  if not app.config["INSTRUMENTATION_ENABLED"]:
+    return
+  with app.app_context():
+    for engine in db.engines.values():
+      install(engine, app)
+  app.before_request(_before_request)
+  app.after_request(_after_request)
+
+
+def get_metrics(app):
+  return app.extensions["instrumentation"]
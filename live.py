@@ -0,0 +1,103 @@
+"""
+一覧のライブ更新（Server-Sent Events）。
+
+  GET /events?view_mode=...&after=<イベントの位置>
+
+タスクの作成・更新・削除を `event: task` / `data: {"kind", "id"}` として送る。
+個人の一覧（view_mode=personal）には自分のタスクの変更だけを送る。
+after（再接続時はブラウザが送る Last-Event-ID。どちらも events.position_token）より後のイベントは DB から送り直すので、
+ページの読み込みから接続までの間や切断中の変更も取りこぼさない。
+送り直しきれないほど遅れた場合や受信が追いつかない場合は `event: reload` を送る。
+
+ASGI モード（asgi.py）では同じ EventStream をイベントループ上で使い、接続ごとにスレッドを使わない。
+"""
+import json
+
+from flask import Blueprint, Response, current_app, request, session
+
+from models import db
+from events import REPLAY_LIMIT, get_broker, parse_position, position_token
+
+live_bp = Blueprint("live", __name__)
+
+RELOAD = "event: reload\ndata: {}\n\n"
+KEEPALIVE = ": keepalive\n\n"  # 中継サーバーに切られないよう定期的に送る
+HEADERS = {
+  "Cache-Control": "no-cache",
+  "X-Accel-Buffering": "no",  # nginx のバッファリングを止める
+}
+
+def format_event(row):
+  return f"id: {position_token((row.seq, row.id))}\nevent: task\ndata: {json.dumps({'kind': row.kind, 'id': row.task_id})}\n\n"
+
+
+class EventStream:
+  """1つの /events 接続で送る内容（どのイベントを送るか、重複の除外）"""
+
+  def __init__(self, user_id, personal, after, retry, keepalive):
+    self.user_id = user_id
+    self.personal = personal
+    self.after = after
+    self.last = after or (0, 0)  # 送った（送らないと決めた）最後の位置 (seq, id)
+    self.retry = retry
+    self.keepalive = keepalive
+
+  @classmethod
+  def from_request(cls):
+    after = parse_position(request.headers.get("Last-Event-ID"))
+    if after is None:
+      after = parse_position(request.args.get("after"))
+    return cls(
+      session.get("user_id"), request.args.get("view_mode", "personal") == "personal", after,
+      current_app.config["LIVE_RETRY_MS"], current_app.config["LIVE_KEEPALIVE"],
+    )
+
+  def opening(self):
+    return f"retry: {self.retry}\n\n"  # 切断時の再接続までの待ち時間（ミリ秒）
+
+  def replay(self, rows):
+    """after より後のイベント（events_after の結果）から送る分。送り直しきれなければ RELOAD だけ"""
+    if len(rows) == REPLAY_LIMIT:
+      return [RELOAD]
+    return [message for message in map(self.message, rows) if message]
+
+  def message(self, row):
+    """row を送るなら SSE のメッセージ、送らない（送信済み・見えない）なら None"""
+    if (row.seq, row.id) <= self.last:
+      return None
+    self.last = (row.seq, row.id)
+    if self.personal and row.user_id != self.user_id:
+      return None
+    return format_event(row)
+
+
+@live_bp.get("/events")
+def stream():
+  events = EventStream.from_request()
+  broker = get_broker(current_app)
+  # 購読を始めてから送り直し分を読む（間のイベントは位置で重複を除く）
+  sub = broker.subscribe(db.engine)
+
+  def generate():
+    try:
+      yield events.opening()
+      if events.after is not None:
+        for message in events.replay(broker.events_after(events.after, REPLAY_LIMIT)):
+          yield message
+          if message == RELOAD:
+            return
+      while True:
+        row = sub.get(timeout=events.keepalive)
+        if sub.overflowed:
+          yield RELOAD
+          return
+        if row is None:
+          yield KEEPALIVE
+          continue
+        message = events.message(row)
+        if message:
+          yield message
+    finally:
+      broker.unsubscribe(sub)
+
+  return Response(generate(), mimetype="text/event-stream", headers=HEADERS)
@@ -0,0 +1,150 @@
+"""
+DB の保守用の flask コマンド。
+
+  flask --app app init-db                 テーブルの作成と既存DBのスキーマ更新（デプロイのたびに実行してよい）
+  flask --app app archive-tasks --days N  done にしてから N 日より経ったタスクをアーカイブする（archive.py）
+  flask --app app analyze-db              ANALYZE（クエリプランナーの統計を更新）
+  flask --app app vacuum-db               VACUUM（空きページを詰めてファイルを小さくする。実行中は書き込みを待たせる）
+  flask --app app optimize-db             PRAGMA optimize と全文検索の索引の統合（SQLite のみ）
+  flask --app app repair-counters         一覧の見出しの件数（task_counter）を task から数え直す（counters.py）
+  flask --app app compact-changes         保持期間切れの task_event を消し、同じタスクの古い変更を詰める（changes.py）
+
+analyze / vacuum / optimize は実行前後の各DB（tasks / users）の大きさを表示する。
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import text
+
+import changes
+import counters
+import events
+import migrations
+from archive import ARCHIVE_BATCH_SIZE, archive_tasks
+from models import db
+from search import FTS_TABLES
+
+# db.engines のキー -> 表示名
+BINDS = {None: "tasks", "users": "users"}
+
+
+def megabytes(size):
+  return f"{size / 1024 / 1024:.1f} MB"
+
+
+def database_size(engine):
+  """DB の大きさの表示（SQLite はファイル・空きページ・WAL、PostgreSQL は pg_database_size）"""
+  with engine.connect() as conn:
+    if engine.dialect.name == "sqlite":
+      page_size = conn.execute(text("PRAGMA page_size")).scalar()
+      pages = conn.execute(text("PRAGMA page_count")).scalar()
+      free = conn.execute(text("PRAGMA freelist_count")).scalar()
+      path = engine.url.database
+      wal = f"{path}-wal" if path and path != ":memory:" else None
+      wal_size = os.path.getsize(wal) if wal and os.path.exists(wal) else 0
+      return f"{megabytes(pages * page_size)} (free {megabytes(free * page_size)}, WAL {megabytes(wal_size)})"
+    if engine.dialect.name == "postgresql":
+      return megabytes(conn.execute(text("SELECT pg_database_size(current_database())")).scalar())
+  return "unknown"
+
+
+def run_on_each_database(label, statements):
+  """statements(db.engines のキー, dialect 名) の SQL を各DBで autocommit で実行し、前後の大きさを表示する"""
+  for key, name in BINDS.items():
+    engine = db.engines[key]
+    sql = statements(key, engine.dialect.name)
+    if not sql:
+      click.echo(f"{name}: {label} is not supported on {engine.dialect.name}")
+      continue
+    before = database_size(engine)
+    start = time.perf_counter()
+    # VACUUM はトランザクションの中では実行できない
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+      for statement in sql:
+        conn.execute(text(statement))
+    seconds = time.perf_counter() - start
+    click.echo(f"{name}: {label} {seconds:.1f}s, {before} -> {database_size(engine)}")
+
+
+def fts_optimize(key):
+  # FTS5 の索引の b-tree を1つにまとめる（追加・削除を繰り返すと分かれて検索が遅くなる）。索引は tasks.db にだけある
+  return [f"INSERT INTO {name}({name}) VALUES ('optimize')" for name in FTS_TABLES.values()] if key is None else []
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+  """テーブルを作り、既存DBを最新スキーマに揃える（何度実行してもよい）"""
+  migrations.init_db()
+  click.echo("Initialized the databases.")
+
+
+@click.command("archive-tasks")
+@with_appcontext
+@click.option("--days", type=int, default=90, show_default=True, help="done にしてからこの日数より経ったタスクを移す")
+@click.option("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, show_default=True, help="1トランザクションで移す件数")
+def archive_command(days, batch_size):
+  """古い done のタスクを task_archive に移す"""
+  start = time.perf_counter()
+  count = archive_tasks(days, batch_size)
+  click.echo(f"Archived {count} tasks ({time.perf_counter() - start:.1f}s).")
+
+
+@click.command("analyze-db")
+@with_appcontext
+def analyze_command():
+  """ANALYZE でクエリプランナーの統計を更新する"""
+  run_on_each_database("ANALYZE", lambda key, dialect: ["ANALYZE"] if dialect in ("sqlite", "postgresql", "mysql") else [])
+
+
+@click.command("vacuum-db")
+@with_appcontext
+def vacuum_command():
+  """VACUUM で空きページを詰める（SQLite は WAL も切り詰める）"""
+  def statements(key, dialect):
+    if dialect == "sqlite":
+      return ["VACUUM", "PRAGMA wal_checkpoint(TRUNCATE)"]
+    return ["VACUUM"] if dialect == "postgresql" else []
+  run_on_each_database("VACUUM", statements)
+
+
+@click.command("optimize-db")
+@with_appcontext
+def optimize_command():
+  """PRAGMA optimize と全文検索の索引の統合（SQLite のみ）"""
+  run_on_each_database(
+    "optimize", lambda key, dialect: [*fts_optimize(key), "PRAGMA optimize"] if dialect == "sqlite" else [],
+  )
+
+
+@click.command("repair-counters")
+@with_appcontext
+def repair_counters_command():
+  """一覧の件数（task_counter）を task から数え直して作り直す"""
+  start = time.perf_counter()
+  wrong = counters.rebuild()
+  db.session.commit()
+  click.echo(f"Rebuilt task counters, {wrong} were wrong ({time.perf_counter() - start:.1f}s).")
+
+
+@click.command("compact-changes")
+@with_appcontext
+def compact_changes_command():
+  """保持期間（LIVE_EVENT_RETENTION）切れの変更を消し、CHANGES_COMPACT_AFTER 秒より前の同じタスクの古い変更を詰める"""
+  now = datetime.now()
+  expired = events.prune()
+  compacted = changes.compact(now - timedelta(seconds=current_app.config["CHANGES_COMPACT_AFTER"]))
+  db.session.commit()
+  click.echo(f"Expired {expired} task events, compacted {compacted}.")
+
+
+def init_app(app):
+  for command in (
+    init_db_command, archive_command, analyze_command, vacuum_command, optimize_command, repair_counters_command,
+    compact_changes_command,
+  ):
+    app.cli.add_command(command)
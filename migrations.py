@@ -0,0 +1,120 @@
+"""
+DB の作成と既存DBファイルのスキーマ更新（flask --app app init-db から呼ぶ）。
+
+db.create_all() は既存テーブルに列やインデックスを追加しないため、
+古い tasks.db に対してはここで不足分を追加・バックフィルする。
+何度実行しても同じ結果になる（冪等）。
+"""
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+
+def column_type(column, dialect):
+  # DB ごとの型名（SQLite の DATETIME は PostgreSQL では TIMESTAMP WITHOUT TIME ZONE）
+  return column.type.compile(dialect=dialect)
+
+
+def init_db():
+  """両DBのテーブルを作り、既存DBを最新スキーマに揃える（app_context 内で呼ぶこと）"""
+  from models import db
+  db.create_all()
+  upgrade()
+  upgrade_users()
+
+
+def alter_column_type_sql(column, dialect):
+  """column の型を今の定義に変える ALTER TABLE（PostgreSQL / MySQL）"""
+  preparer = dialect.identifier_preparer
+  table, name = preparer.format_table(column.table), preparer.format_column(column)
+  type_ = column_type(column, dialect)
+  if dialect.name == "postgresql":
+    return f"ALTER TABLE {table} ALTER COLUMN {name} TYPE {type_}"
+  return f"ALTER TABLE {table} MODIFY {name} {type_}{'' if column.nullable else ' NOT NULL'}"
+
+
+def upgrade_users():
+  """users.db を最新スキーマに揃える（app_context 内で呼ぶこと）"""
+  from models import db, User
+  engine = db.engines["users"]
+  column = User.__table__.c.password_hash
+  # 1. password_hash を String(255) に広げる（scrypt のハッシュは 128 文字に収まらない。SQLite は長さを見ないのでそのまま）
+  if engine.dialect.name in ("postgresql", "mysql"):
+    current = next(c for c in inspect(engine).get_columns(User.__table__.name) if c["name"] == column.name)
+    if (getattr(current["type"], "length", None) or 0) < column.type.length:
+      with engine.begin() as conn:
+        conn.execute(text(alter_column_type_sql(column, engine.dialect)))
+
+
+def upgrade():
+  """tasks.db を最新スキーマに揃える（app_context 内で呼ぶこと）"""
+  from models import db, Task, ArchivedTask, TaskCounter, TaskEvent, TaskEventWatermark, PRIORITY_RANK, DUE_DATE_NONE  # models.pyからimport
+  import counters
+  import search
+  engine = db.engine
+  table = Task.__table__
+  columns = {c["name"] for c in inspect(engine).get_columns(table.name)}
+
+  with engine.begin() as conn:
+    # 1. priority_rank 列の追加と既存行のバックフィル
+    if "priority_rank" not in columns:
+      conn.execute(text(
+        f"ALTER TABLE {table.name} ADD COLUMN priority_rank {column_type(table.c.priority_rank, engine.dialect)}"
+        f" NOT NULL DEFAULT {PRIORITY_RANK['Mid']}"
+      ))
+      conn.execute(
+        table.update().values(priority_rank=db.case(
+          *[(table.c.priority == p, rank) for p, rank in PRIORITY_RANK.items()],
+          else_=PRIORITY_RANK["Mid"],
+        ))
+      )
+
+    # 2. due_sort 列の追加と既存行のバックフィル（期日なしは番兵値）
+    if "due_sort" not in columns:
+      conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN due_sort {column_type(table.c.due_sort, engine.dialect)}"))
+      conn.execute(
+        table.update().values(due_sort=db.func.coalesce(table.c.due_date, DUE_DATE_NONE))
+      )
+
+    # 3. done_at 列（完了日時）の追加。既存の done は完了日時が分からないので移行した日時にする
+    #    （作成日時で埋めると、done にしたばかりのタスクが次のアーカイブで一覧から消えてしまう）
+    if "done_at" not in columns:
+      conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN done_at {column_type(table.c.done_at, engine.dialect)}"))
+      conn.execute(table.update().where(table.c.status == "done").values(done_at=datetime.now()))
+    archive = ArchivedTask.__table__
+    if "done_at" not in {c["name"] for c in inspect(conn).get_columns(archive.name)}:
+      conn.execute(text(f"ALTER TABLE {archive.name} ADD COLUMN done_at {column_type(archive.c.done_at, engine.dialect)}"))
+
+    # 4. 複合インデックスの作成（既にあればスキップ）
+    for index in table.indexes:
+      index.create(conn, checkfirst=True)
+
+    # 5. 全文検索の索引（SQLite のみ。初回は既存の行から作る）
+    search.install(conn)
+
+    # 6. task_event の seq 列（以前のイベントは seq 0 にし、(0, id) の順で今のイベントより前に並べる）と、
+    #    消したイベントの位置の seq（以前の版が残した id は (0, id) になる）。id だけの索引は (user_id, seq, id) に置き換える
+    events = TaskEvent.__table__
+    if "seq" not in {c["name"] for c in inspect(conn).get_columns(events.name)}:
+      conn.execute(text(f"ALTER TABLE {events.name} ADD COLUMN seq {column_type(events.c.seq, engine.dialect)}"))
+      conn.execute(events.update().values(seq=0))
+    watermark = TaskEventWatermark.__table__
+    if "pruned_through_seq" not in {c["name"] for c in inspect(conn).get_columns(watermark.name)}:
+      conn.execute(text(
+        f"ALTER TABLE {watermark.name} ADD COLUMN pruned_through_seq"
+        f" {column_type(watermark.c.pruned_through_seq, engine.dialect)} NOT NULL DEFAULT 0"
+      ))
+    if "ix_task_event_user" in {ix["name"] for ix in inspect(conn).get_indexes(events.name)}:
+      conn.execute(text(f"DROP INDEX ix_task_event_user{' ON ' + events.name if engine.dialect.name == 'mysql' else ''}"))
+
+    # 7. 変更フィードの索引と、消したイベントの位置（以前の版が消した分は、残っている最小の id の手前までとみなす）
+    for index in TaskEvent.__table__.indexes:
+      index.create(conn, checkfirst=True)
+    if conn.execute(db.select(TaskEventWatermark.id)).first() is None:
+      oldest = conn.execute(db.select(db.func.min(TaskEvent.id))).scalar()
+      conn.execute(db.insert(TaskEventWatermark).values(id=1, pruned_through=oldest - 1 if oldest else 0))
+
+  # 8. 一覧の件数（task_counter を後から追加した既存DBでは task から数える）
+  if not db.session.query(TaskCounter.query.exists()).scalar() and db.session.query(Task.query.exists()).scalar():
+    counters.rebuild()
+    db.session.commit()
@@ -1,13 +1,20 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 from datetime import datetime
 
 db = SQLAlchemy()
 
+# 優先度の並び順（小さいほど優先）。Task.priority_rank に保存してインデックスで並べ替える
+PRIORITY_RANK = {"High": 1, "Mid": 2, "Low": 3}
+# 期日なしを最後に並べるための番兵値。Task.due_sort に保存する
+# （SQLiteは複数列のORDER BYで NULLS LAST をインデックスで処理できないため）
+DUE_DATE_NONE = datetime(9999, 12, 31)
+
 class User(db.Model):
     __bind_key__ = "users"
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)  # scrypt の既定の形式で 162 文字
 
 class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -15,6 +22,116 @@ class Task(db.Model):
     title = db.Column(db.String(100), nullable=False)
     detail = db.Column(db.Text, nullable=True)
     priority = db.Column(db.String(10), nullable=False, default="Mid")
+    priority_rank = db.Column(db.Integer, nullable=False, default=PRIORITY_RANK["Mid"])  # priorityから自動設定
     status = db.Column(db.String(10), nullable=False, default="todo")
     due_date = db.Column(db.DateTime, nullable=True)
+    due_sort = db.Column(db.DateTime, nullable=False, default=DUE_DATE_NONE)  # due_dateから自動設定
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    done_at = db.Column(db.DateTime, nullable=True)  # done にした日時（status から自動設定。アーカイブの判定に使う）
+
+    # index() の絞り込み（user_id / status）× 並べ替え（SORT_OPTIONS）に対応する複合インデックス
+    # 列順は app.py の ORDER BY と一致させること
+    __table_args__ = (
+        # Created At (Newest First)
+        db.Index("ix_task_created", created_at.desc(), id.desc()),
+        db.Index("ix_task_user_created", user_id, created_at.desc(), id.desc()),
+        db.Index("ix_task_status_created", status, created_at.desc(), id.desc()),
+        db.Index("ix_task_user_status_created", user_id, status, created_at.desc(), id.desc()),
+        # Priority
+        db.Index("ix_task_priority", priority_rank, due_sort, created_at.desc(), id.desc()),
+        db.Index("ix_task_user_priority", user_id, priority_rank, due_sort, created_at.desc(), id.desc()),
+        db.Index("ix_task_status_priority", status, priority_rank, due_sort, created_at.desc(), id.desc()),
+        db.Index("ix_task_user_status_priority", user_id, status, priority_rank, due_sort, created_at.desc(), id.desc()),
+        # Due Date
+        db.Index("ix_task_due", due_sort, created_at.desc(), id.desc()),
+        db.Index("ix_task_user_due", user_id, due_sort, created_at.desc(), id.desc()),
+        db.Index("ix_task_status_due", status, due_sort, created_at.desc(), id.desc()),
+        db.Index("ix_task_user_status_due", user_id, status, due_sort, created_at.desc(), id.desc()),
+        # アーカイブの対象（done にしてから N 日。archive.archive_tasks）
+        db.Index("ix_task_status_done", status, done_at),
+    )
+
+    @validates("priority")
+    def _sync_priority_rank(self, key, value):
+        # priority を変更したら並べ替え用の priority_rank も合わせる
+        self.priority_rank = PRIORITY_RANK.get(value, PRIORITY_RANK["Mid"])
+        return value
+
+    @validates("status")
+    def _sync_done_at(self, key, value):
+        # done にした日時を残す（done のままなら変えない、done 以外に戻したら消す）
+        if value != "done":
+            self.done_at = None
+        elif self.status != "done" or self.done_at is None:
+            self.done_at = datetime.now()
+        return value
+
+    @validates("due_date")
+    def _sync_due_sort(self, key, value):
+        # 期日なしは番兵値にして並べ替えで最後に来るようにする
+        self.due_sort = value or DUE_DATE_NONE
+        return value
+
+class ArchivedTask(db.Model):
+    # アーカイブした古い done のタスク（archive.archive_tasks が task から移す）
+    # 一覧には出さず、archived=1 のときだけ別枠で検索・表示する（全文検索は search.py の task_archive_fts）
+    __tablename__ = "task_archive"
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)  # 元のタスクの id
+    user_id = db.Column(db.Integer, nullable=True)
+    title = db.Column(db.String(100), nullable=False)
+    detail = db.Column(db.Text, nullable=True)
+    priority = db.Column(db.String(10), nullable=False)
+    priority_rank = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(10), nullable=False)
+    due_date = db.Column(db.DateTime, nullable=True)
+    due_sort = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    done_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    # 新しい順（archive.archived_query）
+    __table_args__ = (
+        db.Index("ix_task_archive_created", created_at.desc(), id.desc()),
+        db.Index("ix_task_archive_user_created", user_id, created_at.desc(), id.desc()),
+    )
+
+class BoardVersion(db.Model):
+    # 一覧の変更カウンタ。scope は "all"（全タスク）または "user:<id>"（個人の一覧）
+    # タスクを書き込むたびに同じトランザクションで +1 し、キャッシュの無効化に使う
+    scope = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+class TaskCounter(db.Model):
+    # 一覧の見出しの件数。scope（BoardVersion と同じ）× status × priority_rank ごとのタスク数
+    # タスクを書き込むたびに同じトランザクションで増減する（counters.py）。ずれたら flask repair-counters で作り直す
+    scope = db.Column(db.String(40), primary_key=True)
+    status = db.Column(db.String(10), primary_key=True)
+    priority_rank = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class TaskEvent(db.Model):
+    # タスクの変更履歴（ライブ更新と変更フィードの配信用。events.py / changes.py 参照）
+    # 書き込みと同じトランザクションで追加するので、コミットされた変更だけが配信される
+    # 読む順は (seq, id)。seq は commit の直前に BoardVersion "all" の値を入れる（commit の順に増える）
+    __table_args__ = (
+        db.Index("ix_task_event_seq", "seq", "id"),  # ライブ更新・全タスクの変更フィード
+        db.Index("ix_task_event_user_seq", "user_id", "seq", "id"),  # 個人の変更フィード（changes?since=）
+        {"sqlite_autoincrement": True},  # 削除した id を再利用しない（id 順に読むため）
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.Integer, nullable=True)  # commit までは NULL（events._before_commit が入れる）
+    kind = db.Column(db.String(10), nullable=False)  # created / updated / deleted
+    task_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)  # タスクの所有者（個人一覧の購読者への振り分け用）
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True)
+
+class TaskEventWatermark(db.Model):
+    # task_event を保持期間切れで消した最後の位置 (pruned_through_seq, pruned_through)（1行だけ）
+    # 変更フィードの since がこれより前なら再同期させる
+    __tablename__ = "task_event_watermark"
+    id = db.Column(db.Integer, primary_key=True)
+    pruned_through = db.Column(db.Integer, nullable=False, default=0)  # TaskEvent.id
+    pruned_through_seq = db.Column(db.Integer, nullable=False, default=0)  # TaskEvent.seq
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
@@ -0,0 +1,65 @@
+"""
+一覧のキーセット（カーソル）ページング。
+
+OFFSET は読み飛ばす行数だけ遅くなるため、直前ページ最後の行の並べ替えキーを
+不透明なトークン（after）にして、その続きからインデックスで読み始める。
+"""
+import base64
+import json
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+  """after トークンが壊れている、または別の並び順のもの"""
+
+
+def encode_cursor(sort_by, keys, row):
+  """row の並べ替えキーを after トークンにする"""
+  values = []
+  for col, _desc in keys:
+    value = getattr(row, col.key)
+    values.append(value.isoformat() if isinstance(value, datetime) else value)
+  raw = json.dumps([sort_by, values], separators=(",", ":"))
+  return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort_by, keys):
+  """after トークンを並べ替えキーの値リストに戻す"""
+  try:
+    raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    token_sort, values = json.loads(raw)
+    if token_sort != sort_by or len(values) != len(keys):
+      raise InvalidCursor(token)
+    return [
+      datetime.fromisoformat(v) if col.type.python_type is datetime else int(v)
+      for (col, _desc), v in zip(keys, values)
+    ]
+  except (ValueError, TypeError) as e:
+    raise InvalidCursor(token) from e
+
+
+def fetch_page(q, keys, after, per_page):
+  """
+  並べ替え済みのクエリ q から after の続きを per_page 件取り出す。
+  戻り値: (行のリスト, 次のページがあるか)
+
+  「after より後ろ」をキーの前方一致ごとのグループに分けて順に読む。
+    k1 = v1 AND ... AND k(n-1) = v(n-1) AND kn > vn
+    ...
+    k1 > v1
+  どのグループも複合インデックスの等価条件＋範囲条件で先頭に直接シークできるので、
+  何ページ目でも読む行数は per_page 程度で済む。
+  """
+  limit = per_page + 1  # 1件多く読んで次ページの有無を判定
+  if after is None:
+    rows = q.limit(limit).all()
+  else:
+    rows = []
+    for i in range(len(keys) - 1, -1, -1):
+      if len(rows) >= limit:
+        break
+      conds = [col == value for (col, _desc), value in zip(keys[:i], after[:i])]
+      col, desc = keys[i]
+      conds.append(col < after[i] if desc else col > after[i])
+      rows.extend(q.filter(*conds).limit(limit - len(rows)).all())
+  return rows[:per_page], len(rows) > per_page
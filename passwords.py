@@ -0,0 +1,95 @@
+"""
+パスワードのハッシュ計算（登録・ログイン）。
+
+ハッシュ計算はわざと重くしてある処理なので、リクエストを処理するスレッドではなく
+プロセスプールで実行する（ワーカーの CPU とスレッドを一覧などのリクエストに残す）。
+プールに入っている件数（実行中＋待ち）が PASSWORD_HASH_MAX_PENDING に達したら計算を待たずに
+503（Retry-After 付き）を返し、ログインが集中しても後ろに行列を作らない。
+
+  PASSWORD_HASH_METHOD       werkzeug の method 形式のアルゴリズムとコスト（例: scrypt:32768:8:1, pbkdf2:sha256:600000）
+  PASSWORD_HASH_WORKERS      プロセス数（0 ならリクエストのスレッドで直接計算する）
+  PASSWORD_HASH_MAX_PENDING  プールに入れられる件数の上限
+  PASSWORD_HASH_RETRY_AFTER  満杯のときに返す Retry-After（秒）
+
+ログインに成功したとき、保存済みのハッシュの method が設定と違えば（コストを上げた場合など）
+新しい設定でハッシュし直す。
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from concurrency import run_blocking, wait_future
+
+
+class HashPool:
+  """件数に上限のあるプロセスプール（満杯なら ServiceUnavailable）"""
+
+  def __init__(self, workers, max_pending, retry_after):
+    self.workers = workers
+    self.max_pending = max_pending
+    self.retry_after = retry_after
+    self._slots = threading.BoundedSemaphore(max_pending)
+    self._lock = threading.Lock()
+    self._executor = None
+
+  def run(self, fn, *args):
+    if not self.workers:
+      return run_blocking(fn, *args)
+    if not self._slots.acquire(blocking=False):
+      raise ServiceUnavailable("Too many sign-ins in progress. Please retry shortly.", retry_after=self.retry_after)
+    try:
+      future = self.executor().submit(fn, *args)
+    except BaseException:
+      self._slots.release()
+      raise
+    future.add_done_callback(lambda _: self._slots.release())
+    return wait_future(future)
+
+  def executor(self):
+    with self._lock:
+      if self._executor is None:
+        # spawn: リクエスト処理のスレッドや DB 接続を子プロセスに引き継がない
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+      return self._executor
+
+  def shutdown(self):
+    with self._lock:
+      if self._executor is not None:
+        self._executor.shutdown(cancel_futures=True)
+        self._executor = None
+
+
+@lru_cache(maxsize=None)
+def method_id(method):
+  """method を保存されるときの形に直す（"scrypt" -> "scrypt:32768:8:1" など）"""
+  return generate_password_hash("", method, salt_length=1).split("$", 1)[0]
+
+
+def hash_password(password):
+  config = current_app.config
+  return get_pool(current_app).run(generate_password_hash, password, config["PASSWORD_HASH_METHOD"])
+
+
+def verify_password(password_hash, password):
+  return get_pool(current_app).run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+  """保存済みのハッシュが今の PASSWORD_HASH_METHOD で作られていなければ True"""
+  return password_hash.split("$", 1)[0] != method_id(current_app.config["PASSWORD_HASH_METHOD"])
+
+
+def init_app(app):
+  config = app.config
+  app.extensions["password_hash_pool"] = HashPool(
+    config["PASSWORD_HASH_WORKERS"], config["PASSWORD_HASH_MAX_PENDING"], config["PASSWORD_HASH_RETRY_AFTER"],
+  )
+
+
+def get_pool(app):
+  return app.extensions["password_hash_pool"]
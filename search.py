@@ -0,0 +1,105 @@
+"""
+タスクの全文検索（title / detail）。
+
+SQLite では FTS5 の外部コンテンツテーブル task_fts を索引に使う。
+task へのトリガーで同期するので、ORM からの変更も一括 UPDATE / DELETE もそのまま反映される。
+検索語は空白で区切った語の AND で、各語は前方一致（"tas" で "task" に一致）。
+FTS5 が使えない DB（PostgreSQL など）では title / detail の部分一致にフォールバックする（関連度順なし）。
+
+unicode61 トークナイザは空白・記号で語を区切るので、分かち書きしない日本語の文は
+先頭からの前方一致でしか引けない点に注意。
+"""
+import re
+
+from sqlalchemy import and_, column, func, literal_column, or_, select, table, text, false
+
+from models import db, Task
+
+FTS_TABLE = "task_fts"
+ARCHIVE_FTS_TABLE = "task_archive_fts"  # アーカイブ（models.ArchivedTask）用
+fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+# 一致件数がこれを超える語は「よく出る語」として、一致した行からではなく
+# 並べ替え用のインデックスを順に読んで一致するかを調べる（apply_search 参照）
+DENSE_MATCHES = 10000
+
+
+def fts_ddl(name, content):
+  """content テーブルの外部コンテンツの FTS5 テーブル name と、同期するトリガー（何度実行しても同じ結果になる）"""
+  return [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+    f"title, detail, content='{content}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {content} BEGIN"
+    f" INSERT INTO {name}(rowid, title, detail) VALUES (new.id, new.title, new.detail); END",
+    f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {content} BEGIN"
+    f" INSERT INTO {name}({name}, rowid, title, detail) VALUES ('delete', old.id, old.title, old.detail); END",
+    # status だけの変更では索引を触らない
+    f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF title, detail ON {content} BEGIN"
+    f" INSERT INTO {name}({name}, rowid, title, detail) VALUES ('delete', old.id, old.title, old.detail);"
+    f" INSERT INTO {name}(rowid, title, detail) VALUES (new.id, new.title, new.detail); END",
+  ]
+
+
+# 元のテーブル -> FTS5 テーブル
+FTS_TABLES = {"task": FTS_TABLE, "task_archive": ARCHIVE_FTS_TABLE}
+FTS_DDL = fts_ddl(FTS_TABLE, "task")
+
+
+def fts_enabled(dialect):
+  return dialect.name == "sqlite"
+
+
+def install(conn):
+  """FTS5 テーブルとトリガーを作る。新しく作ったときは既存の行から索引を作り直す（migrations.upgrade から呼ぶ）"""
+  if not fts_enabled(conn.dialect):
+    return
+  for content, name in FTS_TABLES.items():
+    exists = conn.execute(
+      text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+    ).first()
+    for ddl in fts_ddl(name, content):
+      conn.execute(text(ddl))
+    if not exists:
+      conn.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+
+
+def search_terms(query):
+  """入力から検索語を取り出す（FTS5 の演算子や記号は語として扱わない）"""
+  return re.findall(r"\w+", query or "")
+
+
+def match_expression(terms):
+  # 各語を引用符で囲み（AND / OR / NEAR などを演算子にしない）、* で前方一致にする
+  return " ".join(f'"{term}"*' for term in terms)
+
+
+def apply_search(q, query, ranked=False, model=Task):
+  """
+  model（Task、またはアーカイブの ArchivedTask）のクエリ q を検索語 query で絞り込む。
+  ranked=True なら関連度（bm25）順に並べ替える（FTS5 が使えない DB では並べ替えない）。
+  一括操作（UPDATE / DELETE）にも使えるよう、ranked=False では JOIN せず id IN (...) で絞り込む。
+  """
+  terms = search_terms(query)
+  if not terms:
+    return q.filter(false())
+
+  if not fts_enabled(db.session.get_bind(model).dialect):
+    return q.filter(and_(*[
+      or_(model.title.icontains(term, autoescape=True), model.detail.icontains(term, autoescape=True))
+      for term in terms
+    ]))
+
+  name = FTS_TABLES[model.__tablename__]
+  index = fts if name == FTS_TABLE else table(name, column("rowid"), column("rank"))
+  match = literal_column(name).op("MATCH")(match_expression(terms))
+  if ranked:
+    return q.join(index, index.c.rowid == model.id).filter(match).order_by(None).order_by(index.c.rank, model.id.desc())
+
+  # 一致が少なければ一致した行を主キーで引いて並べ替える（SQLite の既定の実行計画）。
+  # 一致が多いとその全件の並べ替えが重いので、task.id + 0 で主キーを使わせず、
+  # 並べ替え用のインデックスを順に読んで LIMIT 件そろった時点で止める
+  rowids = select(index.c.rowid).where(match)
+  dense = db.session.execute(
+    select(func.count()).select_from(rowids.limit(DENSE_MATCHES + 1).subquery())
+  ).scalar() > DENSE_MATCHES
+  return q.filter((model.id + 0 if dense else model.id).in_(rowids))
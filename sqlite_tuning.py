@@ -0,0 +1,45 @@
+"""
+SQLite の接続ごとの PRAGMA 設定。
+
+PRAGMA の多くは接続単位なので、エンジンの connect イベントで新しい接続ごとに適用する。
+app.config["SQLITE_PRAGMAS"] で値を変更・追加できる（空にすると何もしない）。
+"""
+from sqlalchemy import event
+
+DEFAULT_PRAGMAS = {
+  "journal_mode": "WAL",           # 読み取りが書き込みを待たない
+  "synchronous": "NORMAL",         # WAL では NORMAL でも壊れない（電源断で直近のコミットは失われうる。グループコミット時は FULL）
+  "busy_timeout": 5000,            # ロック中は即エラーにせず最大5秒待つ（ミリ秒）
+  "mmap_size": 256 * 1024 * 1024,  # 読み取りをメモリマップで行う（バイト）
+  "cache_size": -64000,            # ページキャッシュ（負数は KiB 指定で約64MB）
+  "temp_store": "MEMORY",          # 一時テーブル・ソート用の領域をメモリに置く
+}
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+  cursor = dbapi_connection.cursor()
+  try:
+    for name, value in pragmas.items():
+      if not name.isidentifier():
+        raise ValueError(f"Invalid PRAGMA name: {name!r}")
+      cursor.execute(f"PRAGMA {name} = {value}")
+  finally:
+    cursor.close()
+
+
+def install(engine, pragmas):
+  """engine の新しい接続すべてに pragmas を適用する（SQLite 以外は何もしない）"""
+  if engine.dialect.name != "sqlite" or not pragmas:
+    return
+
+  @event.listens_for(engine, "connect")
+  def _on_connect(dbapi_connection, connection_record):
+    apply_pragmas(dbapi_connection, pragmas)
+
+
+def init_app(app, db):
+  """db.init_app の直後、最初の接続より前に呼ぶこと（tasks.db / users.db の両エンジンに適用）"""
+  pragmas = app.config.get("SQLITE_PRAGMAS")
+  with app.app_context():
+    for engine in db.engines.values():
+      install(engine, pragmas)
@@ -0,0 +1,94 @@
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "benchmarks"))
+
+import datagen  # noqa: E402
+
+@pytest.fixture(scope="session")
+def bench_dataset(request, tmp_path_factory):
+    """
+    合成データ（--bench-tasks 件のタスクと --bench-users 人のユーザー）。
+    --bench-data のディレクトリに既に tasks.db があれば作り直さずにそのまま使う。
+    """
+    config = request.config
+    directory = Path(config.getoption("--bench-data") or tmp_path_factory.mktemp("bench"))
+    seed_seconds = None
+    if not (directory / "tasks.db").exists():
+        seed_seconds = datagen.generate(directory, config.getoption("--bench-tasks"), config.getoption("--bench-users"))
+    with sqlite3.connect(directory / "tasks.db") as conn:
+        tasks = conn.execute("SELECT count(*) FROM task").fetchone()[0]
+    with sqlite3.connect(directory / "users.db") as conn:
+        users = conn.execute("SELECT count(*) FROM user").fetchone()[0]
+    return {"urls": datagen.urls(directory), "tasks": tasks, "users": users, "seed_seconds": seed_seconds}
+
+@pytest.fixture()
+def database_urls(bench_dataset):
+    # conftest.app が合成データの DB を開くようにする
+    return bench_dataset["urls"]
+
+@pytest.fixture(autouse=True)
+def uncached_board(app):
+    # 毎回クエリとテンプレートの処理を計る
+    app.config["BOARD_CACHE_ENABLED"] = False
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+@pytest.fixture(scope="session")
+def bench_report(request, bench_dataset):
+    """計測結果を集め、セッションの最後に --bench-json へ書き出す"""
+    config = request.config
+    report = {
+        "commit": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "dataset": {k: bench_dataset[k] for k in ("tasks", "users", "seed_seconds")},
+        "repeat": config.getoption("--bench-repeat"),
+        "results": [],
+    }
+    yield report
+    path = Path(config.getoption("--bench-json"))
+    if not path.is_absolute():
+        path = Path(config.invocation_params.dir) / path
+    report["results"].sort(key=lambda r: r["name"])
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+
+@pytest.fixture()
+def record(bench_report):
+    """
+    record(name, group, samples, **extra): 1回ごとの秒数のリストを集計して結果に加える。
+    比較（benchmarks/compare_results.py）は name ごとの median_ms で行う。
+    """
+    def _record(name, group, samples, **extra):
+        ordered = sorted(samples)
+        result = {
+            "name": name,
+            "group": group,
+            "samples": len(ordered),
+            "min_ms": ordered[0] * 1000,
+            "median_ms": statistics.median(ordered) * 1000,
+            "p95_ms": ordered[max(int(len(ordered) * 0.95) - 1, 0)] * 1000,
+            "mean_ms": statistics.fmean(ordered) * 1000,
+            **extra,
+        }
+        bench_report["results"].append(result)
+        return result
+    return _record
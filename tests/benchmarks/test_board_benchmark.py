@@ -0,0 +1,48 @@
+import html
+import itertools
+import re
+import time
+import pytest
+
+# --benchmark を付けたときだけ実行する（conftest.pytest_collection_modifyitems）
+pytestmark = pytest.mark.benchmark
+
+# index() の sort_by × 絞り込み × view_mode の全組み合わせ
+VIEW_MODES = ["personal", "all"]
+STATUS_FILTERS = [None, "todo", "doing", "done"]
+PRIORITY_FILTERS = [None, "High", "Mid", "Low"]
+SORTS = [None, "Priority", "Due Date"]  # None は既定の Created At (Newest First)
+
+def next_url(body: str):
+    # 「Load more」のリンク（次のページ）
+    m = re.search(r'<div class="text-center my-3" id="loadMore">\s*<a [^>]*href="([^"]+)"', body)
+    return html.unescape(m.group(1)) if m else None
+
+def measure(client, url, repeat):
+    """1回目は捨てて（接続・ステートメントのキャッシュを温める）repeat 回の秒数を返す"""
+    samples = []
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        res = client.get(url)
+        samples.append(time.perf_counter() - start)
+        assert res.status_code == 200
+    return samples[1:], res.get_data(as_text=True)
+
+@pytest.mark.parametrize(
+    "view_mode,status,priority,sort_by",
+    list(itertools.product(VIEW_MODES, STATUS_FILTERS, PRIORITY_FILTERS, SORTS)),
+)
+def test_index(client, record, request, view_mode, status, priority, sort_by):
+    repeat = request.config.getoption("--bench-repeat")
+    params = {"view_mode": view_mode, "status": status, "priority": priority, "sort_by": sort_by}
+    query = "&".join(f"{k}={v}" for k, v in params.items() if v)
+    name = f"index {view_mode} status={status or '-'} priority={priority or '-'} sort_by={sort_by or 'Created At'}"
+
+    samples, body = measure(client, f"/?{query}", repeat)
+    record(f"{name} page=1", "index", samples, params=params, page=1)
+
+    # 2ページ目（キーセットのカーソル）。1ページに収まる場合は計らない
+    url = next_url(body)
+    if url:
+        samples, _ = measure(client, url, repeat)
+        record(f"{name} page=2", "index", samples, params=params, page=2)
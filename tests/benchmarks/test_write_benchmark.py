@@ -0,0 +1,51 @@
+import time
+import pytest
+
+# --benchmark を付けたときだけ実行する（conftest.pytest_collection_modifyitems）
+pytestmark = pytest.mark.benchmark
+
+JSON = {"Accept": "application/json"}  # 一覧へのリダイレクトではなく JSON で返させる
+
+def run(client, requests):
+    """requests（(path, form) の列）を順に POST して1件ごとの秒数を返す"""
+    samples = []
+    for path, form in requests:
+        start = time.perf_counter()
+        res = client.post(path, data=form, headers=JSON)
+        samples.append(time.perf_counter() - start)
+        assert res.status_code in (200, 204, 302), (path, res.status_code)
+    return samples
+
+def test_create_update_delete(app, client, db_models, record, request):
+    n = request.config.getoption("--bench-writes")
+    Task = db_models.Task
+
+    with app.app_context():
+        last_id = db_models.db.session.query(db_models.db.func.max(Task.id)).scalar() or 0
+
+    samples = run(client, [
+        ("/tasks", {"title": f"bench {i}", "detail": "benchmark", "priority": "High", "due_date": "2030-01-01"})
+        for i in range(n)
+    ])
+    record("write create", "write", samples, ops_per_sec=n / sum(samples))
+
+    with app.app_context():
+        ids = [t.id for t in Task.query.filter(Task.id > last_id).order_by(Task.id)]
+    assert len(ids) == n
+
+    statuses = ["doing", "done", "todo"]
+    samples = run(client, [(f"/tasks/{task_id}/status", {"status": statuses[i % 3]}) for i, task_id in enumerate(ids)])
+    record("write update status", "write", samples, ops_per_sec=n / sum(samples))
+
+    samples = run(client, [
+        (f"/tasks/{task_id}/update", {"title": f"bench {task_id} edited", "detail": "", "priority": "Low", "due_date": ""})
+        for task_id in ids
+    ])
+    record("write update", "write", samples, ops_per_sec=n / sum(samples))
+
+    # 削除で合成データを元の件数に戻す（--bench-data で使い回せるように）
+    samples = run(client, [(f"/tasks/{task_id}/delete", {}) for task_id in ids])
+    record("write delete", "write", samples, ops_per_sec=n / sum(samples))
+
+    with app.app_context():
+        assert Task.query.filter(Task.id > last_id).count() == 0
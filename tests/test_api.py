@@ -0,0 +1,108 @@
+from datetime import datetime
+import json
+import pytest
+
+def seed(app, db_models):
+    """user_id=1 に3件、user_id=2 に1件"""
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        db.session.query(Task).delete()
+        tasks = [
+            Task(title="A", priority="High", status="todo", user_id=1,
+                 due_date=datetime(2025, 1, 10), created_at=datetime(2024, 1, 1, 10)),
+            Task(title="B", priority="Mid", status="doing", user_id=1,
+                 due_date=datetime(2025, 1, 5), created_at=datetime(2024, 1, 1, 11)),
+            Task(title="C", priority="Low", status="todo", user_id=1,
+                 due_date=None, created_at=datetime(2024, 1, 1, 12)),
+            Task(title="D", priority="High", status="todo", user_id=2,
+                 due_date=datetime(2025, 1, 3), created_at=datetime(2024, 1, 1, 9)),
+        ]
+        db.session.add_all(tasks)
+        db.session.commit()
+        return {t.title: t.id for t in tasks}
+
+def titles(res):
+    return [t["title"] for t in res.get_json()["tasks"]]
+
+# 一覧は画面と同じ絞り込み・並べ替え
+def test_list_uses_board_filters_and_sort(app, client, db_models):
+    seed(app, db_models)
+    assert titles(client.get("/api/v1/tasks")) == ["C", "B", "A"]
+    assert titles(client.get("/api/v1/tasks?sort_by=Due+Date")) == ["B", "A", "C"]
+    assert titles(client.get("/api/v1/tasks?view_mode=all&sort_by=Priority")) == ["D", "A", "B", "C"]
+    assert titles(client.get("/api/v1/tasks?status=todo&priority=High")) == ["A"]
+
+def test_list_pages_with_after_token(app, client, db_models):
+    seed(app, db_models)
+    first = client.get("/api/v1/tasks?view_mode=all&sort_by=Priority&limit=3").get_json()
+    assert [t["title"] for t in first["tasks"]] == ["D", "A", "B"]
+    second = client.get(f"/api/v1/tasks?view_mode=all&sort_by=Priority&limit=3&after={first['next']}").get_json()
+    assert [t["title"] for t in second["tasks"]] == ["C"]
+    assert second["next"] is None
+
+def test_fields_projection(app, client, db_models):
+    ids = seed(app, db_models)
+    body = client.get("/api/v1/tasks?fields=id,title&sort_by=Priority").get_json()
+    assert body["tasks"][0] == {"id": ids["A"], "title": "A"}
+
+    assert client.get(f"/api/v1/tasks/{ids['B']}?fields=status").get_json() == {"status": "doing"}
+    assert client.get("/api/v1/tasks?fields=password_hash").status_code == 400
+
+@pytest.mark.parametrize("kwargs", [
+    {"query_string": {"format": "ndjson"}},
+    {"headers": {"Accept": "application/x-ndjson"}},
+])
+def test_list_streams_ndjson(app, client, db_models, kwargs):
+    seed(app, db_models)
+    res = client.get("/api/v1/tasks", **kwargs)
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    assert res.is_streamed
+    lines = res.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["title"] for line in lines] == ["C", "B", "A"]
+
+def test_create_patch_delete(app, client, db_models):
+    seed(app, db_models)
+
+    res = client.post("/api/v1/tasks", json={"title": " New ", "priority": "High", "due_date": "2025-02-01"})
+    assert res.status_code == 201
+    created = res.get_json()
+    assert created["title"] == "New"
+    assert created["user_id"] == 1
+    assert created["due_date"] == "2025-02-01T00:00:00"
+    assert res.headers["Location"].endswith(f"/api/v1/tasks/{created['id']}")
+
+    res = client.patch(f"/api/v1/tasks/{created['id']}", json={"status": "done", "due_date": None})
+    assert res.status_code == 200
+    assert res.get_json()["status"] == "done"
+    assert res.get_json()["due_date"] is None
+
+    assert client.delete(f"/api/v1/tasks/{created['id']}").status_code == 204
+    assert client.get(f"/api/v1/tasks/{created['id']}").status_code == 404
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"title": ""},
+    {"title": "x" * 101},
+    {"title": "ok", "priority": "Urgent"},
+    {"title": "ok", "status": "blocked"},
+    {"title": "ok", "due_date": "01/02/2025"},
+])
+def test_create_validation(app, client, db_models, body):
+    seed(app, db_models)
+    res = client.post("/api/v1/tasks", json=body)
+    assert res.status_code == 400
+    assert "error" in res.get_json()
+
+def test_other_users_task_is_read_only(app, client, db_models):
+    ids = seed(app, db_models)
+    assert client.get(f"/api/v1/tasks/{ids['D']}").status_code == 200
+    assert client.patch(f"/api/v1/tasks/{ids['D']}", json={"status": "done"}).status_code == 403
+    assert client.delete(f"/api/v1/tasks/{ids['D']}").status_code == 403
+
+def test_requires_login(app, db_models):
+    with app.test_client() as c:
+        res = c.get("/api/v1/tasks")
+        assert res.status_code == 401
+        assert res.get_json() == {"error": "Login required"}
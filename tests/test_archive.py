@@ -0,0 +1,128 @@
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+NOW = datetime(2024, 6, 1, 12)
+
+def extract_titles(html: str):
+    return re.findall(r'<span class="ms-1">([^<]*)</span>', html)
+
+def split_archived(html: str):
+    """(一覧のタイトル, アーカイブ欄のタイトル)"""
+    board, _, archived = html.partition('id="archivedList"')
+    return extract_titles(board), extract_titles(archived)
+
+def seed(app, db_models, rows):
+    """rows の既定は user_id=1 の done。done_at を省いた done は作成と同時に done にしたことにする"""
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        rows = [{"status": "done", "priority": "Mid", "user_id": 1, **row} for row in rows]
+        for row in rows:
+            if row["status"] == "done" and "created_at" in row:
+                row.setdefault("done_at", row["created_at"])
+        tasks = [Task(**row) for row in rows]
+        db.session.add_all(tasks)
+        db.session.commit()
+        return [t.id for t in tasks]
+
+def days_ago(n):
+    return NOW - timedelta(days=n)
+
+# done にしてから days 日より経ったものだけを移す
+def test_archive_moves_only_old_done_tasks(app, db_models):
+    from archive import archive_tasks
+    ids = seed(app, db_models, [
+        {"title": "old done", "detail": "kept detail", "priority": "High", "created_at": days_ago(100),
+         "due_date": datetime(2024, 1, 1)},
+        {"title": "old todo", "status": "todo", "created_at": days_ago(100)},
+        {"title": "new done", "created_at": days_ago(10)},
+        {"title": "old done 2", "user_id": 2, "created_at": days_ago(91)},
+    ])
+    with app.app_context():
+        assert archive_tasks(90, now=NOW) == 2
+        Task, ArchivedTask = db_models.Task, db_models.ArchivedTask
+        assert sorted(t.title for t in Task.query) == ["new done", "old todo"]
+        archived = {a.title: a for a in ArchivedTask.query}
+        assert set(archived) == {"old done", "old done 2"}
+        a = archived["old done"]
+        assert (a.task_id, a.user_id, a.detail, a.priority, a.priority_rank, a.status) == (ids[0], 1, "kept detail", "High", 1, "done")
+        assert (a.due_date, a.created_at, a.archived_at) == (datetime(2024, 1, 1), days_ago(100), NOW)
+        # 2回目は移すものがない
+        assert archive_tasks(90, now=NOW) == 0
+
+# 作成が古くても done にしたばかりのタスク（画面・一括操作）は移さない
+def test_archive_uses_completion_time(app, client, db_models):
+    from archive import archive_tasks
+    single, bulk, reopened = seed(app, db_models, [
+        {"title": t, "status": "todo", "created_at": datetime(2000, 1, 1)} for t in ("single", "bulk", "reopened")
+    ])
+    client.post(f"/tasks/{single}/status", data={"status": "done"})
+    client.post("/tasks/bulk", data={"op": "done", "ids": [bulk, reopened]})
+    client.post(f"/tasks/{reopened}/status", data={"status": "todo"})
+    with app.app_context():
+        done_at = {t.title: t.done_at for t in db_models.Task.query}
+        assert done_at["reopened"] is None
+        assert all(datetime.now() - done_at[t] < timedelta(minutes=1) for t in ("single", "bulk"))
+        assert archive_tasks(30) == 0
+    # 既に done のタスクをもう一度 done にしても完了日時は変わらない
+    client.post("/tasks/bulk", data={"op": "done", "ids": [single, bulk]})
+    with app.app_context():
+        assert {t.title: t.done_at for t in db_models.Task.query if t.done_at} == {
+            "single": done_at["single"], "bulk": done_at["bulk"],
+        }
+        assert archive_tasks(30, now=datetime.now() + timedelta(days=31)) == 2
+
+# batch_size 件ごとに commit し、削除イベントと所有者ごとの変更カウンタを同じトランザクションで書く
+def test_archive_commits_in_batches_with_events(app, db_models):
+    import board_cache
+    from archive import archive_tasks
+    seed(app, db_models, [{"title": f"t{i}", "user_id": 1 + i % 2, "created_at": days_ago(200 + i)} for i in range(5)])
+    commits = []
+    with app.app_context():
+        event.listen(db_models.db.engine, "commit", lambda conn: commits.append(1))
+        assert archive_tasks(90, batch_size=2, now=NOW) == 5
+        assert len(commits) == 3
+        assert db_models.TaskEvent.query.filter_by(kind="deleted").count() == 5
+        assert board_cache.version_info("all")[0] == 3
+        assert board_cache.version_info("user:1")[0] >= 2 and board_cache.version_info("user:2")[0] >= 2
+
+# アーカイブしたタスクは archived=1 のときだけ別枠に出る。絞り込みと検索語は一覧と同じように効く
+def test_index_shows_archived_only_when_requested(app, client, db_models):
+    from archive import archive_tasks
+    seed(app, db_models, [
+        {"title": "shipped report", "created_at": days_ago(400)},
+        {"title": "shipped other", "priority": "Low", "created_at": days_ago(300)},
+        {"title": "someone else report", "user_id": 2, "created_at": days_ago(300)},
+        {"title": "current report", "status": "todo"},
+    ])
+    with app.app_context():
+        archive_tasks(90)
+
+    html = client.get("/").get_data(as_text=True)
+    assert "archivedList" not in html
+    assert extract_titles(html) == ["current report"]
+
+    board, archived = split_archived(client.get("/?archived=1").get_data(as_text=True))
+    assert board == ["current report"]
+    assert archived == ["shipped other", "shipped report"]
+
+    # 全文検索は task_archive_fts を使う
+    board, archived = split_archived(client.get("/?archived=1&q=report").get_data(as_text=True))
+    assert board == ["current report"]
+    assert archived == ["shipped report"]
+
+    _, archived = split_archived(client.get("/?archived=1&view_mode=all&q=report").get_data(as_text=True))
+    assert archived == ["someone else report", "shipped report"]
+    _, archived = split_archived(client.get("/?archived=1&priority=Low").get_data(as_text=True))
+    assert archived == ["shipped other"]
+    # 一覧にない status で絞ると何も出ない
+    assert "No archived tasks match." in client.get("/?archived=1&status=todo").get_data(as_text=True)
+
+def test_archive_cli(app, db_models):
+    seed(app, db_models, [{"title": "ancient", "created_at": datetime(2000, 1, 1)}, {"title": "fresh"}])
+    result = app.test_cli_runner().invoke(args=["archive-tasks", "--days", "30"])
+    assert result.exit_code == 0, result.output
+    assert "Archived 1 tasks" in result.output
+    with app.app_context():
+        assert [a.title for a in db_models.ArchivedTask.query] == ["ancient"]
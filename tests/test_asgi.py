@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+
+FORM = (b"content-type", b"application/x-www-form-urlencoded")
+JSON = (b"content-type", b"application/json")
+
+@pytest.fixture
+def asgi(app):
+    app.config["LIVE_POLL_INTERVAL"] = 0.05
+    import asgi as asgi_module
+    yield asgi_module.application
+    asyncio.run(dispose(asgi_module.application))
+
+async def dispose(application):
+    for engine in application.engines.values():
+        await engine.dispose()
+
+async def call(application, method, path, body=b"", headers=(), query=b"", receive=None):
+    """ASGI アプリを1回呼び、(status, ヘッダー, 本文) を返す"""
+    messages = []
+    received = False
+
+    async def receive_body():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # 切断しない
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query, "headers": list(headers),
+        "http_version": "1.1", "scheme": "http", "server": ("testserver", 80), "root_path": "",
+    }
+    await application(scope, receive or receive_body, send)
+    start = messages[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+async def login(application):
+    await call(application, "POST", "/register", b"email=a%40example.com&password=pw&password2=pw", [FORM])
+    status, headers, _ = await call(application, "POST", "/login", b"email=a%40example.com&password=pw", [FORM])
+    assert status == 302 and headers[b"location"] == b"/"
+    return (b"cookie", headers[b"set-cookie"].split(b";")[0])
+
+def executed(engine):
+    """engine で実行された SQL を記録するリスト"""
+    from sqlalchemy import event
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+def test_asgi_requires_login(asgi):
+    status, headers, _ = asyncio.run(call(asgi, "GET", "/"))
+    assert status == 302 and headers[b"location"] == b"/login"
+
+# 既存のルートがそのまま動き、DB へのクエリは非同期エンジンを通る
+def test_asgi_board_queries_use_async_engine(asgi, app, db_models):
+    async def scenario():
+        cookie = await login(asgi)
+        status, _, body = await call(asgi, "POST", "/api/v1/tasks", json.dumps({"title": "from asgi"}).encode(), [cookie, JSON])
+        assert status == 201
+        sync_statements = executed(asgi.sync_engine)
+        async_statements = executed(asgi.engines[None].sync_engine)
+        status, _, page = await call(asgi, "GET", "/", headers=[cookie])
+        return json.loads(body), status, page, sync_statements, async_statements
+
+    created, status, page, sync_statements, async_statements = asyncio.run(scenario())
+    assert status == 200 and b"from asgi" in page
+    assert any("FROM task" in s for s in async_statements)
+    assert sync_statements == []
+    with app.app_context():
+        assert db_models.db.session.get(db_models.Task, created["id"]).title == "from asgi"
+
+# 同時に来たリクエストはイベントループ上で並行に処理され、それぞれのセッション・ユーザーで答える
+def test_asgi_concurrent_requests_keep_their_own_session(asgi):
+    async def scenario():
+        cookie = await login(asgi)
+        for i in range(5):
+            await call(asgi, "POST", "/api/v1/tasks", json.dumps({"title": f"t{i}"}).encode(), [cookie, JSON])
+        return await asyncio.gather(*[
+            call(asgi, "GET", "/api/v1/tasks", headers=[cookie] if i % 2 else []) for i in range(10)
+        ])
+
+    for i, (status, _, body) in enumerate(asyncio.run(scenario())):
+        if i % 2:
+            assert status == 200 and len(json.loads(body)["tasks"]) == 5
+        else:
+            assert status == 401
+
+# パスワードのハッシュ計算などのブロッキング処理は ASGI ではスレッドで実行する
+def test_run_blocking_uses_thread_only_in_asgi(app):
+    from concurrency import run_blocking
+
+    @app.get("/_thread")
+    def thread_ident():
+        return {"ident": run_blocking(threading.get_ident)}
+
+    import asgi as asgi_module
+
+    async def scenario():
+        cookie = await login(asgi_module.application)
+        return await call(asgi_module.application, "GET", "/_thread", headers=[cookie])
+
+    status, _, body = asyncio.run(scenario())
+    assert status == 200 and json.loads(body)["ident"] != threading.get_ident()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["logged_in"] = True
+    assert client.get("/_thread").get_json()["ident"] == threading.get_ident()
+    asyncio.run(dispose(asgi_module.application))
+
+# /events はイベントループ上で配信し、接続後の変更も after からの送り直しも届く
+def test_asgi_event_stream(asgi):
+    async def scenario():
+        cookie = await login(asgi)
+        await call(asgi, "POST", "/api/v1/tasks", json.dumps({"title": "before"}).encode(), [cookie, JSON])
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        stream = asyncio.ensure_future(call(asgi, "GET", "/events", headers=[cookie], query=b"after=0", receive=receive))
+        await asyncio.sleep(0.2)
+        await call(asgi, "POST", "/api/v1/tasks", json.dumps({"title": "after"}).encode(), [cookie, JSON])
+        await asyncio.sleep(0.3)
+        disconnect.set()
+        return await stream
+
+    status, headers, body = asyncio.run(scenario())
+    assert status == 200 and headers[b"content-type"].startswith(b"text/event-stream")
+    text = body.decode()
+    assert text.startswith("retry: ")
+    assert 'id: 1-1\nevent: task\ndata: {"kind": "created", "id": 1}' in text
+    assert 'id: 2-2\nevent: task\ndata: {"kind": "created", "id": 2}' in text
+
+def test_asgi_event_stream_requires_login(asgi):
+    status, headers, _ = asyncio.run(call(asgi, "GET", "/events"))
+    assert status == 302 and headers[b"location"] == b"/login"
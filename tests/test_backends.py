@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+def test_db_config_defaults_to_sqlite_files(app):
+    import db_config
+
+    config = {}
+    db_config.apply(config, env={})
+    assert config["SQLALCHEMY_DATABASE_URI"] == "sqlite:///tasks.db"
+    assert config["SQLALCHEMY_BINDS"]["users"]["url"] == "sqlite:///users.db"
+    assert config["SQLALCHEMY_ENGINE_OPTIONS"] == {
+        "pool_pre_ping": True, "pool_recycle": 1800, "pool_size": 5, "max_overflow": 10,
+    }
+
+def test_db_config_server_database_from_env(app):
+    import db_config
+
+    config = {}
+    db_config.apply(config, env={
+        "DATABASE_URL": "postgres://board:secret@db/board",
+        "DB_POOL_SIZE": "20", "DB_MAX_OVERFLOW": "0", "DB_POOL_RECYCLE": "300", "DB_POOL_PRE_PING": "0",
+    })
+    assert config["SQLALCHEMY_DATABASE_URI"] == "postgresql://board:secret@db/board"
+    # users も同じサーバーDBに置き、プール設定も同じ
+    users = config["SQLALCHEMY_BINDS"]["users"]
+    assert users == {"url": "postgresql://board:secret@db/board", **config["SQLALCHEMY_ENGINE_OPTIONS"]}
+    assert users["pool_size"] == 20 and users["max_overflow"] == 0
+    assert users["pool_recycle"] == 300 and users["pool_pre_ping"] is False
+
+def test_db_config_in_memory_sqlite_has_no_pool_size(app):
+    import db_config
+
+    assert "pool_size" not in db_config.engine_options("sqlite://", {})
+
+def test_db_config_async_url_keeps_target_and_swaps_driver(app):
+    import db_config
+
+    assert str(db_config.async_url("sqlite:////data/tasks.db")) == "sqlite+aiosqlite:////data/tasks.db"
+    assert str(db_config.async_url("postgresql+psycopg2://u@db/board")) == "postgresql+psycopg://u@db/board"
+    # インメモリ SQLite は同期エンジンと別のDBになるので使えない
+    with pytest.raises(ValueError):
+        db_config.async_url("sqlite://")
+
+# サーバーがなくても、PostgreSQL 向けの SQL / DDL がそのまま組み立てられることを確認する
+@pytest.mark.parametrize("sort_by,order_by", [
+    ("", "ORDER BY task.created_at DESC, task.id DESC"),
+    ("Priority", "ORDER BY task.priority_rank ASC, task.due_sort ASC, task.created_at DESC, task.id DESC"),
+    ("Due Date", "ORDER BY task.due_sort ASC, task.created_at DESC, task.id DESC"),
+])
+def test_board_query_compiles_for_postgresql(app, sort_by, order_by):
+    from app import build_task_query
+
+    with app.app_context():
+        q = build_task_query("personal", "todo", "High", sort_by, user_id=1)
+        sql = str(q.statement.compile(dialect=postgresql.dialect()))
+    assert order_by in sql
+    assert "task.user_id = %(user_id_1)s" in sql
+
+def test_schema_and_migration_types_compile_for_postgresql(app, db_models):
+    import migrations
+
+    dialect = postgresql.dialect()
+    table = db_models.Task.__table__
+    assert "due_sort TIMESTAMP WITHOUT TIME ZONE NOT NULL" in str(CreateTable(table).compile(dialect=dialect))
+    for index in table.indexes:
+        CreateIndex(index).compile(dialect=dialect)
+    # User は予約語なのでクォートされる
+    assert 'CREATE TABLE "user"' in str(CreateTable(db_models.User.__table__).compile(dialect=dialect))
+    assert migrations.column_type(table.c.due_sort, dialect) == "TIMESTAMP WITHOUT TIME ZONE"
+
+# password_hash を広げる移行の DDL（既存の PostgreSQL の VARCHAR(128) を 255 に）
+def test_password_hash_migration_compiles_for_postgresql(app, db_models):
+    import migrations
+
+    column = db_models.User.__table__.c.password_hash
+    assert column.type.length == 255
+    assert migrations.alter_column_type_sql(column, postgresql.dialect()) == (
+        'ALTER TABLE "user" ALTER COLUMN password_hash TYPE VARCHAR(255)'
+    )
@@ -0,0 +1,91 @@
+import re
+import pytest
+
+def extract_titles(html: str):
+    return re.findall(r'<span class="ms-1">([^<]*)</span>', html)
+
+def seed(app, db_models):
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        db.session.query(Task).delete()
+        mine = Task(title="mine", status="todo", priority="Mid", user_id=1)
+        other = Task(title="other", status="todo", priority="Mid", user_id=2)
+        db.session.add_all([mine, other])
+        db.session.commit()
+        return mine.id, other.id
+
+def stats(client):
+    return client.get("/api/v1/stats/board-cache").get_json()
+
+def test_repeated_board_load_hits_cache(app, client, db_models):
+    seed(app, db_models)
+    client.get("/")
+    before = stats(client)
+    assert extract_titles(client.get("/").get_data(as_text=True)) == ["mine"]
+    after = stats(client)
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
+
+# どの書き込みルートの直後でも一覧に古い結果が出ないこと
+@pytest.mark.parametrize("write", [
+    lambda c, tid: c.post("/tasks", data={"title": "added"}),
+    lambda c, tid: c.post(f"/tasks/{tid}/status", data={"status": "done"}),
+    lambda c, tid: c.post(f"/tasks/{tid}/update", data={"title": "renamed", "priority": "High"}),
+    lambda c, tid: c.post(f"/tasks/{tid}/delete"),
+    lambda c, tid: c.post("/tasks/bulk", data={"op": "doing", "ids": [tid]}),
+    lambda c, tid: c.patch(f"/api/v1/tasks/{tid}", json={"title": "patched"}),
+    lambda c, tid: c.post("/api/v1/tasks", json={"title": "api-added"}),
+    lambda c, tid: c.delete(f"/api/v1/tasks/{tid}"),
+    lambda c, tid: c.post("/api/v1/tasks/bulk", json={"op": "status", "status": "done", "ids": [tid]}),
+])
+@pytest.mark.parametrize("url", ["/", "/?view_mode=all", "/?status=todo"])
+def test_board_never_stale_after_write(app, client, db_models, write, url):
+    mine, _ = seed(app, db_models)
+    client.get(url)  # キャッシュに載せる
+
+    res = write(client, mine)
+    assert res.status_code < 400
+
+    # キャッシュを無効にした場合の結果と一致すること
+    cached = client.get(url).get_data(as_text=True)
+    app.config["BOARD_CACHE_ENABLED"] = False
+    fresh = client.get(url).get_data(as_text=True)
+    assert extract_titles(cached) == extract_titles(fresh)
+    assert re.findall(r'badge[^>]*>\s*(\w+)', cached) == re.findall(r'badge[^>]*>\s*(\w+)', fresh)
+
+# 他人の書き込みでは自分の個人一覧のキャッシュは消えない（全タスク一覧は消える）
+def test_invalidation_is_scoped_to_owner(app, client, db_models):
+    seed(app, db_models)
+    client.get("/")
+    client.get("/?view_mode=all")
+
+    with app.test_client() as other:
+        with other.session_transaction() as sess:
+            sess["logged_in"] = True
+            sess["user_id"] = 2
+        other.post("/tasks", data={"title": "by user 2"})
+
+    before = stats(client)
+    client.get("/")
+    assert stats(client)["hits"] == before["hits"] + 1
+    html = client.get("/?view_mode=all").get_data(as_text=True)
+    assert "by user 2" in extract_titles(html)
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    import board_cache
+
+    now = [100.0]
+    monkeypatch.setattr(board_cache.time, "monotonic", lambda: now[0])
+    cache = board_cache.TTLLRUCache(max_size=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a を最近使ったことにする
+    cache.set("c", 3)  # 一番古い b が追い出される
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 1
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 2
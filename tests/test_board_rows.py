@@ -0,0 +1,55 @@
+import re
+from sqlalchemy import event
+
+def seed(app, db_models, details):
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        tasks = [Task(title=f"t{i}", detail=detail, user_id=1) for i, detail in enumerate(details)]
+        db.session.add_all(tasks)
+        db.session.commit()
+        return [t.id for t in tasks]
+
+# 一覧は Task の ORM オブジェクトを作らずに描画する
+def test_index_does_not_load_orm_objects(app, client, db_models):
+    seed(app, db_models, ["a", "b", "c"])
+    loaded = []
+    event.listen(db_models.Task, "load", lambda target, context: loaded.append(target.id))
+    html = client.get("/?sort_by=Priority").get_data(as_text=True)
+    assert len(re.findall(r'data-id="\d+"', html)) == 3
+    client.get("/?q=t0")
+    assert loaded == []
+
+# detail は先頭 DETAIL_PREVIEW_LENGTH 文字だけを読み、続きは読み取り専用の全文で見る
+def test_long_detail_is_truncated_with_more_link(app, client, db_models):
+    from board import DETAIL_PREVIEW_LENGTH
+    long_detail = "x" * DETAIL_PREVIEW_LENGTH + "TAIL"
+    short_id, long_id = seed(app, db_models, ["short detail", long_detail])
+
+    html = client.get("/").get_data(as_text=True)
+    assert "short detail</div>" in html
+    assert "x" * DETAIL_PREVIEW_LENGTH + "…" in html
+    assert "TAIL" not in html
+    assert f'data-edit-url="/tasks/{long_id}/detail">more</a>' in html
+    assert f'data-edit-url="/tasks/{short_id}/detail">more</a>' not in html
+
+    item = client.get(f"/tasks/{long_id}/item").get_data(as_text=True)
+    assert "TAIL" not in item and ">more</a>" in item
+    assert "TAIL" in client.get(f"/tasks/{long_id}/detail").get_data(as_text=True)
+
+# 全タスクの一覧の他人のタスクも「more」で全文を読める（編集フォームは 403 のまま）
+def test_more_link_works_for_other_users_tasks(app, client, db_models):
+    from board import DETAIL_PREVIEW_LENGTH
+    Task = db_models.Task
+    with app.app_context():
+        t = Task(title="foreign", detail="y" * DETAIL_PREVIEW_LENGTH + "TAIL", user_id=2)
+        db_models.db.session.add(t)
+        db_models.db.session.commit()
+        task_id = t.id
+
+    html = client.get("/?view_mode=all").get_data(as_text=True)
+    url = re.search(r'data-edit-url="([^"]+)">more</a>', html).group(1)
+    assert url == f"/tasks/{task_id}/detail"
+    res = client.get(url)
+    assert res.status_code == 200 and "TAIL" in res.get_data(as_text=True)
+    assert client.get(f"/tasks/{task_id}/edit").status_code == 403
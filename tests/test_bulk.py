@@ -0,0 +1,113 @@
+from sqlalchemy import event
+
+def seed(app, db_models):
+    """user_id=1 に todo/doing/done を2件ずつ、user_id=2 に todo を1件"""
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        db.session.query(Task).delete()
+        tasks = [Task(title=f"{s}{i}", status=s, priority="Mid", user_id=1)
+                 for s in ("todo", "doing", "done") for i in range(2)]
+        tasks.append(Task(title="other", status="todo", priority="Mid", user_id=2))
+        db.session.add_all(tasks)
+        db.session.commit()
+        return {t.title: t.id for t in tasks}
+
+def statuses(app, db_models):
+    with app.app_context():
+        return {t.title: t.status for t in db_models.Task.query.all()}
+
+def count_commits(app, db_models):
+    """エンジン上の COMMIT 回数を数えるリスト（append される）"""
+    commits = []
+    with app.app_context():
+        event.listen(db_models.db.engine, "commit", lambda conn: commits.append(1))
+    return commits
+
+# 選択した id の状態を1トランザクションで変更
+def test_bulk_status_by_ids_single_commit(app, client, db_models):
+    ids = seed(app, db_models)
+    commits = count_commits(app, db_models)
+
+    res = client.post("/tasks/bulk", data={"op": "done", "ids": [ids["todo0"], ids["doing1"]], "view_mode": "personal"})
+    assert res.status_code == 302
+    assert "view_mode=personal" in res.headers["Location"]
+    assert len(commits) == 1
+
+    after = statuses(app, db_models)
+    assert after["todo0"] == "done" and after["doing1"] == "done"
+    assert after["todo1"] == "todo" and after["doing0"] == "doing"
+
+# 現在の絞り込みに一致する自分のタスクをまとめて削除
+def test_bulk_delete_by_filter(app, client, db_models):
+    seed(app, db_models)
+    res = client.post("/tasks/bulk", data={"op": "delete", "scope": "filter", "status": "todo"})
+    assert res.status_code == 302
+    after = statuses(app, db_models)
+    assert "todo0" not in after and "todo1" not in after
+    assert after["other"] == "todo"  # 他人のタスクは対象外
+    assert len(after) == 5
+
+def test_bulk_rejects_other_users_task(app, client, db_models):
+    ids = seed(app, db_models)
+    before = statuses(app, db_models)
+
+    res = client.post("/tasks/bulk", data={"op": "delete", "ids": [ids["todo0"], ids["other"]]})
+    assert res.status_code == 403
+    # 全 View のフィルタに他人のタスクが含まれる場合も拒否
+    res = client.post("/tasks/bulk", data={"op": "done", "scope": "filter", "view_mode": "all", "status": "todo"})
+    assert res.status_code == 403
+    assert statuses(app, db_models) == before
+
+def test_bulk_invalid_op_and_missing_id(app, client, db_models):
+    ids = seed(app, db_models)
+    assert client.post("/tasks/bulk", data={"op": "archive", "ids": [ids["todo0"]]}).status_code == 400
+    assert client.post("/tasks/bulk", data={"op": "done", "ids": [ids["todo0"], 999999]}).status_code == 404
+
+def test_api_bulk_create_status_delete(app, client, db_models):
+    seed(app, db_models)
+    commits = count_commits(app, db_models)
+
+    res = client.post("/api/v1/tasks/bulk", json={"op": "create", "tasks": [
+        {"title": "n1", "priority": "High"}, {"title": "n2", "status": "doing"},
+    ]})
+    assert res.status_code == 201
+    created = res.get_json()["tasks"]
+    assert [t["title"] for t in created] == ["n1", "n2"]
+    assert len(commits) == 1
+
+    new_ids = [t["id"] for t in created]
+    res = client.post("/api/v1/tasks/bulk", json={"op": "status", "status": "done", "ids": new_ids})
+    assert res.get_json() == {"count": 2}
+
+    res = client.post("/api/v1/tasks/bulk", json={"op": "delete", "filter": {"status": "done"}})
+    assert res.get_json() == {"count": 4}
+    assert len(commits) == 3
+
+def test_api_bulk_create_is_all_or_nothing(app, client, db_models):
+    seed(app, db_models)
+    res = client.post("/api/v1/tasks/bulk", json={"op": "create", "tasks": [{"title": "ok"}, {"title": ""}]})
+    assert res.status_code == 400
+    assert res.get_json()["error"].startswith("tasks[1]:")
+    assert "ok" not in statuses(app, db_models)
+
+# 確認の後に他人のタスクが加わっても（PostgreSQL の READ COMMITTED で別トランザクションが commit した場合など）更新・削除しない
+def test_bulk_write_is_limited_to_own_tasks_after_check(app, db_models):
+    from board import bulk_target, check_bulk_ownership, bulk_update_status, bulk_delete
+    seed(app, db_models)
+    with app.app_context():
+        db = db_models.db
+        db.session.query(db_models.Task).filter_by(user_id=2).delete()
+        db.session.commit()
+        q = bulk_target(1, None, "all", "todo")
+        q = check_bulk_ownership(q, 1)
+        db.session.add(db_models.Task(title="late", status="todo", priority="Mid", user_id=2))
+        db.session.flush()
+        assert bulk_update_status(q, "done") == 2
+        assert db.session.query(db_models.Task).filter_by(title="late").one().status == "todo"
+
+        q = check_bulk_ownership(bulk_target(1, None, "all", "done"), 1)
+        db.session.add(db_models.Task(title="late done", status="done", priority="Mid", user_id=2))
+        db.session.flush()
+        assert bulk_delete(q) == 4
+        assert db.session.query(db_models.Task).filter_by(user_id=2).count() == 2
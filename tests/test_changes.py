@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+import pytest
+
+def login_as(client, user_id):
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+
+def position(token):
+    """next / seq のトークン（"<seq>-<id>"）を比べられる (seq, id) にする"""
+    return tuple(map(int, token.split("-")))
+
+def changes(client, since, **params):
+    res = client.get("/api/v1/changes", query_string={"since": since, **params})
+    assert res.status_code == 200, res.get_json()
+    return res.get_json()
+
+def sync(client, since, tasks, **params):
+    """since から has_more がなくなるまで読み、tasks（id -> タスク）に反映する。戻り値は次の since"""
+    while True:
+        body = changes(client, since, **params)
+        seqs = [position(c["seq"]) for c in body["changes"]]
+        assert seqs == sorted(seqs) and all(seq > position(since) for seq in seqs)  # 順番どおりに届く
+        for c in body["changes"]:
+            if c["kind"] == "deleted":
+                assert "task" not in c
+                tasks.pop(c["id"], None)
+            else:
+                tasks[c["id"]] = c["task"]
+        since = body["next"]
+        if not body["has_more"]:
+            return since
+
+def all_tasks(client, **params):
+    return {t["id"]: t for t in client.get("/api/v1/tasks", query_string={"limit": 1000, **params}).get_json()["tasks"]}
+
+# since なしで位置だけを受け取り、その後の作成・更新・削除が1タスク1件にまとまって届く
+def test_changes_since_token_are_collapsed_per_task(client):
+    login_as(client, 1)
+    kept = client.post("/api/v1/tasks", json={"title": "kept"}).get_json()["id"]
+    start = client.get("/api/v1/changes").get_json()
+    assert start["changes"] == [] and start["has_more"] is False
+
+    created = client.post("/api/v1/tasks", json={"title": "new"}).get_json()["id"]
+    client.patch(f"/api/v1/tasks/{kept}", json={"status": "done"})
+    client.patch(f"/api/v1/tasks/{created}", json={"title": "renamed"})  # 最後の変更の位置に並ぶ
+    gone = client.post("/api/v1/tasks", json={"title": "gone"}).get_json()["id"]
+    client.delete(f"/api/v1/tasks/{gone}")
+
+    body = changes(client, start["next"])
+    assert [(c["kind"], c["id"]) for c in body["changes"]] == [
+        ("updated", kept), ("created", created), ("deleted", gone),
+    ]
+    assert body["changes"][0]["task"]["status"] == "done"
+    assert body["changes"][1]["task"]["title"] == "renamed"
+
+    # 追いついた後は何も返らない
+    again = changes(client, body["next"])
+    assert again["changes"] == [] and again["next"] == body["next"]
+
+# 画面・一括操作の書き込みも届き、差分を当てた結果は全件を読み直した結果と一致する
+def test_delta_sync_matches_full_reload(client):
+    login_as(client, 1)
+    tasks = all_tasks(client)
+    since = client.get("/api/v1/changes").get_json()["next"]
+    for i in range(6):
+        client.post("/tasks", data={"title": f"t{i}", "priority": "High" if i % 2 else "Low"})
+    since = sync(client, since, tasks, limit=4)
+    ids = sorted(tasks)
+    client.post(f"/tasks/{ids[0]}/update", data={"title": "edited", "priority": "Mid"})
+    client.post("/tasks/bulk", data={"op": "done", "ids": ids[1:3]})
+    client.post("/api/v1/tasks/bulk", json={"op": "delete", "filter": {"priority": "Low"}})
+    client.post(f"/tasks/{ids[-1]}/delete")
+    sync(client, since, tasks, limit=2)
+    assert tasks == all_tasks(client)
+
+# 個人の一覧では自分のタスクの変更だけ、view_mode=all ならすべて
+def test_personal_feed_only_contains_own_tasks(client):
+    login_as(client, 1)
+    since = client.get("/api/v1/changes").get_json()["next"]
+    mine = client.post("/api/v1/tasks", json={"title": "mine"}).get_json()["id"]
+    login_as(client, 2)
+    other = client.post("/api/v1/tasks", json={"title": "other"}).get_json()["id"]
+
+    login_as(client, 1)
+    assert [c["id"] for c in changes(client, since)["changes"]] == [mine]
+    assert [c["id"] for c in changes(client, since, view_mode="all")["changes"]] == [mine, other]
+
+# 保持期間を過ぎて消えた範囲の since は 410 で全件の読み直しを求める
+def test_expired_since_requires_resync(app, client, db_models):
+    import events
+    login_as(client, 1)
+    since = client.get("/api/v1/changes").get_json()["next"]
+    client.post("/api/v1/tasks", json={"title": "a"})
+    client.post("/api/v1/tasks", json={"title": "b"})
+    with app.app_context():
+        assert events.expire(datetime.now() + timedelta(seconds=1)) == 2
+        db_models.db.session.commit()
+
+    res = client.get("/api/v1/changes", query_string={"since": since})
+    assert res.status_code == 410 and res.get_json()["resync"] is True
+    # 読み直した後の位置からは続けられる
+    latest = client.get("/api/v1/changes").get_json()["next"]
+    assert position(latest) > position(since)
+    assert changes(client, latest)["changes"] == []
+    # 先の位置（DB を作り直した後の古いトークンなど）や壊れたトークンも受け付けない
+    seq, event_id = position(latest)
+    assert client.get("/api/v1/changes", query_string={"since": f"{seq + 100}-{event_id}"}).status_code == 410
+    assert client.get("/api/v1/changes", query_string={"since": "abc"}).status_code == 400
+
+# compact-changes は同じタスクの古い変更だけを詰め、遅れているクライアントも再同期なしで追いつける
+def test_compact_keeps_latest_change_per_task(app, client, db_models):
+    login_as(client, 1)
+    tasks = all_tasks(client)
+    since = client.get("/api/v1/changes").get_json()["next"]
+    ids = [client.post("/api/v1/tasks", json={"title": f"t{i}"}).get_json()["id"] for i in range(3)]
+    for _ in range(3):
+        client.patch(f"/api/v1/tasks/{ids[0]}", json={"status": "doing"})
+    client.delete(f"/api/v1/tasks/{ids[1]}")
+
+    app.config["CHANGES_COMPACT_AFTER"] = -1
+    result = app.test_cli_runner().invoke(args=["compact-changes"])
+    assert result.exit_code == 0, result.output
+    assert "Expired 0 task events, compacted 4." in result.output
+    with app.app_context():
+        assert db_models.TaskEvent.query.count() == 3
+
+    sync(client, since, tasks)
+    assert tasks == all_tasks(client)
+
+# 小さい id の変更が後から commit されても（PostgreSQL などの同時の書き込み）読み飛ばさず、詰めるときも位置が最後の変更を残す
+@pytest.mark.backend_matrix
+def test_change_committed_out_of_id_order_is_not_skipped(app, client, db_models):
+    import board_cache
+    import changes as changes_module
+    db = db_models.db
+    login_as(client, 1)
+    task_id = client.post("/api/v1/tasks", json={"title": "t"}).get_json()["id"]
+    since = client.get("/api/v1/changes").get_json()["next"]
+
+    def commit_event(event_id, kind):
+        # record() と同じ書き込みで、id だけを指定する
+        with app.app_context():
+            db.session.add(db_models.TaskEvent(id=event_id, kind=kind, task_id=task_id, user_id=1))
+            db.session.info["task_events"] = True
+            board_cache.bump_version(1)
+            db.session.commit()
+
+    commit_event(1000, "updated")
+    first = changes(client, since)
+    assert [(c["kind"], position(c["seq"])[1]) for c in first["changes"]] == [("updated", 1000)]
+    commit_event(500, "deleted")
+    body = changes(client, first["next"])
+    assert [(c["kind"], c["id"], position(c["seq"])[1]) for c in body["changes"]] == [("deleted", task_id, 500)]
+    assert body["has_more"] is False
+
+    with app.app_context():
+        assert changes_module.compact(datetime.now() + timedelta(seconds=1)) == 2
+        db.session.commit()
+        assert [e.id for e in db_models.TaskEvent.query.filter_by(task_id=task_id)] == [500]
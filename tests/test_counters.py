@@ -0,0 +1,147 @@
+import io
+import json
+import random
+import re
+from datetime import date, datetime, timedelta
+import pytest
+
+PRIORITIES = ["Low", "Mid", "High"]
+STATUSES = ["todo", "doing", "done"]
+
+def assert_counters_match(app):
+    import counters
+    with app.app_context():
+        assert counters.stored() == counters.recount()
+
+def task_ids(app, db_models, user_id=None):
+    with app.app_context():
+        q = db_models.Task.query
+        if user_id is not None:
+            q = q.filter_by(user_id=user_id)
+        return [t.id for t in q.order_by(db_models.Task.id)]
+
+def login_as(client, user_id):
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+
+# 画面・API・一括操作・取り込み・アーカイブをランダムに混ぜても、件数は数え直した結果と一致する
+@pytest.mark.parametrize("seed", range(5))
+def test_counters_match_recount_after_random_operations(app, client, db_models, seed):
+    from archive import archive_tasks
+    rng = random.Random(seed)
+
+    for step in range(120):
+        user_id = rng.choice([1, 2, 3])
+        login_as(client, user_id)
+        own = task_ids(app, db_models, user_id)
+        op = rng.choice(["create", "create", "api_create", "status", "update", "api_patch", "delete", "api_delete",
+                         "bulk", "api_bulk", "import", "orm", "archive"])
+        if op == "create":
+            client.post("/tasks", data={"title": f"t{step}", "priority": rng.choice(PRIORITIES),
+                                        "due_date": rng.choice(["", "2025-01-01"])})
+        elif op == "api_create":
+            client.post("/api/v1/tasks", json={"title": f"a{step}", "priority": rng.choice(PRIORITIES),
+                                               "status": rng.choice(STATUSES)})
+        elif op == "import":
+            body = "\n".join(json.dumps({"title": f"i{step}-{i}", "priority": rng.choice(PRIORITIES),
+                                         "status": rng.choice(STATUSES)}) for i in range(rng.randint(1, 5)))
+            client.post("/tasks/import", data={"file": (io.BytesIO(body.encode()), "tasks.ndjson")})
+        elif not own:
+            continue
+        elif op == "status":
+            client.post(f"/tasks/{rng.choice(own)}/status", data={"status": rng.choice(STATUSES)})
+        elif op == "update":
+            client.post(f"/tasks/{rng.choice(own)}/update", data={"title": f"u{step}", "priority": rng.choice(PRIORITIES)})
+        elif op == "api_patch":
+            client.patch(f"/api/v1/tasks/{rng.choice(own)}",
+                         json={"status": rng.choice(STATUSES), "priority": rng.choice(PRIORITIES)})
+        elif op == "delete":
+            client.post(f"/tasks/{rng.choice(own)}/delete")
+        elif op == "api_delete":
+            client.delete(f"/api/v1/tasks/{rng.choice(own)}")
+        elif op == "bulk":
+            ids = rng.sample(own, rng.randint(1, len(own)))
+            client.post("/tasks/bulk", data={"op": rng.choice([*STATUSES, "delete"]), "ids": ids})
+        elif op == "api_bulk":
+            client.post("/api/v1/tasks/bulk", json={"op": "status", "status": rng.choice(STATUSES),
+                                                    "filter": {"priority": rng.choice(PRIORITIES)}})
+        elif op == "orm":
+            # commit 後（属性は期限切れ）に読まずに代入しても、変更前の値を DB から読んで数える
+            with app.app_context():
+                t = db_models.db.session.get(db_models.Task, rng.choice(own))
+                db_models.db.session.commit()
+                t.status = rng.choice(STATUSES)
+                t.user_id = rng.choice([1, 2, 3])
+                db_models.db.session.commit()
+        elif op == "archive":
+            with app.app_context():
+                archive_tasks(0, batch_size=2, now=datetime.now())
+
+        if step % 20 == 0:
+            assert_counters_match(app)
+    assert_counters_match(app)
+
+def test_board_header_shows_counts(app, client, db_models):
+    for title, priority, status in [("a", "High", "todo"), ("b", "Low", "todo"), ("c", "High", "done")]:
+        res = client.post("/api/v1/tasks", json={"title": title, "priority": priority, "status": status})
+        assert res.status_code == 201
+    login_as(client, 2)
+    client.post("/api/v1/tasks", json={"title": "d", "priority": "Mid", "status": "doing"})
+    login_as(client, 1)
+
+    def counts(query=""):
+        html = client.get(f"/{query}").get_data(as_text=True)
+        return dict(re.findall(r'data-count="(\w+)">(\d+)<', html))
+
+    assert counts() == {"total": "3", "todo": "2", "doing": "0", "done": "1", "Low": "1", "Mid": "0", "High": "2", "overdue": "0"}
+    assert counts("?view_mode=all") == {"total": "4", "todo": "2", "doing": "1", "done": "1", "Low": "1", "Mid": "1", "High": "2", "overdue": "0"}
+    # status の件数は選択中の priority、priority の件数は選択中の status で絞る
+    assert counts("?priority=High&status=todo") == {"total": "1", "todo": "1", "doing": "0", "done": "1", "Low": "1", "Mid": "0", "High": "1", "overdue": "0"}
+
+# 期限切れ（done 以外で期日が今日より前）の件数も、今の view_mode・絞り込みで見出しに出す
+def test_board_header_shows_overdue_count(client):
+    past, future = [(date.today() + timedelta(days=d)).isoformat() for d in (-1, 1)]
+    for title, priority, status, due in [("a", "High", "todo", past), ("b", "Low", "doing", past), ("c", "High", "done", past),
+                                         ("d", "High", "todo", future), ("e", "High", "todo", None)]:
+        client.post("/api/v1/tasks", json={"title": title, "priority": priority, "status": status, "due_date": due})
+    login_as(client, 2)
+    client.post("/api/v1/tasks", json={"title": "f", "due_date": past})
+    login_as(client, 1)
+
+    def overdue(query=""):
+        html = client.get(f"/{query}").get_data(as_text=True)
+        return int(re.search(r'data-count="overdue">(\d+)<', html).group(1))
+
+    assert overdue() == 2
+    assert overdue("?view_mode=all") == 3
+    assert overdue("?priority=High") == 1
+    assert overdue("?status=doing") == 1
+    assert overdue("?status=done") == 0
+
+def test_repair_counters_rebuilds_from_tasks(app, client, db_models):
+    import counters
+    for i in range(3):
+        client.post("/tasks", data={"title": f"t{i}"})
+    with app.app_context():
+        db = db_models.db
+        db.session.query(db_models.TaskCounter).delete()
+        db.session.add(db_models.TaskCounter(scope="user:9", status="todo", priority_rank=1, count=5))
+        db.session.commit()
+        assert counters.stored() != counters.recount()
+
+    result = app.test_cli_runner().invoke(args=["repair-counters"])
+    assert result.exit_code == 0, result.output
+    assert "3 were wrong" in result.output
+    assert_counters_match(app)
+
+# task_counter のない既存DBでは init-db で数える
+def test_init_db_counts_existing_tasks(app, client, db_models):
+    client.post("/tasks", data={"title": "existing"})
+    with app.app_context():
+        db_models.TaskCounter.__table__.drop(db_models.db.engine)
+    result = app.test_cli_runner().invoke(args=["init-db"])
+    assert result.exit_code == 0, result.output
+    assert_counters_match(app)
+    with app.app_context():
+        import counters
+        assert counters.stored()[("user:1", "todo", 2)] == 1
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+def seed(app, db_models):
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        db.session.query(Task).delete()
+        mine = Task(title="mine <b>", detail="memo", priority="High", user_id=1, due_date=datetime(2025, 1, 10))
+        other = Task(title="other", priority="Low", user_id=2)
+        db.session.add_all([mine, other])
+        db.session.commit()
+        return mine.id, other.id
+
+# 編集フォームは開いたときに1件分だけ返す
+def test_edit_form_returns_single_task_form(app, client, db_models):
+    mine, _ = seed(app, db_models)
+
+    res = client.get(f"/tasks/{mine}/edit")
+    assert res.status_code == 200
+    html = res.get_data(as_text=True)
+    assert f'action="/tasks/{mine}/update"' in html
+    assert 'value="mine &lt;b&gt;"' in html
+    assert 'value="2025-01-10"' in html
+    assert '<option value="High" selected>' in html
+    assert "<html" not in html
+
+def test_edit_form_forbidden_for_other_users_task(app, client, db_models):
+    _, other = seed(app, db_models)
+    assert client.get(f"/tasks/{other}/edit").status_code == 403
+
+def test_edit_form_not_found(app, client, db_models):
+    seed(app, db_models)
+    assert client.get("/tasks/999999/edit").status_code == 404
+
+# 一覧にはタスクごとのモーダルを出さず、共通モーダル1つだけ
+def test_board_renders_one_shared_modal(app, client, db_models):
+    mine, _ = seed(app, db_models)
+
+    html = client.get("/").get_data(as_text=True)
+    assert html.count('class="modal fade"') == 1
+    assert f'data-edit-url="/tasks/{mine}/edit"' in html
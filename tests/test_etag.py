@@ -0,0 +1,89 @@
+import re
+import pytest
+from sqlalchemy import event
+
+def seed(app, db_models):
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        db.session.query(Task).delete()
+        t = Task(title="mine", status="todo", priority="Mid", user_id=1)
+        db.session.add(t)
+        db.session.commit()
+        return t.id
+
+@pytest.fixture
+def task_queries(app, db_models):
+    """tasks テーブルに発行された SELECT を記録する"""
+    statements = []
+    with app.app_context():
+        engine = db_models.db.engine
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and re.search(r"FROM task\b", statement):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_execute)
+
+def test_board_sends_validators(app, client, db_models):
+    seed(app, db_models)
+    client.post("/tasks", data={"title": "stamp"})  # Last-Modified の元になる更新日時を作る
+    res = client.get("/")
+    assert res.status_code == 200
+    assert res.headers["ETag"]
+    assert res.headers["Last-Modified"]
+    assert "no-cache" in res.headers["Cache-Control"]
+
+def test_unchanged_board_returns_304_without_querying_tasks(app, client, db_models, task_queries):
+    seed(app, db_models)
+    etag = client.get("/").headers["ETag"]
+    assert task_queries  # 200 のときは一覧を読んでいる
+
+    task_queries.clear()
+    res = client.get("/", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.get_data() == b""
+    assert res.headers["ETag"] == etag
+    assert task_queries == []
+
+# 書き込みの後は同じ ETag でも 200 で新しい一覧を返す
+@pytest.mark.parametrize("write", [
+    lambda c, tid: c.post("/tasks", data={"title": "added"}),
+    lambda c, tid: c.post(f"/tasks/{tid}/status", data={"status": "done"}),
+    lambda c, tid: c.post(f"/tasks/{tid}/update", data={"title": "renamed", "priority": "High"}),
+    lambda c, tid: c.post(f"/tasks/{tid}/delete"),
+    lambda c, tid: c.post("/tasks/bulk", data={"op": "doing", "ids": [tid]}),
+    lambda c, tid: c.patch(f"/api/v1/tasks/{tid}", json={"title": "patched"}),
+    lambda c, tid: c.post("/api/v1/tasks/bulk", json={"op": "delete", "ids": [tid]}),
+])
+def test_write_changes_etag(app, client, db_models, write):
+    tid = seed(app, db_models)
+    etag = client.get("/").headers["ETag"]
+    assert write(client, tid).status_code < 400
+    res = client.get("/", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+def test_etag_depends_on_query(app, client, db_models):
+    seed(app, db_models)
+    etag = client.get("/").headers["ETag"]
+    res = client.get("/?status=done", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+# 他人の書き込みでは自分の個人一覧の ETag は変わらない（全タスク一覧は変わる）
+def test_other_users_write_keeps_personal_etag(app, client, db_models):
+    seed(app, db_models)
+    personal = client.get("/").headers["ETag"]
+    everyone = client.get("/?view_mode=all").headers["ETag"]
+
+    with app.test_client() as other:
+        with other.session_transaction() as sess:
+            sess["logged_in"] = True
+            sess["user_id"] = 2
+        other.post("/tasks", data={"title": "by user 2"})
+
+    assert client.get("/", headers={"If-None-Match": personal}).status_code == 304
+    assert client.get("/?view_mode=all", headers={"If-None-Match": everyone}).status_code == 200
@@ -0,0 +1,107 @@
+import threading
+import pytest
+
+@pytest.fixture
+def pipeline(app):
+    """グループコミットを有効にする（まとまりやすいよう待ち時間を長めにする）"""
+    import group_commit
+    app.config.update(GROUP_COMMIT_ENABLED=True, GROUP_COMMIT_WINDOW_MS=200)
+    group_commit.init_app(app)
+    yield group_commit.get_pipeline(app)
+    group_commit.get_pipeline(app).shutdown()
+
+def seed(app, db_models, owners):
+    with app.app_context():
+        tasks = [db_models.Task(title=f"t{i}", user_id=user_id) for i, user_id in enumerate(owners)]
+        db_models.db.session.add_all(tasks)
+        db_models.db.session.commit()
+        return [t.id for t in tasks]
+
+def post_all(app, requests):
+    """(user_id, url, data) を同時に POST し、(ステータスコード, JSON) のリストを返す"""
+    results = [None] * len(requests)
+    start = threading.Barrier(len(requests))
+
+    def post(i, user_id, url, data):
+        with app.test_client() as c:
+            with c.session_transaction() as sess:
+                sess["logged_in"] = True
+                sess["user_id"] = user_id
+            start.wait()
+            res = c.post(url, data=data, headers={"Accept": "application/json"})
+            results[i] = (res.status_code, res.get_json(silent=True))
+
+    threads = [threading.Thread(target=post, args=(i, *r)) for i, r in enumerate(requests)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+# 同時に届いた状態の変更は1回の commit にまとまり、応答の時点で他の接続から見える
+def test_concurrent_status_changes_share_one_commit(app, db_models, pipeline):
+    import counters
+    ids = seed(app, db_models, [1] * 10 + [2] * 10)
+    requests = [(1 if i < 10 else 2, f"/tasks/{task_id}/status", {"status": "done"}) for i, task_id in enumerate(ids)]
+    results = post_all(app, requests)
+    assert results == [(200, {"id": task_id, "status": "done"}) for task_id in ids]
+    assert pipeline.stats()["writes"] == 20
+    assert pipeline.stats()["batches"] < 20
+
+    with app.app_context():
+        assert {t.status for t in db_models.Task.query} == {"done"}
+        assert db_models.TaskEvent.query.count() == 20
+        assert counters.stored() == counters.recount()
+
+# 他人のタスク（403）・ないタスク（404）は同じ commit にまとめた他の書き込みを巻き込まない
+def test_errors_are_reported_per_request(app, db_models, pipeline):
+    mine, others, gone, deleted = seed(app, db_models, [1, 2, 1, 2])
+    with app.app_context():
+        db_models.db.session.delete(db_models.db.session.get(db_models.Task, gone))
+        db_models.db.session.commit()
+    results = post_all(app, [
+        (1, f"/tasks/{mine}/status", {"status": "doing"}),
+        (1, f"/tasks/{others}/status", {"status": "doing"}),
+        (1, f"/tasks/{gone}/status", {"status": "doing"}),
+        (1, f"/tasks/{mine}/status", {"status": "bogus"}),
+        (2, f"/tasks/{deleted}/delete", {}),
+    ])
+    assert [code for code, _body in results] == [200, 403, 404, 400, 204]
+    with app.app_context():
+        assert db_models.db.session.get(db_models.Task, mine).status == "doing"
+        assert db_models.db.session.get(db_models.Task, others).status == "todo"
+        assert db_models.db.session.get(db_models.Task, deleted) is None
+        assert db_models.TaskEvent.query.count() == 2
+
+# 書き込みスレッドが詰まって待ちが上限に達したら 503 を返す
+def test_full_queue_returns_503(app, client, db_models):
+    import group_commit
+    (task_id,) = seed(app, db_models, [1])
+    started, release = threading.Event(), threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(5)
+
+    pipeline = group_commit.WritePipeline(app, window=0, max_pending=1)
+    app.extensions["group_commit"] = pipeline
+    first = pipeline.submit(blocked)
+    assert started.wait(5)
+    second = pipeline.submit(blocked)  # 待ちの1件目
+    res = client.post(f"/tasks/{task_id}/status", data={"status": "done"})
+    assert res.status_code == 503 and res.headers["Retry-After"] == "1"
+    release.set()
+    first.result(5)
+    second.result(5)
+    pipeline.shutdown()
+
+# 有効にすると応答した変更が電源断でも残るよう synchronous=FULL で接続する
+def test_enabled_mode_uses_synchronous_full(monkeypatch, request):
+    from sqlalchemy import text
+    monkeypatch.setenv("GROUP_COMMIT_ENABLED", "1")
+    app = request.getfixturevalue("app")
+    import group_commit
+    from models import db
+    assert group_commit.get_pipeline(app) is not None
+    with app.app_context():
+        assert db.session.execute(text("PRAGMA synchronous")).scalar() == 2  # FULL
@@ -0,0 +1,93 @@
+import logging
+import re
+import pytest
+
+@pytest.fixture
+def instrumented(monkeypatch, request):
+    """計測を有効にした app（環境変数は app の import 前に設定する）"""
+    monkeypatch.setenv("INSTRUMENTATION_ENABLED", "1")
+    monkeypatch.setenv("METRICS_TOKEN", "secret")
+    monkeypatch.setenv("ADMIN_EMAILS", "admin@example.com")
+    monkeypatch.setenv("SLOW_QUERY_MS", getattr(request, "param", "100"))
+    return request.getfixturevalue("app")
+
+def logged_in(app, user_id=1):
+    c = app.test_client()
+    with c.session_transaction() as sess:
+        sess["logged_in"] = True
+        sess["user_id"] = user_id
+    return c
+
+def add_user(app, db_models, email):
+    with app.app_context():
+        user = db_models.User(email=email, password_hash="x")
+        db_models.db.session.add(user)
+        db_models.db.session.commit()
+        return user.id
+
+def metrics_text(app):
+    res = app.test_client().get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert res.status_code == 200
+    assert res.mimetype == "text/plain"
+    return res.get_data(as_text=True)
+
+def test_disabled_by_default(client):
+    assert client.get("/metrics").status_code == 404
+    res = client.get("/?profile=1")
+    assert res.mimetype == "text/html"
+
+def test_metrics_report_requests_phases_and_queries(instrumented):
+    client = logged_in(instrumented)
+    client.get("/")
+    client.get("/?view_mode=all")
+    text = metrics_text(instrumented)
+    assert 'board_http_requests_total{endpoint="index",method="GET",status="200"} 2' in text
+    assert 'board_http_request_duration_seconds_bucket{endpoint="index",le="+Inf"} 2' in text
+    assert 'board_http_request_duration_seconds_count{endpoint="index"} 2' in text
+    assert 'board_http_request_phase_seconds_count{endpoint="index",phase="query"} 2' in text
+    assert 'board_http_request_phase_seconds_count{endpoint="index",phase="render"} 2' in text
+    queries = next(line for line in text.splitlines() if line.startswith('board_db_queries_total{endpoint="index"}'))
+    assert int(queries.split()[-1]) > 0
+    assert "# TYPE board_http_request_duration_seconds histogram" in text
+    assert "board_board_cache_misses_total" in text
+
+# 失敗した SQL の開始時刻も接続に残らない（重複登録の IntegrityError など）
+def test_failed_statement_does_not_leak_timing(instrumented, db_models):
+    from sqlalchemy.exc import IntegrityError
+    add_user(instrumented, db_models, "dup@example.com")
+    with instrumented.app_context():
+        conn = db_models.db.session.connection(bind_arguments={"mapper": db_models.User})
+        for _ in range(3):
+            with pytest.raises(IntegrityError):
+                with conn.begin_nested():
+                    conn.execute(db_models.User.__table__.insert().values(email="dup@example.com", password_hash="x"))
+        assert conn.info.get("query_start") == []
+
+# /metrics はトークンか管理者のログインが必要（ログイン画面には飛ばさない）
+def test_metrics_requires_token_or_admin(instrumented, db_models):
+    assert instrumented.test_client().get("/metrics").status_code == 404
+    assert instrumented.test_client().get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+    user_id = add_user(instrumented, db_models, "user@example.com")
+    assert logged_in(instrumented, user_id).get("/metrics").status_code == 404
+    admin_id = add_user(instrumented, db_models, "admin@example.com")
+    assert logged_in(instrumented, admin_id).get("/metrics").status_code == 200
+
+@pytest.mark.parametrize("instrumented", ["0"], indirect=True)
+def test_slow_queries_are_logged_with_query_plan(instrumented, caplog):
+    caplog.set_level(logging.WARNING)
+    logged_in(instrumented).get("/?status=todo")
+    slow = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Slow query")]
+    board = next(m for m in slow if re.search(r"FROM task\b", m) and "ORDER BY" in m)
+    assert "ix_task_user_status_created" in board  # EXPLAIN QUERY PLAN の結果
+    assert "board_db_slow_queries_total 0" not in metrics_text(instrumented)
+
+# ?profile=1 は管理者にだけ cProfile の結果を返す
+def test_profile_mode_for_admins_only(instrumented, db_models):
+    user_id = add_user(instrumented, db_models, "user@example.com")
+    admin_id = add_user(instrumented, db_models, "admin@example.com")
+    assert logged_in(instrumented, user_id).get("/?profile=1").mimetype == "text/html"
+    res = logged_in(instrumented, admin_id).get("/?profile=1")
+    assert res.mimetype == "text/plain"
+    report = res.get_data(as_text=True)
+    for text in ("total:", "query:", "render:", "sql:", "hydrate", "cumulative"):
+        assert text in report
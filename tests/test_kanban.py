@@ -0,0 +1,85 @@
+from datetime import datetime
+import html
+import re
+import pytest
+
+def column_ids(html_text: str, status: str):
+    """カンバンの status の列のタスク ID（列がなければ None）"""
+    start = html_text.find(f'id="column-{status}"')
+    if start < 0:
+        return None
+    # 列の中身は次の列・More・一覧の終わりまで
+    ends = [html_text.find(marker, start + 1) for marker in ('id="column-', 'class="card-footer', "<!-- Edit Modal")]
+    section = html_text[start:min(end for end in ends if end >= 0)]
+    return [int(x) for x in re.findall(r'data-id="(\d+)"', section)]
+
+def more_url(html_text: str, status: str):
+    m = re.search(rf'id="more-{status}">\s*<a [^>]*href="([^"]+)"', html_text)
+    return html.unescape(m.group(1)) if m else None
+
+def seed(app, db_models):
+    """user_id=1 に done 12件・todo 4件・doing 2件（優先度・期日・作成日時がばらばら）、user_id=2 に todo 1件"""
+    Task = db_models.Task
+    db = db_models.db
+    priorities = ["High", "Mid", "Low"]
+    rows = [("done", i) for i in range(12)] + [("todo", i) for i in range(4)] + [("doing", i) for i in range(2)]
+    with app.app_context():
+        for n, (status, i) in enumerate(rows):
+            db.session.add(Task(
+                title=f"{status} {i}", status=status, priority=priorities[(n * 7) % 3], user_id=1,
+                due_date=datetime(2025, 1, 1 + (n * 5) % 9) if n % 4 else None,
+                created_at=datetime(2024, 1, 1, 10, n % 7),
+            ))
+        db.session.add(Task(title="other", status="todo", user_id=2))
+        db.session.commit()
+
+def test_columns_are_loaded_with_their_own_limit(app, client, db_models):
+    seed(app, db_models)
+    app.config["KANBAN_COLUMN_SIZE"] = 5
+    text = client.get("/?layout=kanban").get_data(as_text=True)
+    assert [len(column_ids(text, s)) for s in ("todo", "doing", "done")] == [4, 2, 5]
+    # 続きがあるのは done の列だけ
+    assert more_url(text, "todo") is None and more_url(text, "doing") is None
+    assert "column=done" in more_url(text, "done")
+    assert 'id="loadMore"' not in text
+
+    # status で絞るとその列だけ
+    text = client.get("/?layout=kanban&status=doing").get_data(as_text=True)
+    assert column_ids(text, "todo") is None and len(column_ids(text, "doing")) == 2
+
+    text = client.get("/?layout=kanban&view_mode=all").get_data(as_text=True)
+    assert len(column_ids(text, "todo")) == 5
+
+# 列の More をたどると、その列だけを同じ並び順で最後まで読める（ほかの列は読まない）
+@pytest.mark.parametrize("sort_by", ["", "Priority", "Due Date"])
+def test_more_walks_one_column_in_sort_order(app, client, db_models, sort_by):
+    seed(app, db_models)
+    full = [int(x) for x in re.findall(r'data-id="(\d+)"', client.get(f"/?status=done&sort_by={sort_by}").get_data(as_text=True))]
+    assert len(full) == 12
+
+    app.config["KANBAN_COLUMN_SIZE"] = 5
+    text = client.get(f"/?layout=kanban&sort_by={sort_by}").get_data(as_text=True)
+    pages = [column_ids(text, "done")]
+    url = more_url(text, "done")
+    while url:
+        text = client.get(url).get_data(as_text=True)
+        assert column_ids(text, "todo") is None and column_ids(text, "doing") is None
+        pages.append(column_ids(text, "done"))
+        url = more_url(text, "done")
+    assert [len(p) for p in pages] == [5, 5, 2]
+    assert sum(pages, []) == full
+
+# カードの移動は1件の状態変更（JSON で返る）。一括操作はカンバンのまま戻る
+def test_moving_a_card_updates_its_column(app, client, db_models):
+    seed(app, db_models)
+    text = client.get("/?layout=kanban").get_data(as_text=True)
+    task_id = column_ids(text, "todo")[0]
+    res = client.post(f"/tasks/{task_id}/status", data={"status": "doing"}, headers={"Accept": "application/json"})
+    assert res.get_json() == {"id": task_id, "status": "doing"}
+
+    text = client.get("/?layout=kanban").get_data(as_text=True)
+    assert task_id not in column_ids(text, "todo")
+    assert task_id in column_ids(text, "doing")
+
+    res = client.post("/tasks/bulk", data={"op": "done", "ids": [task_id], "layout": "kanban"})
+    assert res.status_code == 302 and "layout=kanban" in res.headers["Location"]
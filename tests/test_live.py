@@ -0,0 +1,228 @@
+import json
+import time
+from datetime import datetime, timedelta
+import pytest
+
+def seed(app, db_models, rows):
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        db.session.query(Task).delete()
+        tasks = [Task(**{"status": "todo", "priority": "Mid", "user_id": 1, **row}) for row in rows]
+        db.session.add_all(tasks)
+        db.session.commit()
+        return [t.id for t in tasks]
+
+def recorded(app, db_models):
+    with app.app_context():
+        return [(e.kind, e.task_id) for e in db_models.TaskEvent.query.order_by(db_models.TaskEvent.id)]
+
+def login(app, user_id):
+    c = app.test_client()
+    with c.session_transaction() as sess:
+        sess["logged_in"] = True
+        sess["user_id"] = user_id
+    return c
+
+def read_events(res, until, timeout=5):
+    """SSE のレスポンスから (event, data) を読む。until(events) が真になるか timeout 秒で止める"""
+    events = []
+    buf = ""
+    deadline = time.monotonic() + timeout
+    for chunk in res.response:
+        buf += chunk.decode() if isinstance(chunk, bytes) else chunk
+        while "\n\n" in buf:
+            block, buf = buf.split("\n\n", 1)
+            fields = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line and not line.startswith(":"))
+            if "event" in fields:
+                events.append((fields["event"], json.loads(fields["data"]), fields.get("id")))
+        if until(events) or time.monotonic() > deadline:
+            break
+    res.close()
+    return events
+
+@pytest.fixture
+def live_app(app):
+    app.config["LIVE_KEEPALIVE"] = 0.05
+    app.config["LIVE_POLL_INTERVAL"] = 0.05
+    return app
+
+# どの書き込みルートも同じトランザクションで変更を記録する
+@pytest.mark.parametrize("write,expected", [
+    (lambda c, a, b: c.post("/tasks", data={"title": "new"}), lambda a, b, new: [("created", new)]),
+    (lambda c, a, b: c.post(f"/tasks/{a}/status", data={"status": "done"}), lambda a, b, new: [("updated", a)]),
+    (lambda c, a, b: c.post(f"/tasks/{a}/update", data={"title": "x", "priority": "Low"}), lambda a, b, new: [("updated", a)]),
+    (lambda c, a, b: c.post(f"/tasks/{a}/delete"), lambda a, b, new: [("deleted", a)]),
+    (lambda c, a, b: c.post("/tasks/bulk", data={"op": "doing", "ids": [a, b]}), lambda a, b, new: [("updated", a), ("updated", b)]),
+    (lambda c, a, b: c.post("/tasks/bulk", data={"op": "delete", "scope": "filter"}), lambda a, b, new: [("deleted", a), ("deleted", b)]),
+    (lambda c, a, b: c.post("/api/v1/tasks", json={"title": "new"}), lambda a, b, new: [("created", new)]),
+    (lambda c, a, b: c.patch(f"/api/v1/tasks/{b}", json={"status": "done"}), lambda a, b, new: [("updated", b)]),
+    (lambda c, a, b: c.delete(f"/api/v1/tasks/{b}"), lambda a, b, new: [("deleted", b)]),
+    (lambda c, a, b: c.post("/api/v1/tasks/bulk", json={"op": "create", "tasks": [{"title": "new"}]}), lambda a, b, new: [("created", new)]),
+    (lambda c, a, b: c.post("/api/v1/tasks/bulk", json={"op": "status", "status": "done", "ids": [a]}), lambda a, b, new: [("updated", a)]),
+])
+def test_writes_record_events(app, client, db_models, write, expected):
+    a, b = seed(app, db_models, [{"title": "a"}, {"title": "b"}])
+    assert write(client, a, b).status_code < 400
+    events = recorded(app, db_models)
+    assert sorted(events) == sorted(expected(a, b, b + 1))
+
+def test_rejected_write_records_nothing(app, client, db_models):
+    (mine,) = seed(app, db_models, [{"title": "other's", "user_id": 2}])
+    assert client.post(f"/tasks/{mine}/status", data={"status": "done"}).status_code == 403
+    assert client.post(f"/tasks/{mine}/update", data={"title": "", "priority": "Low"}).status_code == 403
+    assert recorded(app, db_models) == []
+
+def test_task_item_respects_current_filter(app, client, db_models):
+    todo, done, other = seed(app, db_models, [
+        {"title": "todo task"}, {"title": "done task", "status": "done"}, {"title": "other", "user_id": 2},
+    ])
+    res = client.get(f"/tasks/{todo}/item?status=todo")
+    assert res.status_code == 200
+    assert f'data-id="{todo}"' in res.get_data(as_text=True)
+    assert client.get(f"/tasks/{done}/item?status=todo").status_code == 204
+    assert client.get(f"/tasks/{other}/item").status_code == 204
+    assert client.get(f"/tasks/{other}/item?view_mode=all").status_code == 200
+    assert client.get(f"/tasks/{todo}/item?q=nomatch").status_code == 204
+    assert client.get("/tasks/9999/item").status_code == 204
+
+def test_index_and_item_render_the_same_row(app, client, db_models):
+    (tid,) = seed(app, db_models, [{"title": "same", "detail": "d", "due_date": datetime(2030, 1, 1)}])
+    page = client.get("/").get_data(as_text=True)
+    item = client.get(f"/tasks/{tid}/item").get_data(as_text=True).strip()
+    assert item in page
+
+def test_status_and_delete_json_mode(app, client, db_models):
+    (tid,) = seed(app, db_models, [{"title": "t"}])
+    res = client.post(f"/tasks/{tid}/status", data={"status": "doing"}, headers={"Accept": "application/json"})
+    assert res.status_code == 200
+    assert res.get_json() == {"id": tid, "status": "doing"}
+    res = client.post(f"/tasks/{tid}/delete", headers={"Accept": "application/json"})
+    assert res.status_code == 204
+    # 通常のフォーム送信は従来どおりリダイレクト
+    (tid,) = seed(app, db_models, [{"title": "t"}])
+    assert client.post(f"/tasks/{tid}/status", data={"status": "done"}).status_code == 302
+
+def test_stream_delivers_own_changes_only_on_personal_view(live_app, client, db_models):
+    seed(live_app, db_models, [])
+    res = client.get("/events?view_mode=personal")
+    assert res.mimetype == "text/event-stream"
+    login(live_app, 2).post("/tasks", data={"title": "by user 2"})
+    client.post("/tasks", data={"title": "by user 1"})
+
+    events = read_events(res, lambda ev: len(ev) >= 1, timeout=2)
+    assert [(name, data["kind"]) for name, data, _id in events] == [("task", "created")]
+    with live_app.app_context():
+        assert db_models.Task.query.get(events[0][1]["id"]).title == "by user 1"
+
+def test_stream_all_view_receives_every_change_in_order(live_app, client, db_models):
+    (tid,) = seed(live_app, db_models, [{"title": "t"}])
+    res = client.get("/events?view_mode=all")
+    login(live_app, 2).post("/tasks", data={"title": "by user 2"})
+    client.post(f"/tasks/{tid}/status", data={"status": "done"})
+    client.post(f"/tasks/{tid}/delete")
+
+    events = read_events(res, lambda ev: len(ev) >= 3)
+    assert [data["kind"] for _name, data, _id in events] == ["created", "updated", "deleted"]
+    positions = [tuple(map(int, event_id.split("-"))) for _name, _data, event_id in events]
+    assert positions == sorted(positions)
+
+# ページ読み込みから接続までの変更・切断中の変更は after / Last-Event-ID から送り直す
+@pytest.mark.parametrize("resume", ["query", "header"])
+def test_stream_replays_missed_events(live_app, client, db_models, resume):
+    (tid,) = seed(live_app, db_models, [{"title": "t"}])
+    with live_app.app_context():
+        import events as events_module
+        after = events_module.position_token(events_module.latest_position())
+    client.post(f"/tasks/{tid}/status", data={"status": "doing"})
+    client.post(f"/tasks/{tid}/status", data={"status": "done"})
+
+    if resume == "query":
+        res = client.get(f"/events?after={after}")
+    else:
+        res = client.get("/events?after=0", headers={"Last-Event-ID": after})
+    events = read_events(res, lambda ev: len(ev) >= 2)
+    assert [(data["kind"], data["id"]) for _name, data, _id in events] == [("updated", tid), ("updated", tid)]
+
+def test_slow_subscriber_is_told_to_reload(live_app, client, db_models, monkeypatch):
+    import events as events_module
+    (tid,) = seed(live_app, db_models, [{"title": "t"}])
+    monkeypatch.setattr(events_module.get_broker(live_app), "queue_size", 1)
+    res = client.get("/events?view_mode=all")
+    for status in ["doing", "done", "todo"]:
+        client.post(f"/tasks/{tid}/status", data={"status": status})
+    time.sleep(0.3)  # 読み出す前にキューを溢れさせる
+    events = read_events(res, lambda ev: any(name == "reload" for name, _data, _id in ev))
+    assert events[-1][0] == "reload"
+
+def test_old_events_are_pruned(app, client, db_models, monkeypatch):
+    import events as events_module
+    monkeypatch.setattr(events_module, "PRUNE_EVERY", 1)
+    seed(app, db_models, [])
+    with app.app_context():
+        db_models.db.session.add(db_models.TaskEvent(
+            kind="created", task_id=1, user_id=1, seq=0, created_at=datetime.now() - timedelta(days=1),
+        ))
+        db_models.db.session.commit()
+    client.post("/tasks", data={"title": "new"})
+    assert [kind for kind, _id in recorded(app, db_models)] == ["created"]  # 1日前のイベントは消える
+
+# 小さい id のイベントが後から commit されても（PostgreSQL などの同時の書き込み）、配信・送り直しで読み飛ばさない
+@pytest.mark.backend_matrix
+def test_stream_delivers_events_committed_out_of_id_order(live_app, client, db_models):
+    import board_cache
+    (tid,) = seed(live_app, db_models, [{"title": "t"}])
+    db = db_models.db
+
+    def commit_event(event_id):
+        # record() と同じ書き込みで、id だけを指定する
+        with live_app.app_context():
+            db.session.add(db_models.TaskEvent(id=event_id, kind="updated", task_id=tid, user_id=1))
+            db.session.info["task_events"] = True
+            board_cache.bump_version(1)
+            db.session.commit()
+
+    res = client.get("/events?view_mode=all")
+    commit_event(1000)
+    time.sleep(0.3)  # 配信の位置が id 1000 まで進んでから
+    commit_event(500)
+    events = read_events(res, lambda ev: len(ev) >= 2)
+    positions = [tuple(map(int, event_id.split("-"))) for _name, _data, event_id in events]
+    assert [event_id for _seq, event_id in positions] == [1000, 500]
+    assert positions == sorted(positions)
+
+    res = client.get("/events?view_mode=all", headers={"Last-Event-ID": events[0][2]})
+    replayed = read_events(res, lambda ev: len(ev) >= 1)
+    assert [event_id for _name, _data, event_id in replayed] == [events[1][2]]
+
+# 以前の版の task_event（seq なし）は seq 0 になり、消した位置の id は (0, id) として引き継ぐ
+def test_upgrade_adds_event_seq(app, client, db_models):
+    from sqlalchemy import inspect, text
+    import events as events_module
+    import migrations
+    db = db_models.db
+    with app.app_context():
+        for statement in [
+            "DROP TABLE task_event", "DROP TABLE task_event_watermark",
+            "CREATE TABLE task_event (id INTEGER PRIMARY KEY AUTOINCREMENT, kind VARCHAR(10) NOT NULL,"
+            " task_id INTEGER NOT NULL, user_id INTEGER, created_at DATETIME NOT NULL)",
+            "CREATE INDEX ix_task_event_user ON task_event (user_id, id)",
+            "CREATE TABLE task_event_watermark (id INTEGER PRIMARY KEY, pruned_through INTEGER NOT NULL, updated_at DATETIME NOT NULL)",
+            "INSERT INTO task_event (id, kind, task_id, user_id, created_at) VALUES"
+            " (5, 'created', 1, 1, '2024-01-01 10:00:00.000000'), (6, 'updated', 1, 1, '2024-01-01 11:00:00.000000')",
+            "INSERT INTO task_event_watermark VALUES (1, 4, '2024-01-01 09:00:00.000000')",
+        ]:
+            db.session.execute(text(statement))
+        db.session.commit()
+
+        migrations.upgrade()
+        migrations.upgrade()  # 2回目は何もしない
+        assert events_module.latest_position() == (0, 6)
+        assert events_module.pruned_position() == (0, 4)
+        indexes = {ix["name"] for ix in inspect(db.engine).get_indexes("task_event")}
+        assert "ix_task_event_user" not in indexes and "ix_task_event_user_seq" in indexes
+
+    client.post("/tasks", data={"title": "new"})
+    with app.app_context():
+        rows = events_module.events_after(db.session.execute, (0, 6), 10)
+        assert [(row.kind, row.seq > 0) for row in rows] == [("created", True)]
@@ -0,0 +1,41 @@
+from sqlalchemy import inspect, text
+
+def test_init_db_is_idempotent(app, db_models):
+    runner = app.test_cli_runner()
+    for _ in range(2):
+        result = runner.invoke(args=["init-db"])
+        assert result.exit_code == 0, result.output
+        assert "Initialized the databases." in result.output
+    with app.app_context():
+        tables = inspect(db_models.db.engine).get_table_names()
+        assert {"task", "task_archive", "task_event", "board_version"} <= set(tables)
+
+# 各コマンドは tasks / users の両方で実行し、前後の大きさを表示する
+def test_analyze_and_optimize_report_each_database(app, db_models):
+    runner = app.test_cli_runner()
+    for command in ("analyze-db", "optimize-db"):
+        result = runner.invoke(args=[command])
+        assert result.exit_code == 0, result.output
+        lines = result.output.splitlines()
+        assert [line.split(":")[0] for line in lines] == ["tasks", "users"]
+
+def test_vacuum_releases_free_pages(app, db_models):
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            return
+        db.session.add_all([Task(title=f"t{i}", detail="x" * 500, user_id=1) for i in range(500)])
+        db.session.commit()
+        Task.query.delete()
+        db.session.commit()
+        with db.engine.connect() as conn:
+            assert conn.execute(text("PRAGMA freelist_count")).scalar() > 0
+
+    result = app.test_cli_runner().invoke(args=["vacuum-db"])
+    assert result.exit_code == 0, result.output
+    assert "tasks: VACUUM" in result.output
+
+    with app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.execute(text("PRAGMA freelist_count")).scalar() == 0
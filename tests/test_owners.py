@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import event
+
+def seed(app, db_models, n_users, n_tasks):
+    db = db_models.db
+    with app.app_context():
+        users = [db_models.User(email=f"u{i}@example.com", password_hash="x") for i in range(n_users)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all([
+            db_models.Task(title=f"t{i}", status="todo", priority="Mid", user_id=users[i % n_users].id)
+            for i in range(n_tasks)
+        ])
+        db.session.commit()
+        return [u.id for u in users]
+
+def count_queries(app, db_models, fn):
+    """fn() の間に tasks.db / users.db で実行された SQL の数 {bind_key: 件数}"""
+    counts = {}
+    with app.app_context():
+        engines = dict(db_models.db.engines)
+    listeners = []
+    for key, engine in engines.items():
+        counts[key] = 0
+        def listener(*args, key=key):
+            counts[key] += 1
+        event.listen(engine, "before_cursor_execute", listener)
+        listeners.append((engine, listener))
+    try:
+        fn()
+    finally:
+        for engine, listener in listeners:
+            event.remove(engine, "before_cursor_execute", listener)
+    return counts
+
+@pytest.fixture
+def owners_app(app):
+    app.config["BOARD_CACHE_ENABLED"] = False
+    return app
+
+def test_all_view_shows_owner_emails(owners_app, client, db_models):
+    seed(owners_app, db_models, 3, 6)
+    html = client.get("/?view_mode=all").get_data(as_text=True)
+    for i in range(3):
+        assert f"u{i}@example.com" in html
+    # 個人の一覧には出さない
+    assert "task-owner" not in client.get("/?view_mode=personal").get_data(as_text=True)
+
+# 1ページの件数・所有者の数に関係なく、一覧のクエリ数は一定（所有者は IN で1回）
+@pytest.mark.parametrize("n_users,n_tasks", [(1, 1), (5, 10), (40, 50)])
+def test_all_view_query_count_is_constant(owners_app, client, db_models, n_users, n_tasks):
+    import user_cache
+    seed(owners_app, db_models, n_users, n_tasks)
+    user_cache.get_cache(owners_app).clear()
+    counts = count_queries(owners_app, db_models, lambda: client.get("/?view_mode=all"))
+    assert counts["users"] == 1
+    baseline = count_queries(owners_app, db_models, lambda: client.get("/?view_mode=personal"))
+    assert counts[None] == baseline[None]
+    # 2回目はキャッシュから引くので users.db は読まない
+    assert count_queries(owners_app, db_models, lambda: client.get("/?view_mode=all"))["users"] == 0
+
+def test_item_fragment_shows_owner_on_all_view(owners_app, client, db_models):
+    seed(owners_app, db_models, 2, 2)
+    with owners_app.app_context():
+        task = db_models.Task.query.filter_by(title="t1").one()
+    assert "u1@example.com" in client.get(f"/tasks/{task.id}/item?view_mode=all").get_data(as_text=True)
+
+# 削除済みのユーザーのタスクは所有者なしで表示する
+def test_missing_owner_is_shown_as_placeholder(owners_app, client, db_models):
+    seed(owners_app, db_models, 1, 1)
+    with owners_app.app_context():
+        db_models.Task.query.update({"user_id": 999})
+        db_models.db.session.commit()
+    html = client.get("/?view_mode=all").get_data(as_text=True)
+    assert '<i class="bi bi-person"></i> -' in html
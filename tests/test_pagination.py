@@ -0,0 +1,81 @@
+from datetime import datetime
+import html
+import re
+import pytest
+
+def extract_ids_from_html(html_text: str):
+    return [int(x) for x in re.findall(r'data-id="(\d+)"', html_text)]
+
+def extract_next_url(html_text: str):
+    m = re.search(r'id="loadMore">\s*<a [^>]*href="([^"]+)"', html_text)
+    return html.unescape(m.group(1)) if m else None
+
+def seed_many(app, db_models):
+    """
+    user_id=1 に11件。作成日時・期日・優先度が重複する行を含め、
+    並べ替えキーの同順位（タイブレーク）もページ境界をまたぐようにする。
+    """
+    Task = db_models.Task
+    db = db_models.db
+    priorities = ["High", "Mid", "Low"]
+    dues = [datetime(2025, 1, 5), None, datetime(2025, 1, 10)]
+
+    with app.app_context():
+        db.session.query(Task).delete()
+        db.session.commit()
+        for i in range(11):
+            db.session.add(Task(
+                title=f"T{i}",
+                priority=priorities[i % 3],
+                status="todo",
+                user_id=1,
+                due_date=dues[i % 3] if i % 2 else dues[(i + 1) % 3],
+                created_at=datetime(2024, 1, 1, 10, i // 2),  # 2件ずつ同じ作成日時
+            ))
+        db.session.commit()
+
+def walk_pages(client, url):
+    """Load more を最後までたどって、ページごとの ID リストを返す"""
+    pages = []
+    while url:
+        res = client.get(url)
+        assert res.status_code == 200
+        text = res.get_data(as_text=True)
+        pages.append(extract_ids_from_html(text))
+        url = extract_next_url(text)
+    return pages
+
+@pytest.mark.parametrize("sort_by", ["", "Priority", "Due Date"])
+def test_pages_concatenate_to_full_list(app, client, db_models, sort_by):
+    seed_many(app, db_models)
+
+    app.config["TASKS_PER_PAGE"] = 1000
+    full = extract_ids_from_html(client.get(f"/?sort_by={sort_by}").get_data(as_text=True))
+    assert len(full) == 11
+
+    app.config["TASKS_PER_PAGE"] = 3
+    pages = walk_pages(client, f"/?sort_by={sort_by}")
+    assert [len(p) for p in pages] == [3, 3, 3, 2]
+    assert sum(pages, []) == full
+
+def test_last_page_has_no_load_more(app, client, db_models):
+    seed_many(app, db_models)
+    app.config["TASKS_PER_PAGE"] = 11
+
+    text = client.get("/").get_data(as_text=True)
+    assert len(extract_ids_from_html(text)) == 11
+    assert extract_next_url(text) is None
+
+def test_after_token_keeps_filters(app, client, db_models):
+    seed_many(app, db_models)
+    app.config["TASKS_PER_PAGE"] = 1
+
+    url = extract_next_url(client.get("/?priority=High&sort_by=Priority").get_data(as_text=True))
+    assert "priority=High" in url and "sort_by=Priority" in url and "after=" in url
+
+@pytest.mark.parametrize("after", ["garbage", "W10", "WyJQcmlvcml0eSIsWzFdXQ"])
+def test_invalid_after_token_is_rejected(app, client, db_models, after):
+    seed_many(app, db_models)
+    # 壊れたトークン・要素数違い・別の並び順のトークン
+    res = client.get(f"/?sort_by=Due+Date&after={after}")
+    assert res.status_code == 400
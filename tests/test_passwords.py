@@ -0,0 +1,112 @@
+import threading
+import pytest
+
+CHEAP = "pbkdf2:sha256:1000"
+
+def register(app, email="a@example.com", password="pw"):
+    return app.test_client().post("/register", data={"email": email, "password": password, "password2": password})
+
+def login(app, email="a@example.com", password="pw"):
+    return app.test_client().post("/login", data={"email": email, "password": password})
+
+def stored_hash(app, db_models, email="a@example.com"):
+    with app.app_context():
+        return db_models.User.query.filter_by(email=email).one().password_hash
+
+@pytest.fixture
+def pool(app):
+    """ワーカー1つのプロセスプールで、コストの低い method を使う"""
+    import passwords
+    app.config["PASSWORD_HASH_METHOD"] = CHEAP
+    app.extensions["password_hash_pool"] = passwords.HashPool(workers=1, max_pending=2, retry_after=7)
+    yield app.extensions["password_hash_pool"]
+    app.extensions["password_hash_pool"].shutdown()
+
+# 登録・ログインのハッシュ計算はプロセスプールで行い、設定の method で保存される
+def test_register_and_login_hash_in_pool(app, db_models, pool):
+    assert register(app).status_code == 302
+    assert stored_hash(app, db_models).startswith(CHEAP + "$")
+    assert pool._executor is not None  # プールで計算した
+    res = login(app)
+    assert res.status_code == 302 and res.headers["Location"] == "/"
+    assert login(app, password="wrong").status_code == 200
+
+# 保存済みのハッシュの method が設定と違えば、ログイン時にハッシュし直す
+def test_login_rehashes_outdated_hash(app, db_models, pool):
+    register(app)
+    old = stored_hash(app, db_models)
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:2000"
+    assert login(app).status_code == 302
+    new = stored_hash(app, db_models)
+    assert new != old and new.startswith("pbkdf2:sha256:2000$")
+    # 次のログインでは作り直さない
+    assert login(app).status_code == 302
+    assert stored_hash(app, db_models) == new
+
+# 既定の method 名（コスト省略）でも保存形式と比べて判定する
+def test_needs_rehash_compares_normalized_method(app):
+    import passwords
+    from werkzeug.security import generate_password_hash
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2"
+    with app.app_context():
+        assert not passwords.needs_rehash(generate_password_hash("pw", "pbkdf2"))
+        assert passwords.needs_rehash(generate_password_hash("pw", CHEAP))
+
+# プールが満杯なら計算を待たずに 503 と Retry-After を返す
+def test_login_returns_503_when_pool_saturated(app, pool):
+    register(app)
+    for _ in range(pool.max_pending):
+        pool._slots.acquire()
+    try:
+        res = login(app)
+        assert res.status_code == 503
+        assert res.headers["Retry-After"] == "7"
+        assert register(app, "b@example.com").status_code == 503
+    finally:
+        for _ in range(pool.max_pending):
+            pool._slots.release()
+    assert login(app).status_code == 302
+
+# 同時に上限を超えて来た分だけが 503 になり、計算が終われば枠は空く
+def test_pool_bounds_concurrent_hashes(app):
+    import passwords
+    pool = passwords.HashPool(workers=1, max_pending=2, retry_after=1)
+    started = threading.Barrier(3)
+    results = []
+
+    def hash_one():
+        started.wait()
+        try:
+            results.append(pool.run(passwords.generate_password_hash, "pw", "pbkdf2:sha256:200000"))
+        except passwords.ServiceUnavailable:
+            results.append(503)
+
+    threads = [threading.Thread(target=hash_one) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    try:
+        assert results.count(503) <= 1 and len(results) == 3
+        assert pool.run(passwords.check_password_hash, next(r for r in results if r != 503), "pw") is True
+    finally:
+        pool.shutdown()
+
+# ワーカー数 0 ならリクエストのスレッドで直接計算する
+def test_inline_hashing_without_workers(app, db_models):
+    import passwords
+    app.config["PASSWORD_HASH_METHOD"] = CHEAP
+    app.extensions["password_hash_pool"] = passwords.HashPool(workers=0, max_pending=1, retry_after=1)
+    assert register(app).status_code == 302
+    assert login(app).status_code == 302
+    assert app.extensions["password_hash_pool"]._executor is None
+
+# 既定の method（scrypt、162 文字）のハッシュを各DBに保存でき、ログインできる（PostgreSQL の長さ制限）
+@pytest.mark.backend_matrix
+def test_register_and_login_with_default_method(app, db_models):
+    import passwords
+    app.extensions["password_hash_pool"] = passwords.HashPool(workers=0, max_pending=1, retry_after=1)
+    assert register(app).status_code == 302
+    assert len(stored_hash(app, db_models)) > 128
+    assert login(app).headers["Location"] == "/"
+    assert login(app, password="wrong").status_code == 200
@@ -0,0 +1,115 @@
+from datetime import datetime
+import itertools
+import re
+import pytest
+from sqlalchemy import text
+
+# index() の絞り込み × 並べ替えの全組み合わせ
+VIEW_MODES = ["personal", "all"]
+STATUS_FILTERS = [None, "doing"]
+PRIORITY_FILTERS = [None, "High"]
+SORTS = ["", "Priority", "Due Date"]
+
+def explain(db, q):
+    """クエリを SQL 文字列にして EXPLAIN QUERY PLAN の detail 列を返す"""
+    sql = str(q.statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in db.session.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+@pytest.mark.parametrize(
+    "view_mode,status,priority,sort_by",
+    list(itertools.product(VIEW_MODES, STATUS_FILTERS, PRIORITY_FILTERS, SORTS)),
+)
+def test_board_query_uses_index(app, db_models, view_mode, status, priority, sort_by):
+    from app import build_task_query
+
+    with app.app_context():
+        q = build_task_query(view_mode, status, priority, sort_by, user_id=1)
+        plan = explain(db_models.db, q)
+
+    # インデックスを使わない全件スキャンは不可
+    assert not any(line.startswith("SCAN task") and "INDEX" not in line for line in plan), plan
+    # 優先度で絞らない場合は、並べ替えもインデックスの順序で済むこと
+    if priority is None:
+        assert not any("TEMP B-TREE" in line for line in plan), plan
+
+# 見出しの期限切れの件数も (user_id,) status, due_sort の複合インデックスの範囲だけを読む
+@pytest.mark.parametrize("view_mode,status,priority", list(itertools.product(VIEW_MODES, STATUS_FILTERS, PRIORITY_FILTERS)))
+def test_overdue_count_uses_index(app, db_models, view_mode, status, priority):
+    from board import overdue_query
+
+    with app.app_context():
+        plan = explain(db_models.db, overdue_query(view_mode, 1, status, priority))
+    assert all(re.match(r"SEARCH task USING (COVERING )?INDEX", line) for line in plan), plan
+
+def test_upgrade_backfills_old_tasks_db(app, db_models):
+    import migrations
+
+    db = db_models.db
+    with app.app_context():
+        # priority_rank / due_sort / インデックスが無い旧スキーマを再現
+        db.session.execute(text("DROP TABLE task"))
+        db.session.execute(text(
+            "CREATE TABLE task (id INTEGER PRIMARY KEY, user_id INTEGER, title VARCHAR(100) NOT NULL,"
+            " detail TEXT, priority VARCHAR(10) NOT NULL, status VARCHAR(10) NOT NULL,"
+            " due_date DATETIME, created_at DATETIME NOT NULL)"
+        ))
+        db.session.execute(text(
+            "INSERT INTO task (user_id, title, priority, status, due_date, created_at) VALUES"
+            " (1, 'low', 'Low', 'todo', NULL, '2024-01-01 10:00:00.000000'),"
+            " (1, 'high', 'High', 'todo', '2025-01-10 00:00:00.000000', '2024-01-01 11:00:00.000000'),"
+            " (1, 'finished', 'Mid', 'done', NULL, '2020-01-01 11:00:00.000000')"
+        ))
+        db.session.commit()
+
+        migrations.upgrade()
+        migrations.upgrade()  # 2回目は何もしない
+
+        Task = db_models.Task
+        rows = {t.title: t for t in Task.query.all()}
+        assert rows["low"].priority_rank == 3
+        assert rows["low"].due_sort == db_models.DUE_DATE_NONE
+        assert rows["high"].priority_rank == 1
+        assert rows["high"].due_sort == datetime(2025, 1, 10)
+        # 既存の done の完了日時は移行した日時（作成日時ではない）
+        assert rows["low"].done_at is None
+        assert rows["finished"].done_at > datetime(2024, 1, 1)
+
+        index_names = {r[1] for r in db.session.execute(text("PRAGMA index_list(task)"))}
+        assert {ix.name for ix in Task.__table__.indexes} <= index_names
+
+@pytest.mark.parametrize("sort_by", SORTS)
+def test_next_page_queries_seek_index(app, client, db_models, sort_by):
+    """after 付きの2ページ目以降も、各クエリがインデックスで続きの位置にシークすること"""
+    from sqlalchemy import event
+
+    db = db_models.db
+    Task = db_models.Task
+    with app.app_context():
+        db.session.query(Task).delete()
+        db.session.add_all([
+            Task(title=f"T{i}", priority="Mid", user_id=1, created_at=datetime(2024, 1, 1, 10, i))
+            for i in range(5)
+        ])
+        db.session.commit()
+        engine = db.engine
+
+    app.config["TASKS_PER_PAGE"] = 2
+    first = client.get(f"/?status=todo&sort_by={sort_by}").get_data(as_text=True)
+    next_url = re.search(r'id="loadMore">\s*<a [^>]*href="([^"]+)"', first).group(1).replace("&amp;", "&")
+
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT") and re.search(r"FROM task\b", statement):
+            statements.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        assert client.get(next_url).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert statements
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+            # 見出しの期限切れの件数はインデックスだけで数える（COVERING INDEX）
+            assert all(re.match(r"SEARCH task USING (COVERING )?INDEX", line) for line in plan), plan
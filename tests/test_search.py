@@ -0,0 +1,130 @@
+import re
+import pytest
+from sqlalchemy import text
+
+def extract_titles(html: str):
+    return re.findall(r'<span class="ms-1">([^<]*)</span>', html)
+
+def seed(app, db_models, rows):
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        db.session.query(Task).delete()
+        tasks = [Task(**{"status": "todo", "priority": "Mid", "user_id": 1, **row}) for row in rows]
+        db.session.add_all(tasks)
+        db.session.commit()
+        return [t.id for t in tasks]
+
+def test_prefix_match_on_title_and_detail(app, client, db_models):
+    seed(app, db_models, [
+        {"title": "Write report", "detail": "quarterly numbers"},
+        {"title": "Call Bob", "detail": "about the report draft"},
+        {"title": "Buy milk"},
+    ])
+    assert sorted(extract_titles(client.get("/?q=rep").get_data(as_text=True))) == ["Call Bob", "Write report"]
+    # 複数の語は AND
+    assert extract_titles(client.get("/?q=report+quart").get_data(as_text=True)) == ["Write report"]
+    assert extract_titles(client.get("/?q=nothing").get_data(as_text=True)) == []
+
+def test_relevance_order(app, client, db_models):
+    seed(app, db_models, [
+        {"title": "deploy deploy", "detail": "deploy"},
+        {"title": "misc", "detail": "one mention of deploy among many other words in a long detail text"},
+    ])
+    assert extract_titles(client.get("/?q=deploy&sort_by=Relevance").get_data(as_text=True)) == ["deploy deploy", "misc"]
+    # 並び順を指定しなければ通常どおり新しい順
+    assert extract_titles(client.get("/?q=deploy").get_data(as_text=True)) == ["misc", "deploy deploy"]
+
+def test_search_combines_with_filters_and_sort(app, client, db_models):
+    seed(app, db_models, [
+        {"title": "fix low", "priority": "Low"},
+        {"title": "fix high", "priority": "High"},
+        {"title": "fix done", "priority": "High", "status": "done"},
+        {"title": "fix other", "priority": "High", "user_id": 2},
+        {"title": "unrelated", "priority": "High"},
+    ])
+    html = client.get("/?q=fix&sort_by=Priority").get_data(as_text=True)
+    assert extract_titles(html) == ["fix done", "fix high", "fix low"]  # 同順位は新しい順
+    html = client.get("/?q=fix&priority=High&status=todo").get_data(as_text=True)
+    assert extract_titles(html) == ["fix high"]
+    html = client.get("/?q=fix&view_mode=all&priority=High&status=todo").get_data(as_text=True)
+    assert sorted(extract_titles(html)) == ["fix high", "fix other"]
+
+def test_result_limit(app, client, db_models):
+    seed(app, db_models, [{"title": f"item {i}"} for i in range(5)])
+    app.config["SEARCH_RESULT_LIMIT"] = 3
+    html = client.get("/?q=item").get_data(as_text=True)
+    assert len(extract_titles(html)) == 3
+    assert "Showing the top 3 matches" in html
+    assert 'id="loadMore"' not in html
+
+# FTS5 の演算子や記号を入力してもエラーにならない
+@pytest.mark.parametrize("query", ['"', "AND", "NEAR(", "*", "a OR", "-x", "title:foo", "!!!"])
+def test_operators_are_not_interpreted(app, client, db_models, query):
+    seed(app, db_models, [{"title": "plain"}])
+    res = client.get("/", query_string={"q": query})
+    assert res.status_code == 200
+    assert extract_titles(res.get_data(as_text=True)) == []
+
+def test_index_follows_writes(app, client, db_models):
+    tid, other = seed(app, db_models, [{"title": "alpha"}, {"title": "beta"}])
+    client.post(f"/tasks/{tid}/update", data={"title": "gamma", "priority": "Mid"})
+    assert extract_titles(client.get("/?q=alpha").get_data(as_text=True)) == []
+    assert extract_titles(client.get("/?q=gamma").get_data(as_text=True)) == ["gamma"]
+
+    client.post(f"/tasks/{tid}/status", data={"status": "done"})
+    assert extract_titles(client.get("/?q=gamma").get_data(as_text=True)) == ["gamma"]
+
+    client.post("/api/v1/tasks/bulk", json={"op": "delete", "ids": [tid, other]})
+    assert extract_titles(client.get("/?q=gamma").get_data(as_text=True)) == []
+    client.post("/tasks", data={"title": "delta"})
+    assert extract_titles(client.get("/?q=del").get_data(as_text=True)) == ["delta"]
+
+def test_bulk_filter_scope_respects_search(app, client, db_models):
+    seed(app, db_models, [{"title": "close me"}, {"title": "close me too"}, {"title": "keep"}])
+    client.post("/tasks/bulk", data={"op": "done", "scope": "filter", "q": "close"})
+    with app.app_context():
+        done = {t.title for t in db_models.Task.query.filter_by(status="done")}
+    assert done == {"close me", "close me too"}
+
+def test_upgrade_builds_index_for_existing_rows(app, db_models):
+    import migrations
+
+    seed(app, db_models, [{"title": "legacy row"}])
+    with app.app_context():
+        db = db_models.db
+        db.session.execute(text("DROP TABLE task_fts"))
+        for trigger in ("task_fts_ai", "task_fts_ad", "task_fts_au"):
+            db.session.execute(text(f"DROP TRIGGER {trigger}"))
+        db.session.commit()
+
+        migrations.upgrade()
+        migrations.upgrade()  # 2回目は何もしない
+        rowids = db.session.execute(text("SELECT rowid FROM task_fts WHERE task_fts MATCH 'legacy'")).scalars().all()
+    assert len(rowids) == 1
+
+def test_search_with_sort_uses_index(app, db_models):
+    from app import build_task_query
+    from test_query_plan import explain
+
+    with app.app_context():
+        q = build_task_query("personal", None, None, "Due Date", 1, "report")
+        plan = explain(db_models.db, q)
+    assert any("task_fts" in line and "VIRTUAL TABLE" in line for line in plan), plan
+    assert not any(line.startswith("SCAN task") and "INDEX" not in line for line in plan), plan
+
+# よく出る語では並べ替え用のインデックスを順に読む（一致した全件の並べ替えをしない）
+def test_dense_term_scans_sort_index(app, client, db_models, monkeypatch):
+    import search
+    from app import build_task_query
+    from test_query_plan import explain
+
+    seed(app, db_models, [{"title": f"common {i}"} for i in range(5)] + [{"title": "other"}])
+    monkeypatch.setattr(search, "DENSE_MATCHES", 2)
+    with app.app_context():
+        plan = explain(db_models.db, build_task_query("personal", None, None, "Due Date", 1, "common"))
+    assert any("ix_task_user_due" in line for line in plan), plan
+    assert not any("TEMP B-TREE" in line for line in plan), plan
+
+    html = client.get("/?q=common").get_data(as_text=True)
+    assert extract_titles(html) == [f"common {i}" for i in reversed(range(5))]
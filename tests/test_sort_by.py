@@ -2,6 +2,9 @@ from datetime import datetime
 import pytest
 import re
 
+# conftest.BACKENDS の各DBで同じ並べ替えになること
+pytestmark = pytest.mark.backend_matrix
+
 def extract_ids_from_html(html: str):
     return [int(x) for x in re.findall(r'data-id="(\d+)"', html)]
 
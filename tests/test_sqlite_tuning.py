@@ -0,0 +1,90 @@
+from datetime import datetime
+import random
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, select, text, update
+from sqlalchemy.exc import OperationalError
+
+# tasks.db / users.db の両方の接続に PRAGMA が適用されている
+def test_pragmas_applied_to_both_engines(app, db_models):
+    db = db_models.db
+    with app.app_context():
+        for engine in (db.engines[None], db.engines["users"]):
+            with engine.connect() as conn:
+                assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+                assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+                assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+                assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+                assert conn.execute(text("PRAGMA cache_size")).scalar() == -64000
+
+def test_invalid_pragma_name_is_rejected(app, tmp_path):
+    import sqlite_tuning
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'x.db'}")
+    sqlite_tuning.install(engine, {"journal_mode; DROP TABLE task": "WAL"})
+    with pytest.raises(ValueError):
+        engine.connect()
+
+# 並列の読み取り・書き込みでロックエラーが出ないこと（スループットの計測は tests/benchmarks）
+def test_concurrent_readers_and_writers_without_lock_errors(app, tmp_path, db_models):
+    import sqlite_tuning
+
+    Task = db_models.Task
+    table = Task.__table__
+    path = tmp_path / "stress.db"
+
+    def make_engine():
+        # pysqlite 自身の待ち時間を無効にし、PRAGMA busy_timeout だけで待たせる
+        engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0})
+        sqlite_tuning.install(engine, sqlite_tuning.DEFAULT_PRAGMAS)
+        return engine
+
+    engine = make_engine()
+    table.create(engine)
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [
+            dict(user_id=i % 5, title=f"t{i}", priority="Mid", priority_rank=2, status="todo",
+                 due_sort=db_models.DUE_DATE_NONE, created_at=datetime.now())
+            for i in range(2000)
+        ])
+
+    seconds = 0.5
+    counts = {"read": 0, "write": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def reader():
+        eng = make_engine()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            try:
+                with eng.connect() as conn:
+                    conn.execute(select(table).where(table.c.user_id == random.randrange(5)).limit(50)).all()
+                with lock:
+                    counts["read"] += 1
+            except OperationalError:
+                with lock:
+                    counts["errors"] += 1
+
+    def writer():
+        eng = make_engine()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            try:
+                with eng.begin() as conn:
+                    conn.execute(update(table).where(table.c.id == random.randrange(1, 2001)).values(status="doing"))
+                with lock:
+                    counts["write"] += 1
+            except OperationalError:
+                with lock:
+                    counts["errors"] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    threads += [threading.Thread(target=writer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert counts["errors"] == 0
+    assert counts["read"] > 0 and counts["write"] > 0
@@ -0,0 +1,143 @@
+from datetime import datetime
+import csv
+import io
+import json
+from sqlalchemy import event
+
+def seed(app, db_models):
+    """user_id=1 に3件、user_id=2 に1件"""
+    Task = db_models.Task
+    db = db_models.db
+    with app.app_context():
+        tasks = [
+            Task(title="A report", priority="High", status="todo", user_id=1,
+                 due_date=datetime(2025, 1, 10), created_at=datetime(2024, 1, 1, 10)),
+            Task(title="B", detail="weekly report", priority="Mid", status="doing", user_id=1,
+                 due_date=datetime(2025, 1, 5), created_at=datetime(2024, 1, 1, 11)),
+            Task(title="C", priority="Low", status="todo", user_id=1,
+                 due_date=None, created_at=datetime(2024, 1, 1, 12)),
+            Task(title="D", priority="High", status="todo", user_id=2,
+                 due_date=datetime(2025, 1, 3), created_at=datetime(2024, 1, 1, 9)),
+        ]
+        db.session.add_all(tasks)
+        db.session.commit()
+
+def titles(app, db_models, user_id=1):
+    with app.app_context():
+        Task = db_models.Task
+        return [t.title for t in Task.query.filter_by(user_id=user_id).order_by(Task.id)]
+
+# エクスポートは一覧と同じ絞り込み・並べ替え
+def test_export_csv_uses_board_filters_and_sort(app, client, db_models):
+    seed(app, db_models)
+    res = client.get("/tasks/export?format=csv&sort_by=Due+Date")
+    assert res.status_code == 200
+    assert res.mimetype == "text/csv"
+    assert res.headers["Content-Disposition"].startswith("attachment;")
+    rows = list(csv.DictReader(io.StringIO(res.get_data(as_text=True))))
+    assert [r["title"] for r in rows] == ["B", "A report", "C"]
+    assert rows[0]["due_date"] == "2025-01-05T00:00:00"
+    assert rows[2]["due_date"] == ""
+
+    res = client.get("/tasks/export?format=csv&view_mode=all&status=todo&priority=High")
+    assert [r["title"] for r in csv.DictReader(io.StringIO(res.get_data(as_text=True)))] == ["A report", "D"]
+
+def test_export_ndjson_with_search(app, client, db_models):
+    seed(app, db_models)
+    res = client.get("/tasks/export?format=ndjson&q=report")
+    assert res.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert sorted(line["title"] for line in lines) == ["A report", "B"]
+    assert set(lines[0]) == {"id", "user_id", "title", "detail", "priority", "status", "due_date", "created_at"}
+
+    assert client.get("/tasks/export?format=xml").status_code == 400
+
+# 取り込みは不正な行を飛ばし、行番号と理由を返す
+def test_import_csv_reports_row_errors(app, client, db_models):
+    body = "\n".join([
+        "title,detail,priority,status,due_date",
+        "ok 1,,High,doing,2025-02-01",
+        ",missing title,Mid,todo,",
+        "bad priority,,Urgent,todo,",
+        "bad status,,Low,closed,",
+        "bad date,,Low,todo,02/01/2025",
+        "ok 2,detail,,,",
+    ]).encode()
+    res = client.post("/tasks/import", data={"file": (io.BytesIO(body), "tasks.csv")})
+    assert res.status_code == 200
+    result = res.get_json()
+    assert result["imported"] == 2 and result["failed"] == 4
+    assert [(e["line"], e["error"]) for e in result["errors"]] == [
+        (3, "Title is required"), (4, "Invalid priority"), (5, "Invalid status"), (6, "Invalid due_date (YYYY-MM-DD)"),
+    ]
+
+    with app.app_context():
+        Task = db_models.Task
+        tasks = {t.title: t for t in Task.query.filter_by(user_id=1)}
+        assert set(tasks) == {"ok 1", "ok 2"}
+        assert tasks["ok 1"].priority_rank == 1 and tasks["ok 1"].due_sort == datetime(2025, 2, 1)
+        assert tasks["ok 2"].priority == "Mid" and tasks["ok 2"].status == "todo"
+        assert tasks["ok 2"].due_sort == db_models.DUE_DATE_NONE
+
+def test_import_ndjson_body(app, client, db_models):
+    body = "\n".join([
+        json.dumps({"title": "first", "priority": "Low", "created_at": "2023-03-04T05:06:07"}),
+        "{not json",
+        "",
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"title": "second", "user_id": 2}),  # user_id は無視してログイン中のユーザーにする
+    ]).encode()
+    res = client.post("/tasks/import", data=body, content_type="application/x-ndjson")
+    result = res.get_json()
+    assert result["imported"] == 2
+    assert [(e["line"], e["error"]) for e in result["errors"]] == [(2, "Invalid JSON"), (4, "JSON object is required")]
+    assert titles(app, db_models) == ["first", "second"]
+    with app.app_context():
+        assert db_models.Task.query.filter_by(title="first").one().created_at == datetime(2023, 3, 4, 5, 6, 7)
+
+    assert client.post("/tasks/import", data=body, content_type="text/plain").status_code == 400
+
+# エクスポートした内容はそのまま取り込める
+def test_export_import_round_trip(app, client, db_models):
+    seed(app, db_models)
+    exported = client.get("/tasks/export?format=csv").get_data()
+    with client.session_transaction() as sess:
+        sess["user_id"] = 3
+    res = client.post("/tasks/import?format=csv", data=exported, content_type="text/csv")
+    assert res.get_json() == {"imported": 3, "failed": 0, "errors": []}
+    with app.app_context():
+        Task = db_models.Task
+        copied = {t.title: (t.priority, t.status, t.due_date, t.created_at) for t in Task.query.filter_by(user_id=3)}
+        original = {t.title: (t.priority, t.status, t.due_date, t.created_at) for t in Task.query.filter_by(user_id=1)}
+    assert copied == original
+
+# batch_size 行ごとに1回の INSERT と commit。イベントと一覧の変更カウンタも同じトランザクションで書く
+def test_import_commits_in_batches(app, db_models):
+    import board_cache
+    from transfer import import_tasks
+
+    commits = []
+    with app.app_context():
+        event.listen(db_models.db.engine, "commit", lambda conn: commits.append(1))
+        rows = [(i + 2, {"title": f"t{i}"}) for i in range(5)]
+        result = import_tasks(rows, 1, batch_size=2)
+        assert result.imported == 5
+        assert len(commits) == 3
+        assert db_models.TaskEvent.query.filter_by(kind="created", user_id=1).count() == 5
+        assert board_cache.version_info("user:1")[0] == 3
+
+def test_import_and_export_cli(app, db_models, tmp_path):
+    source = tmp_path / "in.ndjson"
+    source.write_text("\n".join(json.dumps({"title": f"cli {i}", "status": "done"}) for i in range(3)) + "\n{}\n")
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["import-tasks", str(source), "--user-id", "2"])
+    assert result.exit_code == 0, result.output
+    assert "imported 3 tasks, 1 failed" in result.output
+    assert "line 4: Title is required" in result.output
+    assert titles(app, db_models, user_id=2) == ["cli 0", "cli 1", "cli 2"]
+
+    target = tmp_path / "out.csv"
+    result = runner.invoke(args=["export-tasks", str(target), "--user-id", "2", "--status", "done"])
+    assert result.exit_code == 0, result.output
+    assert [r["title"] for r in csv.DictReader(target.open())] == ["cli 2", "cli 1", "cli 0"]
@@ -0,0 +1,90 @@
+import threading
+import pytest
+from sqlalchemy import event
+
+CHEAP = "pbkdf2:sha256:1000"
+
+@pytest.fixture
+def auth_app(app):
+    import passwords
+    app.config["PASSWORD_HASH_METHOD"] = CHEAP
+    app.extensions["password_hash_pool"] = passwords.HashPool(workers=0, max_pending=1, retry_after=1)
+    return app
+
+def register(app, email="a@example.com", password="pw"):
+    return app.test_client().post("/register", data={"email": email, "password": password, "password2": password})
+
+def login(app, email="a@example.com", password="pw"):
+    return app.test_client().post("/login", data={"email": email, "password": password})
+
+def users_statements(app, db_models):
+    """users.db に対して実行された SQL を記録するリスト"""
+    statements = []
+    with app.app_context():
+        engine = db_models.db.engines["users"]
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+# 登録は事前の SELECT をせず、重複は一意制約で判定する
+def test_register_relies_on_unique_constraint(auth_app, db_models):
+    statements = users_statements(auth_app, db_models)
+    assert register(auth_app).status_code == 302
+    assert not any(s.lstrip().upper().startswith("SELECT") for s in statements)
+    c = auth_app.test_client()
+    res = c.post("/register", data={"email": "a@example.com", "password": "x", "password2": "x"})
+    assert res.status_code == 200
+    with c.session_transaction() as sess:
+        assert sess["_flashes"] == [("danger", "このメールアドレスは既に登録されています。")]
+    with auth_app.app_context():
+        assert db_models.User.query.count() == 1
+
+# 同じメールアドレスの同時登録でも1件だけ作られる
+def test_concurrent_register_creates_one_user(auth_app, db_models):
+    statuses = []
+    threads = [threading.Thread(target=lambda: statuses.append(register(auth_app).status_code)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(statuses) == [200] * 4 + [302]
+    with auth_app.app_context():
+        assert db_models.User.query.count() == 1
+
+# 2回目以降のログインは users.db を読まない
+def test_login_uses_cached_user(auth_app, db_models):
+    register(auth_app)
+    assert login(auth_app).status_code == 302
+    statements = users_statements(auth_app, db_models)
+    assert login(auth_app).status_code == 302
+    assert statements == []
+    assert login(auth_app, password="wrong").status_code == 200
+
+# このプロセスでのパスワード・メールアドレスの変更はキャッシュから消える
+def test_user_changes_invalidate_cache(auth_app, db_models):
+    from werkzeug.security import generate_password_hash
+    register(auth_app)
+    login(auth_app)
+    with auth_app.app_context():
+        user = db_models.User.query.one()
+        user.password_hash = generate_password_hash("new", CHEAP)
+        db_models.db.session.commit()
+    assert login(auth_app, password="pw").status_code == 200
+    assert login(auth_app, password="new").status_code == 302
+
+    with auth_app.app_context():
+        db_models.User.query.one().email = "b@example.com"
+        db_models.db.session.commit()
+    assert login(auth_app, password="new").status_code == 200
+    assert login(auth_app, "b@example.com", "new").status_code == 302
+
+# 別ワーカーでの変更（キャッシュに残った古いハッシュ）でも新しいパスワードでログインできる
+def test_login_rereads_stale_cache_on_mismatch(auth_app, db_models):
+    from werkzeug.security import generate_password_hash
+    register(auth_app)
+    login(auth_app)
+    with auth_app.app_context():
+        engine = db_models.db.engines["users"]
+    with engine.begin() as conn:
+        conn.execute(db_models.User.__table__.update().values(password_hash=generate_password_hash("new", CHEAP)))
+    assert login(auth_app, password="new").status_code == 302
+    assert login(auth_app, password="pw").status_code == 200
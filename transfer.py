@@ -0,0 +1,284 @@
+"""
+タスクのエクスポート（CSV / NDJSON）とインポート。
+
+  GET  /tasks/export?format=csv|ndjson&...  一覧（index()）と同じ絞り込み・並べ替え・検索語の全件をストリーミングで返す
+  POST /tasks/import?format=csv|ndjson      ファイル（multipart の file、または本文そのもの）をログイン中のユーザーのタスクとして取り込む
+  flask --app app import-tasks FILE --user-id N
+  flask --app app export-tasks FILE --user-id N [--view-mode all ...]
+
+エクスポートはサーバー側カーソル（yield_per）で EXPORT_BATCH_SIZE 行ずつ読んで書き出すので、件数によらずメモリは一定。
+インポートも1行ずつ読んで検証し、IMPORT_BATCH_SIZE 行ごとに複数行の INSERT … VALUES (…), (…) RETURNING id と commit にまとめる。
+不正な行（title なし、PRIORITIES / STATUSES にない値、日付の形式違いなど）は飛ばし、行番号と理由を返す。
+列はエクスポートと同じ（id と user_id は取り込み時には無視する）。日付は YYYY-MM-DD か ISO 8601。
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+import click
+from flask import Blueprint, Response, jsonify, request, session, abort, stream_with_context
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+
+from board import PRIORITIES, STATUSES, build_task_query
+from board_cache import bump_version
+import counters
+from events import EVENT_CREATED, record_bulk
+from models import db, Task, PRIORITY_RANK, DUE_DATE_NONE
+
+transfer_bp = Blueprint("transfer", __name__)
+
+FIELDS = ["id", "user_id", "title", "detail", "priority", "status", "due_date", "created_at"]
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_BATCH_SIZE = 1000  # エクスポートで一度に読む行数
+IMPORT_BATCH_SIZE = 5000  # インポートで1回の INSERT・commit にまとめる行数
+MAX_REPORTED_ERRORS = 100  # インポートの結果に行番号と理由を載せる件数の上限
+TITLE_MAX_LENGTH = 100
+
+
+class RowError(ValueError):
+  """インポートの1行が不正"""
+
+
+def export_rows(view_mode, status, priority, sort_by, user_id, search=""):
+  """絞り込み・並べ替えた全件の FIELDS の値（タプル）を順に返す"""
+  q = build_task_query(view_mode, status, priority, sort_by, user_id, search)
+  q = q.with_entities(*[getattr(Task, f) for f in FIELDS])
+  return q.yield_per(EXPORT_BATCH_SIZE)
+
+
+def value_text(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  return "" if value is None else value
+
+
+def csv_chunks(rows):
+  out = io.StringIO()
+  writer = csv.writer(out)
+  writer.writerow(FIELDS)
+  for i, row in enumerate(rows, 1):
+    writer.writerow([value_text(v) for v in row])
+    if i % EXPORT_BATCH_SIZE == 0:
+      yield out.getvalue()
+      out.seek(0)
+      out.truncate()
+  yield out.getvalue()
+
+
+def ndjson_chunks(rows):
+  dumps = json.JSONEncoder(ensure_ascii=False).encode
+  lines = []
+  for row in rows:
+    lines.append(dumps({f: value if not isinstance(value, datetime) else value.isoformat() for f, value in zip(FIELDS, row)}))
+    if len(lines) == EXPORT_BATCH_SIZE:
+      yield "\n".join(lines) + "\n"
+      lines = []
+  if lines:
+    yield "\n".join(lines) + "\n"
+
+
+def export_chunks(fmt, rows):
+  return csv_chunks(rows) if fmt == "csv" else ndjson_chunks(rows)
+
+
+def parse_csv(stream):
+  """(行番号, dict) を順に返す。1行目は列名"""
+  reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+  for row in reader:
+    yield reader.line_num, row
+
+
+def parse_ndjson(stream):
+  for line_no, line in enumerate(io.TextIOWrapper(stream, encoding="utf-8-sig"), 1):
+    if not line.strip():
+      continue
+    try:
+      yield line_no, json.loads(line)
+    except ValueError:
+      yield line_no, RowError("Invalid JSON")
+
+
+def parse_datetime(value, name):
+  if value in (None, ""):
+    return None
+  try:
+    return datetime.fromisoformat(value)
+  except (TypeError, ValueError):
+    raise RowError(f"Invalid {name} (YYYY-MM-DD)") from None
+
+
+def task_values(data, user_id, now):
+  """1行分の値を検証して Task の INSERT の値にする（不正なら RowError）"""
+  if isinstance(data, RowError):
+    raise data
+  if not isinstance(data, dict):
+    raise RowError("JSON object is required")
+  title, detail = data.get("title"), data.get("detail")
+  if not isinstance(title, (str, type(None))) or not isinstance(detail, (str, type(None))):
+    raise RowError("Invalid title or detail")
+  title = (title or "").strip()
+  if not title:
+    raise RowError("Title is required")
+  if len(title) > TITLE_MAX_LENGTH:
+    raise RowError("Title is too long")
+  priority = data.get("priority") or "Mid"
+  if priority not in PRIORITIES:
+    raise RowError("Invalid priority")
+  status = data.get("status") or "todo"
+  if status not in STATUSES:
+    raise RowError("Invalid status")
+  due_date = parse_datetime(data.get("due_date"), "due_date")
+  return {
+    "user_id": user_id, "title": title, "detail": (detail or "").strip(),
+    "priority": priority, "priority_rank": PRIORITY_RANK[priority], "status": status,
+    "due_date": due_date, "due_sort": due_date or DUE_DATE_NONE,
+    "created_at": parse_datetime(data.get("created_at"), "created_at") or now,
+    "done_at": now if status == "done" else None,  # 完了日時は取り込まないので、取り込んだ日時にする
+  }
+
+
+class ImportResult:
+  def __init__(self):
+    self.imported = 0
+    self.failed = 0
+    self.errors = []  # [(行番号, 理由)]（先頭の MAX_REPORTED_ERRORS 件）
+
+  def error(self, line_no, message):
+    self.failed += 1
+    if len(self.errors) < MAX_REPORTED_ERRORS:
+      self.errors.append((line_no, message))
+
+  def to_dict(self):
+    return {
+      "imported": self.imported, "failed": self.failed,
+      "errors": [{"line": line_no, "error": message} for line_no, message in self.errors],
+    }
+
+
+def import_tasks(rows, user_id, batch_size=IMPORT_BATCH_SIZE):
+  """(行番号, 値) の列を user_id のタスクとして取り込む。batch_size 行ごとに commit する"""
+  result = ImportResult()
+  now = datetime.now()
+  batch = []
+  for line_no, data in rows:
+    try:
+      batch.append(task_values(data, user_id, now))
+    except RowError as e:
+      result.error(line_no, str(e))
+      continue
+    if len(batch) >= batch_size:
+      insert_batch(batch, user_id)
+      result.imported += len(batch)
+      batch = []
+  if batch:
+    insert_batch(batch, user_id)
+    result.imported += len(batch)
+  return result
+
+
+def insert_batch(values, user_id):
+  """1回の INSERT と commit。作成イベント・一覧の件数・変更カウンタも同じトランザクションで書く"""
+  ids = db.session.execute(insert(Task.__table__).returning(Task.__table__.c.id), values).scalars().all()
+  record_bulk(EVENT_CREATED, Task.query.filter(Task.id.in_(ids)))
+  counters.count_inserted(values)
+  bump_version(user_id)
+  db.session.commit()
+
+
+def request_format(filename=None):
+  fmt = request.args.get("format")
+  if not fmt and filename:
+    fmt = filename.rsplit(".", 1)[-1].lower()
+  if not fmt:
+    fmt = next((name for name, mimetype in FORMATS.items() if request.mimetype == mimetype), None)
+  if fmt not in FORMATS:
+    abort(400, "format must be csv or ndjson")
+  return fmt
+
+
+# ==== ルーティング ====
+@transfer_bp.get("/tasks/export")
+def export():
+  fmt = request.args.get("format", "csv")
+  if fmt not in FORMATS:
+    abort(400, "format must be csv or ndjson")
+  rows = export_rows(
+    request.args.get("view_mode", "personal"), request.args.get("status"), request.args.get("priority"),
+    request.args.get("sort_by") or "Created At (Newest First)", session.get("user_id"),
+    (request.args.get("q") or "").strip(),
+  )
+  filename = f"tasks-{datetime.now():%Y%m%d-%H%M%S}.{fmt}"
+  return Response(
+    stream_with_context(export_chunks(fmt, rows)), mimetype=FORMATS[fmt],
+    headers={"Content-Disposition": f"attachment; filename={filename}", "Cache-Control": "no-store"},
+  )
+
+
+@transfer_bp.post("/tasks/import")
+def import_():
+  upload = request.files.get("file")
+  fmt = request_format(upload.filename if upload else None)
+  stream = upload.stream if upload else request.stream
+  rows = parse_csv(stream) if fmt == "csv" else parse_ndjson(stream)
+  try:
+    result = import_tasks(rows, session.get("user_id"))
+  except UnicodeDecodeError:
+    db.session.rollback()
+    abort(400, "File must be UTF-8")
+  return jsonify(result.to_dict())
+
+
+@transfer_bp.errorhandler(400)
+def bad_request(e):
+  return jsonify(error=e.description), 400
+
+
+# ==== CLI ====
+@click.command("import-tasks")
+@with_appcontext
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user-id", type=int, required=True, help="取り込んだタスクの所有者")
+@click.option("--format", "fmt", type=click.Choice(list(FORMATS)), help="既定はファイルの拡張子から判定")
+@click.option("--batch-size", type=int, default=IMPORT_BATCH_SIZE, show_default=True)
+def import_command(path, user_id, fmt, batch_size):
+  """CSV / NDJSON のファイルからタスクを取り込む"""
+  fmt = fmt or path.rsplit(".", 1)[-1].lower()
+  if fmt not in FORMATS:
+    raise click.UsageError("Use --format csv or --format ndjson")
+  start = datetime.now()
+  with open(path, "rb") as f:
+    result = import_tasks(parse_csv(f) if fmt == "csv" else parse_ndjson(f), user_id, batch_size)
+  seconds = (datetime.now() - start).total_seconds()
+  for line_no, message in result.errors:
+    click.echo(f"line {line_no}: {message}", err=True)
+  rate = result.imported / seconds if seconds else 0
+  click.echo(f"imported {result.imported} tasks, {result.failed} failed ({seconds:.1f}s, {rate:.0f} rows/s)")
+
+
+@click.command("export-tasks")
+@with_appcontext
+@click.argument("path", type=click.Path(dir_okay=False, allow_dash=True))
+@click.option("--user-id", type=int, required=True, help="個人ビューの対象ユーザー")
+@click.option("--view-mode", type=click.Choice(["personal", "all"]), default="personal", show_default=True)
+@click.option("--status", type=click.Choice(STATUSES))
+@click.option("--priority", type=click.Choice(PRIORITIES))
+@click.option("--sort-by", default="Created At (Newest First)", show_default=True)
+@click.option("--query", "search", default="", help="検索語")
+@click.option("--format", "fmt", type=click.Choice(list(FORMATS)), help="既定はファイルの拡張子から判定（- のときは csv）")
+def export_command(path, user_id, view_mode, status, priority, sort_by, search, fmt):
+  """絞り込んだタスクを CSV / NDJSON に書き出す（- なら標準出力）"""
+  fmt = fmt or ("csv" if path == "-" else path.rsplit(".", 1)[-1].lower())
+  if fmt not in FORMATS:
+    raise click.UsageError("Use --format csv or --format ndjson")
+  rows = export_rows(view_mode, status, priority, sort_by, user_id, search)
+  with click.open_file(path, "w", encoding="utf-8") as out:
+    for chunk in export_chunks(fmt, rows):
+      out.write(chunk)
+
+
+def init_app(app):
+  app.register_blueprint(transfer_bp)
+  app.cli.add_command(import_command)
+  app.cli.add_command(export_command)
@@ -0,0 +1,105 @@
+"""
+ユーザーのプロセスごとのキャッシュ（ログインのたびに users.db を読まない）。
+
+id とメールアドレスの両方で引けるよう、User の (id, email, password_hash) を TTL つきで持つ。
+このプロセスで User を変更・削除したときは flush 時と commit 後に消す（User の after_update / after_delete。
+commit までの間に別のリクエストが古い行を読んでキャッシュし直しても残らない）。
+別ワーカーでの変更は USER_CACHE_TTL 秒以内に反映される（ログインでパスワードが合わなければ読み直す）。
+"""
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import object_session
+
+from board_cache import TTLLRUCache
+from models import db, User
+
+CachedUser = namedtuple("CachedUser", ["id", "email", "password_hash"])
+
+
+def _store(row):
+  user = CachedUser(*row)
+  cache = get_cache(current_app)
+  cache.set(("id", user.id), user)
+  cache.set(("email", user.email), user)
+  return user
+
+
+def _load(where):
+  row = db.session.execute(select(User.id, User.email, User.password_hash).where(where)).first()
+  return _store(row) if row is not None else None
+
+
+def get_user(user_id):
+  """id のユーザー（いなければ None）"""
+  return get_cache(current_app).get(("id", user_id)) or _load(User.id == user_id)
+
+
+def find_by_email(email, refresh=False):
+  """メールアドレスのユーザー（いなければ None）。refresh=True ならキャッシュを使わず読み直す"""
+  user = None if refresh else get_cache(current_app).get(("email", email))
+  return user or _load(User.email == email)
+
+
+def owner_emails(user_ids):
+  """
+  {user_id: メールアドレス}（一覧の所有者表示用）。
+  キャッシュにないユーザーだけを IN で1回に読む（users.db は別DBなので task と JOIN できない）。
+  """
+  cache = get_cache(current_app)
+  owners = {}
+  missing = []
+  for user_id in {user_id for user_id in user_ids if user_id is not None}:
+    user = cache.get(("id", user_id))
+    if user is None:
+      missing.append(user_id)
+    else:
+      owners[user_id] = user.email
+  if missing:
+    for row in db.session.execute(select(User.id, User.email, User.password_hash).where(User.id.in_(missing))):
+      owners[row.id] = _store(row).email
+  return owners
+
+
+def invalidate(user_id, *emails):
+  cache = get_cache(current_app)
+  cache.pop(("id", user_id))
+  for email in emails:
+    cache.pop(("email", email))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+  if not has_app_context() or "user_cache" not in current_app.extensions:
+    return
+  # 変更前のメールアドレスのエントリも消す
+  keys = (target.id, target.email, *(inspect(target).attrs.email.history.deleted or ()))
+  invalidate(*keys)
+  object_session(target).info.setdefault("user_cache_stale", []).append(keys)
+
+
+def _after_commit(session):
+  for keys in session.info.pop("user_cache_stale", ()):
+    if has_app_context() and "user_cache" in current_app.extensions:
+      invalidate(*keys)
+
+
+def _after_rollback(session):
+  session.info.pop("user_cache_stale", None)
+
+
+def listen(target):
+  """commit 後にキャッシュを消すリスナーを登録する（db.session と、ASGI モードのセッションクラス）"""
+  event.listen(target, "after_commit", _after_commit)
+  event.listen(target, "after_rollback", _after_rollback)
+
+
+def init_app(app):
+  app.extensions["user_cache"] = TTLLRUCache(max_size=app.config["USER_CACHE_SIZE"], ttl=app.config["USER_CACHE_TTL"])
+  listen(db.session)
+
+
+def get_cache(app):
+  return app.extensions["user_cache"]